@@ -2,11 +2,15 @@
 
 # Import necessary libraries
 import ollama
+import asyncio
+import os
+import weakref
 import time
 import random
 import queue
 import concurrent.futures
-from typing import Union # Import Union for type hinting
+import contextvars
+from typing import AsyncIterator, Iterator, Union # Import Union for type hinting
 
 # Import necessary components for RAG context formatting and type hinting
 from langchain.schema import Document
@@ -15,11 +19,45 @@ from langchain_core.retrievers import BaseRetriever # Type hint for retriever ob
 # Import configuration settings and debate state
 from config import (
     AGENT_SYSTEM_PROMPTS, STAGE_PROMPTS, DEFAULT_MODEL, SUMMARY_MODEL,
-    DEBATE_TOPIC, PROMPT_EXAMPLES, SUMMARY_PROMPT_TEMPLATE,
+    DEBATE_TOPIC, PROMPT_EXAMPLES, SUMMARY_PROMPT_TEMPLATE, INCREMENTAL_SUMMARY_PROMPT_TEMPLATE,
     MAX_TOKENS_PER_STAGE, MAX_SUMMARY_TOKENS,
-    ENABLE_RAG, RETRIEVER_K # Ensure RETRIEVER_K is imported
+    ENABLE_RAG, RETRIEVER_K, RETRIEVAL_PREFETCH_SPEAKERS, # Ensure RETRIEVER_K is imported
+    STREAM_RESPONSES, PARALLEL_STAGE_TURNS, MAX_PARALLEL_TURNS, OLLAMA_HOST, OLLAMA_KEEP_ALIVE,
+    LLM_TEMPERATURE, LLM_SEED, TRACE_OUTPUT_DIR, LLM_NUM_CTX
 )
 from debate_state import DebateState # Import DebateState for type hinting
+from rag_pipeline import retrieval_cache, get_index_version # Shared retrieval result cache
+from llm_scheduler import llm_scheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND # Shared LLM request scheduler
+from llm_cache import llm_response_cache # Opt-in on-disk response cache (None when disabled)
+from debate_metrics import DebateMetrics # Per-call latency/token metrics
+from tracing import tracer # Opt-in span tracing (no-op unless enabled in config)
+from prompt_budget import PromptBudget # Fits debate prompts into the context window
+
+
+# --- Ollama Clients ---
+# All chat calls use clients bound to the configured host (OLLAMA_HOST), so the whole system can be
+# pointed at another Ollama server, or a local fake one, from config alone.
+_sync_client = None
+
+def _get_client() -> ollama.Client:
+    """Returns the shared synchronous Ollama client."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = ollama.Client(host=OLLAMA_HOST)
+    return _sync_client
+
+# ollama.AsyncClient wraps an httpx connection pool that belongs to the event loop it was first
+# used on, so keep one client per running loop instead of one per call.
+_async_clients = weakref.WeakKeyDictionary()
+
+def _get_async_client() -> ollama.AsyncClient:
+    """Returns the shared AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = ollama.AsyncClient(host=OLLAMA_HOST)
+        _async_clients[loop] = client
+    return client
 
 
 # --- Base Agent Class ---
@@ -32,6 +70,14 @@ class Agent:
         self.model = model
         self.retriever = retriever # This can be None if not provided
         self.agent_photo = agent_photo # Path to the agent's photo
+        # Debate session this agent belongs to; the LLM scheduler shares Ollama fairly between sessions
+        self.session_id = None
+        # Token counts reported by Ollama across all of this agent's calls (see _record_usage)
+        self.token_usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        # Per-call metrics collector, attached by the orchestrator (None = not collected)
+        self.metrics = None
+        # Estimated token budget of this agent's last prompt (PromptBudget report), None if not budgeted
+        self.last_prompt_budget = None
 
         # Get system prompt from config
         self.system_prompt_template = AGENT_SYSTEM_PROMPTS.get(role_type)
@@ -46,21 +92,51 @@ class Agent:
                  # Use template directly if it doesn't use {topic}
                  self.system_prompt = self.system_prompt_template
 
+        self._compile_message_prefixes()
 
-    # Method to interact with the LLM (Ollama)
-    # Takes user_prompt, stage (for examples/tokens), max_tokens, and retrieved_context
-    def generate_response(self, user_prompt: str, stage: Union[str, None] = None, max_tokens: int = -1, retrieved_context: str = "") -> str:
-        """Sends a prompt to the Ollama model and returns the raw response text."""
-
-        messages = []
-        if self.system_prompt:
-             messages.append({'role': 'system', 'content': self.system_prompt})
 
-        # Add few-shot examples if available for this stage
-        if stage and stage in PROMPT_EXAMPLES:
-            # Format examples to include the context placeholder if needed
+    # The system prompt is formatted with config.DEBATE_TOPIC at construction; callers debating
+    # another topic (e.g. the batch runner in main.py) re-format it here.
+    def set_topic(self, topic: str):
+        """Re-formats the system prompt for a different debate topic."""
+        if self.system_prompt_template is None:
+             return
+        try:
+            self.system_prompt = self.system_prompt_template.format(topic=topic)
+        except KeyError:
+            self.system_prompt = self.system_prompt_template
+        self._compile_message_prefixes()
+
+
+    def _record_usage(self, response):
+        """Adds the token counts Ollama reports on a finished response to self.token_usage."""
+        self.token_usage["prompt_tokens"] += response.get('prompt_eval_count') or 0
+        self.token_usage["completion_tokens"] += response.get('eval_count') or 0
+
+    def _record_call(self, stage: Union[str, None], response, started: float, cached: bool = False):
+        """Records a finished chat call: token usage and, if a collector is attached, its metrics."""
+        if response is not None:
+            self._record_usage(response)
+        if self.metrics is not None:
+            self.metrics.record_llm_call(self, stage, response, time.perf_counter() - started, cached=cached)
+
+    def _record_timing(self, kind: str, stage: Union[str, None], started: float):
+        """Records a non-LLM step (retrieval, summary) with the attached collector, if any."""
+        if self.metrics is not None:
+            self.metrics.record_timing(kind, self, stage, time.perf_counter() - started)
+
+    # --- Precompiled Message Prefixes ---
+    # The system prompt and a stage's few-shot examples are the same for every call this agent makes
+    # in that stage, so they are built once (here and in set_topic) rather than on every call. Sending
+    # a byte-identical leading block each time also lets Ollama reuse its prompt cache for the loaded
+    # model instead of re-evaluating the whole prefix (see OLLAMA_KEEP_ALIVE).
+    def _compile_message_prefixes(self):
+        """Builds the (system prompt + few-shot examples) message prefix for every stage."""
+        system_messages = [{'role': 'system', 'content': self.system_prompt}] if self.system_prompt else []
+        self._message_prefixes = {None: tuple(system_messages)} # Stages without examples
+        for stage, examples in PROMPT_EXAMPLES.items():
             formatted_examples = []
-            for example in PROMPT_EXAMPLES[stage]:
+            for example in examples:
                  formatted_example = {'role': example['role']}
                  if example['role'] == 'user':
                      # Include the context placeholder in the example user prompt if RAG is conceptually used here
@@ -68,11 +144,18 @@ class Agent:
                  else: # assistant role
                      # Assistant example response doesn't include the placeholder
                      formatted_example['content'] = example['content']
-                 # CORRECTED: Append the single formatted_example to the list
                  formatted_examples.append(formatted_example)
-
-            messages.extend(formatted_examples) # Add the list of formatted examples
-
+            self._message_prefixes[stage] = tuple(system_messages + formatted_examples)
+
+    # Builds the Ollama chat message list for a turn: system prompt, few-shot examples, then the user prompt
+    # include_examples=False leaves out the stage's few-shot examples (when the prompt budget needs the room)
+    def _build_messages(self, user_prompt: str, stage: Union[str, None] = None, retrieved_context: str = "", include_examples: bool = True) -> list:
+        """Assembles the chat messages sent to Ollama for a single call."""
+        # Shared prefix messages are never mutated, so the list only needs a shallow copy
+        if include_examples:
+            messages = list(self._message_prefixes.get(stage, self._message_prefixes[None]))
+        else:
+            messages = list(self._message_prefixes[None])
 
         # Add the actual user prompt for the current turn
         full_user_prompt = user_prompt
@@ -82,15 +165,88 @@ class Agent:
 
 
         messages.append({'role': 'user', 'content': full_user_prompt})
+        return messages
+
 
-        # Set Ollama options (like max_tokens)
+    @staticmethod
+    def _build_options(max_tokens: int = -1) -> dict:
+        """Returns the Ollama options for a call (like max_tokens)."""
         options = {}
         if max_tokens > 0:
             options['num_predict'] = max_tokens
+        if LLM_TEMPERATURE is not None:
+            options['temperature'] = LLM_TEMPERATURE
+        if LLM_SEED is not None:
+            options['seed'] = LLM_SEED
+        if LLM_NUM_CTX:
+            # Same window on every call, so Ollama never reloads the model between turns, summaries and the
+            # judge; every prompt is fitted to it (_fit_turn_prompt, _fit_text_prompt)
+            options['num_ctx'] = LLM_NUM_CTX
+        return options
+
+    # Formats a prompt with one variable-length part (history or summary) within the context window
+    # (LLM_NUM_CTX), leaving room for max_tokens of output. Returns (prompt, include_examples).
+    def _fit_text_prompt(self, stage: str, text: str, render, max_tokens: int, section: str = 'summary') -> tuple:
+        """Formats a prompt with render(text), cutting the start of text to the context window budget."""
+        if not LLM_NUM_CTX:
+            return render(text), True
+        system_messages = self._message_prefixes[None]
+        example_messages = self._message_prefixes.get(stage, system_messages)[len(system_messages):]
+        budget = PromptBudget(LLM_NUM_CTX, max_tokens)
+        user_prompt, include_examples, report = budget.fit_text(system_messages, example_messages, text, render, section)
+        self._record_prompt_budget(stage, report)
+        return user_prompt, include_examples
+
+    def _record_prompt_budget(self, stage: str, report: Union[dict, None]):
+        """Keeps a prompt's PromptBudget report, records it and reports anything that was cut."""
+        self.last_prompt_budget = report
+        if report is None:
+            return
+        if self.metrics is not None:
+            self.metrics.record_prompt_budget(self, stage, report)
+        if report['dropped_documents'] or report['examples_dropped'] or report['trimmed']:
+            print(f"Prompt for {self.name} ({stage}) trimmed to ~{report['prompt_tokens']} of {report['prompt_limit']} tokens: "
+                  f"{report['dropped_documents']} chunk(s) dropped, examples dropped: {report['examples_dropped']}, "
+                  f"trimmed: {', '.join(report['trimmed']) or 'nothing'}", flush=True)
+
+    def _response_cache_key(self, messages: list, options: dict) -> Union[str, None]:
+        """Returns the response cache key for a call, or None if the call shouldn't be cached."""
+        if llm_response_cache is None or not llm_response_cache.is_cacheable(options):
+            return None
+        return llm_response_cache.make_key(self.model, messages, options)
+
+    # Method to interact with the LLM (Ollama)
+    # Takes user_prompt, stage (for examples/tokens), max_tokens, and retrieved_context
+    # With stream=True an iterator of text chunks is returned instead of the full text
+    # The call waits for a slot from the shared LLM scheduler; priority says whether a viewer is waiting on it
+    def generate_response(self, user_prompt: str, stage: Union[str, None] = None, max_tokens: int = -1, retrieved_context: str = "", stream: bool = False,
+                          priority: int = PRIORITY_INTERACTIVE, include_examples: bool = True) -> Union[str, Iterator[str]]:
+        """Sends a prompt to the Ollama model and returns the raw response text (or a chunk iterator when streaming)."""
+
+        messages = self._build_messages(user_prompt, stage=stage, retrieved_context=retrieved_context, include_examples=include_examples)
+        options = self._build_options(max_tokens)
+
+        if stream:
+            return self._stream_response(messages, options, priority, stage)
+
+        # A deterministic request that was answered before is replayed from the response cache
+        cache_key = self._response_cache_key(messages, options)
+        if cache_key:
+            started = time.perf_counter()
+            cached = llm_response_cache.get(cache_key)
+            if cached is not None:
+                self._record_call(stage, None, started, cached=True)
+                return cached.strip()
 
         try:
             # Make the Ollama chat call
-            response = ollama.chat(model=self.model, messages=messages, stream=False, options=options)
+            with llm_scheduler.slot(self.model, self.session_id, priority):
+                started = time.perf_counter() # Time spent waiting for a slot is not part of the call
+                with tracer.span('ollama.chat', 'ollama', agent=self.name, model=self.model, stage=stage):
+                    response = _get_client().chat(model=self.model, messages=messages, stream=False, options=options, keep_alive=OLLAMA_KEEP_ALIVE)
+            self._record_call(stage, response, started)
+            if cache_key:
+                llm_response_cache.put(cache_key, response['message']['content'])
             return response['message']['content'].strip()
         except ollama.ResponseError as e:
             # Return an error message string on Ollama failure
@@ -99,6 +255,95 @@ class Agent:
              # Return an error message string on other exceptions
              return f"ERROR: Agent failed due to an unexpected error: {e}"
 
+    def _stream_response(self, messages: list, options: dict, priority: int = PRIORITY_INTERACTIVE, stage: Union[str, None] = None) -> Iterator[str]:
+        """Yields response text chunks as Ollama produces them.
+
+        Unlike the blocking path, errors are not converted to "ERROR:" strings here:
+        a failure can happen after some text was already yielded, so the caller decides.
+        The scheduler slot is held until the stream is exhausted or closed.
+        """
+        cache_key = self._response_cache_key(messages, options)
+        if cache_key:
+            started = time.perf_counter()
+            cached = llm_response_cache.get(cache_key)
+            if cached is not None:
+                self._record_call(stage, None, started, cached=True)
+                yield cached # Replayed in one piece
+                return
+
+        chunks = []
+        with llm_scheduler.slot(self.model, self.session_id, priority):
+            started = time.perf_counter()
+            # The span also covers the time the consumer spends between chunks (e.g. UI updates)
+            with tracer.span('ollama.chat', 'ollama', agent=self.name, model=self.model, stage=stage, stream=True):
+                for chunk in _get_client().chat(model=self.model, messages=messages, stream=True, options=options, keep_alive=OLLAMA_KEEP_ALIVE):
+                    if chunk.get('done'):
+                        self._record_call(stage, chunk, started) # Counts and durations arrive on the final chunk
+                    content = chunk['message']['content']
+                    if content:
+                        chunks.append(content)
+                        yield content
+        # Only a stream that ran to completion is cached (a closed generator never gets here)
+        if cache_key:
+            llm_response_cache.put(cache_key, "".join(chunks))
+
+    # Async counterpart of generate_response, using Ollama's AsyncClient. Same error conventions.
+    async def agenerate_response(self, user_prompt: str, stage: Union[str, None] = None, max_tokens: int = -1, retrieved_context: str = "", stream: bool = False,
+                                 priority: int = PRIORITY_INTERACTIVE, include_examples: bool = True) -> Union[str, AsyncIterator[str]]:
+        """Async version of generate_response()."""
+        messages = self._build_messages(user_prompt, stage=stage, retrieved_context=retrieved_context, include_examples=include_examples)
+        options = self._build_options(max_tokens)
+
+        if stream:
+            return self._astream_response(messages, options, priority, stage)
+
+        cache_key = self._response_cache_key(messages, options)
+        if cache_key:
+            started = time.perf_counter()
+            cached = llm_response_cache.get(cache_key)
+            if cached is not None:
+                self._record_call(stage, None, started, cached=True)
+                return cached.strip()
+
+        try:
+            async with llm_scheduler.aslot(self.model, self.session_id, priority):
+                started = time.perf_counter()
+                with tracer.span('ollama.chat', 'ollama', agent=self.name, model=self.model, stage=stage):
+                    response = await _get_async_client().chat(model=self.model, messages=messages, stream=False, options=options, keep_alive=OLLAMA_KEEP_ALIVE)
+            self._record_call(stage, response, started)
+            if cache_key:
+                llm_response_cache.put(cache_key, response['message']['content'])
+            return response['message']['content'].strip()
+        except ollama.ResponseError as e:
+            return f"ERROR: Agent failed to generate response due to Ollama error: {e}"
+        except Exception as e:
+             return f"ERROR: Agent failed due to an unexpected error: {e}"
+
+    async def _astream_response(self, messages: list, options: dict, priority: int = PRIORITY_INTERACTIVE, stage: Union[str, None] = None) -> AsyncIterator[str]:
+        """Async version of _stream_response(). Errors propagate to the caller."""
+        cache_key = self._response_cache_key(messages, options)
+        if cache_key:
+            started = time.perf_counter()
+            cached = llm_response_cache.get(cache_key)
+            if cached is not None:
+                self._record_call(stage, None, started, cached=True)
+                yield cached
+                return
+
+        chunks = []
+        async with llm_scheduler.aslot(self.model, self.session_id, priority):
+            started = time.perf_counter()
+            with tracer.span('ollama.chat', 'ollama', agent=self.name, model=self.model, stage=stage, stream=True):
+                async for chunk in await _get_async_client().chat(model=self.model, messages=messages, stream=True, options=options, keep_alive=OLLAMA_KEEP_ALIVE):
+                    if chunk.get('done'):
+                        self._record_call(stage, chunk, started)
+                    content = chunk['message']['content']
+                    if content:
+                        chunks.append(content)
+                        yield content
+        if cache_key:
+            llm_response_cache.put(cache_key, "".join(chunks))
+
     # The base Agent class does NOT implement the 'act' method.
     # Subclasses that need to participate in a debate turn MUST implement their own 'act' method.
     # Keeping a placeholder here to avoid errors when checking if method exists
@@ -118,48 +363,91 @@ class DebateAgent(Agent):
         super().__init__(name, role_type, model=model, retriever=retriever, agent_photo=agent_photo)
         self.stance = stance # Store the agent's stance ('Affirmative' or 'Negative')
 
-    # THIS IS THE ACT METHOD FOR ALL DEBATING AGENTS (Affirmative and Negative inherit this)
-    # It handles retrieving RAG context and formatting the prompt for debate stages.
-    def act(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None] = None) -> str:
-        """Generates an argument based on the debate stage, summary, and retrieved context."""
-        # Get the prompt template for the current stage from config
-        prompt_template = STAGE_PROMPTS.get(stage)
-        if not prompt_template:
-            return f"ERROR: Unknown debate stage '{stage}'"
-
-        retrieved_context = ""
+    # Formulates the knowledge base query for a turn, or returns None if this turn doesn't use RAG
+    def _build_retrieval_query(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None] = None) -> Union[str, None]:
+        """Returns the retriever query for this turn, or None if no retrieval should happen."""
         # Define which stages require RAG retrieval
         stages_using_rag = ['opening_statement', 'rebuttal', 'closing_statement']
         # Only retrieve if RAG is enabled, retriever is available for this agent, and the current stage uses RAG
-        if ENABLE_RAG and self.retriever and stage in stages_using_rag:
-            # Formulate a query for the retriever based on debate context and agent's task
-            query = f"Provide information relevant to debating the topic: '{debate_state.topic}' from the {self.stance} perspective."
-            if debate_summary and stage != 'opening_statement':
-                 # If in rebuttal, query might also be based on recent points from summary
-                 query += f" Specifically, provide information to rebut points made by the opposing side related to: {debate_summary[:200]}..." # Add part of summary to query
-            elif stage == 'closing_statement' and debate_summary:
-                 query += f" Specifically, provide information supporting key {self.stance} arguments summarized as: {debate_summary[:200]}..."
-
-            # print(f"--- {self.name} ({self.role_type}) querying KB for stage '{stage}' with query: {query[:100]}... ---", flush=True) # Removed Streamlit print
-            try:
-                # Retrieve top K documents using the retriever
-                # k is configured in rag_pipeline/config.py and passed when retriever is created
-                relevant_docs = self.retriever.get_relevant_documents(query)
-                if relevant_docs:
-                     # Format retrieved documents into a string for the prompt
-                     retrieved_context = "Relevant Information:\n" + "\n---\n".join([f"Source: {doc.metadata.get('source', 'N/A')}\nContent: {doc.page_content}" for doc in relevant_docs]) + "\n---\n"
-                     # print(f"--- Retrieved {len(relevant_docs)} documents for {self.name} ---", flush=True) # Removed Streamlit print
-                else:
-                     # print(f"--- No relevant documents found for {self.name}'s query ---", flush=True) # Removed Streamlit print
-                     pass # No context found
-
-            except Exception as e:
-                 # Return an internal error indicator if KB retrieval fails
-                 # print(f"Error during KB retrieval for {self.name}: {e}", flush=True) # Removed Streamlit print
-                 retrieved_context = f"ERROR_KB_RETRIEVAL: {e}"
-
+        if not (ENABLE_RAG and self.retriever and stage in stages_using_rag):
+            return None
+
+        # Formulate a query for the retriever based on debate context and agent's task
+        query = f"Provide information relevant to debating the topic: '{debate_state.topic}' from the {self.stance} perspective."
+        if debate_summary and stage != 'opening_statement':
+             # If in rebuttal, query might also be based on recent points from summary
+             query += f" Specifically, provide information to rebut points made by the opposing side related to: {debate_summary[:200]}..." # Add part of summary to query
+        elif stage == 'closing_statement' and debate_summary:
+             query += f" Specifically, provide information supporting key {self.stance} arguments summarized as: {debate_summary[:200]}..."
+        return query
+
+    # Retrieves documents through the shared cache, so teammates asking the same thing reuse one lookup.
+    # Whether the cache answered is recorded with this agent's metrics collector (per debate, unlike
+    # the cache's own process-wide counters). A prefetch isn't recorded; it only marks the entry it
+    # filled, so the turn that uses it later counts as prefetched rather than as a hit.
+    def _retrieve_documents(self, query: str, stage: Union[str, None] = None, prefetch: bool = False) -> list[Document]:
+        """Returns the top-k documents for a query, using the shared retrieval cache."""
+        k = getattr(self.retriever, 'search_kwargs', {}).get('k', RETRIEVER_K)
+        index_version = get_index_version(self.retriever)
+        key = retrieval_cache.make_key(query, k, index_version)
+        looked_up = []
+        def retrieve():
+            looked_up.append(True)
+            documents = self.retriever.get_relevant_documents(query)
+            if prefetch and self.metrics is not None:
+                self.metrics.note_prefetched(key) # Before the entry is stored, so no turn can see it unmarked
+            return documents
+        relevant_docs = retrieval_cache.get_or_retrieve(query, k, index_version, retrieve)
+        if self.metrics is not None and not prefetch:
+            self.metrics.record_retrieval_cache(self, stage, hit=not looked_up, key=key)
+        return relevant_docs
+
+    async def _aretrieve_documents(self, query: str, stage: Union[str, None] = None, prefetch: bool = False) -> list[Document]:
+        """Async version of _retrieve_documents()."""
+        k = getattr(self.retriever, 'search_kwargs', {}).get('k', RETRIEVER_K)
+        index_version = get_index_version(self.retriever)
+        key = retrieval_cache.make_key(query, k, index_version)
+        looked_up = []
+        async def retrieve():
+            looked_up.append(True)
+            documents = await self.retriever.ainvoke(query)
+            if prefetch and self.metrics is not None:
+                self.metrics.note_prefetched(key)
+            return documents
+        relevant_docs = await retrieval_cache.aget_or_retrieve(query, k, index_version, retrieve)
+        if self.metrics is not None and not prefetch:
+            self.metrics.record_retrieval_cache(self, stage, hit=not looked_up, key=key)
+        return relevant_docs
+
+    # Background lookups for the orchestrator's retrieval prefetch. A failure is only logged:
+    # the turn's own act() retrieves again and reports the error as usual.
+    def prefetch_documents(self, query: str, stage: Union[str, None] = None):
+        """Retrieves the documents for an upcoming turn into the shared retrieval cache."""
+        try:
+            with tracer.span('retrieval.prefetch', 'chroma', agent=self.name):
+                self._retrieve_documents(query, stage, prefetch=True)
+        except Exception as e:
+            print(f"Retrieval prefetch for {self.name} failed: {e}", flush=True)
 
-        # --- Format the user prompt for the LLM ---
+    async def aprefetch_documents(self, query: str, stage: Union[str, None] = None):
+        """Async version of prefetch_documents()."""
+        try:
+            with tracer.span('retrieval.prefetch', 'chroma', agent=self.name):
+                await self._aretrieve_documents(query, stage, prefetch=True)
+        except Exception as e:
+            print(f"Retrieval prefetch for {self.name} failed: {e}", flush=True)
+
+    @staticmethod
+    def _format_retrieved_docs(relevant_docs: list[Document]) -> str:
+        """Formats retrieved documents into the context string used in the prompt."""
+        if not relevant_docs:
+             return "" # No context found
+        return "Relevant Information:\n" + "\n---\n".join([f"Source: {doc.metadata.get('source', 'N/A')}\nContent: {doc.page_content}" for doc in relevant_docs]) + "\n---\n"
+
+    # Formats the stage prompt; returns (prompt, None) or (None, error string)
+    def _build_turn_prompt(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None], retrieved_context: str) -> tuple:
+        """Formats the user prompt for a debate turn."""
+        prompt_template = STAGE_PROMPTS[stage]
         prompt_args = {
              'topic': debate_state.topic,
              # Pass the retrieved_context string. If empty, the template will handle the placeholder.
@@ -174,22 +462,108 @@ class DebateAgent(Agent):
 
         # Format the user prompt text using the appropriate template and the collected arguments
         try: # Add try-except for prompt formatting errors
-             user_prompt_text = prompt_template.format(**prompt_args)
+             return prompt_template.format(**prompt_args), None
         except KeyError as e:
-             return f"ERROR_PROMPT_FORMAT: Missing key in prompt args: {e}. Prompt template: {prompt_template}"
+             return None, f"ERROR_PROMPT_FORMAT: Missing key in prompt args: {e}. Prompt template: {prompt_template}"
         except Exception as e:
-             return f"ERROR_PROMPT_FORMAT: An unexpected error occurred during prompt formatting: {e}. Prompt template: {prompt_template}"
+             return None, f"ERROR_PROMPT_FORMAT: An unexpected error occurred during prompt formatting: {e}. Prompt template: {prompt_template}"
+
+    # Builds the turn prompt within the context window (LLM_NUM_CTX), leaving room for max_tokens of output.
+    # Returns (prompt, error, include_examples); see PromptBudget for what gets dropped first.
+    def _fit_turn_prompt(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None], relevant_docs: list[Document],
+                         retrieval_error: Union[str, None], max_tokens: int) -> tuple:
+        """Formats the turn prompt, trimmed to the context window budget."""
+        def render(documents, summary):
+            retrieved_context = retrieval_error or self._format_retrieved_docs(documents)
+            return self._build_turn_prompt(debate_state, stage, summary, retrieved_context)
+
+        if not LLM_NUM_CTX:
+            user_prompt, error = render(relevant_docs, debate_summary)
+            return user_prompt, error, True
+
+        system_messages = self._message_prefixes[None]
+        example_messages = self._message_prefixes.get(stage, system_messages)[len(system_messages):]
+        # Only rebuttals and closing statements put the summary in the prompt
+        summary = debate_summary if stage in ['rebuttal', 'closing_statement'] else None
+        budget = PromptBudget(LLM_NUM_CTX, max_tokens)
+        user_prompt, error, include_examples, report = budget.fit(system_messages, example_messages, relevant_docs, summary, render)
+        self._record_prompt_budget(stage, report)
+        return user_prompt, error, include_examples
+
+
+    # THIS IS THE ACT METHOD FOR ALL DEBATING AGENTS (Affirmative and Negative inherit this)
+    # It handles retrieving RAG context and formatting the prompt for debate stages.
+    def act(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None] = None, stream: bool = False,
+            priority: int = PRIORITY_INTERACTIVE) -> Union[str, Iterator[str]]:
+        """Generates an argument based on the debate stage, summary, and retrieved context."""
+        with tracer.span('act', 'agent', agent=self.name, role=self.role_type, stage=stage):
+            return self._act(debate_state, stage, debate_summary, stream, priority)
+
+    def _act(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None], stream: bool, priority: int) -> Union[str, Iterator[str]]:
+        # Check there is a prompt template for the current stage in config
+        if not STAGE_PROMPTS.get(stage):
+            return f"ERROR: Unknown debate stage '{stage}'"
 
+        relevant_docs = []
+        retrieval_error = None
+        query = self._build_retrieval_query(debate_state, stage, debate_summary)
+        if query:
+            started = time.perf_counter()
+            try:
+                # Retrieve top K documents using the retriever
+                # k is configured in rag_pipeline/config.py and passed when retriever is created
+                with tracer.span('retrieval', 'chroma', agent=self.name, stage=stage):
+                    relevant_docs = self._retrieve_documents(query, stage)
+            except Exception as e:
+                 # Pass an internal error indicator instead of context if KB retrieval fails
+                 retrieval_error = f"ERROR_KB_RETRIEVAL: {e}"
+            self._record_timing('retrieval', stage, started)
 
         # Get the max tokens limit for this specific stage from config
         max_tokens = MAX_TOKENS_PER_STAGE.get(stage, -1)
 
+        # --- Format the user prompt for the LLM, within the context window ---
+        user_prompt_text, error, include_examples = self._fit_turn_prompt(debate_state, stage, debate_summary, relevant_docs, retrieval_error, max_tokens)
+        if error:
+             return error
+
         # Call the generate_response method from the parent Agent class
-        # Pass the formatted prompt, stage, max_tokens, and the retrieved_context string
-        argument = self.generate_response(user_prompt_text, stage=stage, max_tokens=max_tokens, retrieved_context=retrieved_context)
+        # The retrieved context is already part of the formatted prompt, so it isn't passed separately
+        # With stream=True this is a chunk iterator; errors above are still returned as plain strings
+        argument = self.generate_response(user_prompt_text, stage=stage, max_tokens=max_tokens, stream=stream, priority=priority, include_examples=include_examples)
 
         return argument
 
+    # Async counterpart of act(): uses the retriever's async entry point and Ollama's AsyncClient
+    async def aact(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None] = None, stream: bool = False,
+                   priority: int = PRIORITY_INTERACTIVE) -> Union[str, AsyncIterator[str]]:
+        """Async version of act()."""
+        with tracer.span('act', 'agent', agent=self.name, role=self.role_type, stage=stage):
+            return await self._aact(debate_state, stage, debate_summary, stream, priority)
+
+    async def _aact(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None], stream: bool, priority: int) -> Union[str, AsyncIterator[str]]:
+        if not STAGE_PROMPTS.get(stage):
+            return f"ERROR: Unknown debate stage '{stage}'"
+
+        relevant_docs = []
+        retrieval_error = None
+        query = self._build_retrieval_query(debate_state, stage, debate_summary)
+        if query:
+            started = time.perf_counter()
+            try:
+                with tracer.span('retrieval', 'chroma', agent=self.name, stage=stage):
+                    relevant_docs = await self._aretrieve_documents(query, stage)
+            except Exception as e:
+                 retrieval_error = f"ERROR_KB_RETRIEVAL: {e}"
+            self._record_timing('retrieval', stage, started)
+
+        max_tokens = MAX_TOKENS_PER_STAGE.get(stage, -1)
+        user_prompt_text, error, include_examples = self._fit_turn_prompt(debate_state, stage, debate_summary, relevant_docs, retrieval_error, max_tokens)
+        if error:
+             return error
+
+        return await self.agenerate_response(user_prompt_text, stage=stage, max_tokens=max_tokens, stream=stream, priority=priority, include_examples=include_examples)
+
 
 # --- Specific Debating Agent Classes ---
 # Inherit from DebateAgent (and thus inherit the act method from DebateAgent)
@@ -221,43 +595,67 @@ class JudgeAgent(Agent):
         # Judge doesn't use RAG for its output generation task, so we pass retriever=None to Agent init
         super().__init__(name, 'JudgeAgent', model=model, retriever=None, agent_photo=agent_photo)
 
-    # THIS IS THE ACT METHOD SPECIFICALLY FOR THE JUDGE AGENT
-    # It overrides the base Agent.act (which raises NotImplementedError)
-    # It handles getting summary and formatting prompt for judge analysis.
-    def act(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None] = None) -> str:
-        """Analyzes the debate history and provides commentary based on summary."""
+    # Validates the stage/summary and formats the judge prompt; returns (prompt, None) or (None, error string)
+    def _build_judge_prompt(self, stage: str, debate_summary: Union[str, None]) -> tuple:
+        """Formats the user prompt for the judge analysis."""
         # Judge's act method only needs the stage name 'judge_analysis' and the summary
         # Check if the stage is correct, although Orchestrator should call with 'judge_analysis'
         if stage != 'judge_analysis':
              # This should not happen if Orchestrator is correct
-             return f"ERROR: Judge act called with incorrect stage: '{stage}'"
+             return None, f"ERROR: Judge act called with incorrect stage: '{stage}'"
 
         # Get the prompt template for judge analysis
         prompt_template = STAGE_PROMPTS.get(stage)
         if not prompt_template:
-            return f"ERROR: Judge analysis prompt template not found."
+            return None, f"ERROR: Judge analysis prompt template not found."
 
         # Judge prompt specifically uses the summary, requires summary to be provided
         if debate_summary is None:
-             return "ERROR: Judge could not get summary."
+             return None, "ERROR: Judge could not get summary."
 
         # Format the user prompt for the LLM using the template and summary
         try: # Add try-except for prompt formatting errors
-             user_prompt = prompt_template.format(summary=debate_summary)
+             return prompt_template.format(summary=debate_summary), None
         except KeyError as e:
-             return f"ERROR_PROMPT_FORMAT: Missing key in prompt args: {e}. Prompt template: {prompt_template}"
+             return None, f"ERROR_PROMPT_FORMAT: Missing key in prompt args: {e}. Prompt template: {prompt_template}"
         except Exception as e:
-             return f"ERROR_PROMPT_FORMAT: An unexpected error occurred during prompt formatting: {e}. Prompt template: {prompt_template}"
+             return None, f"ERROR_PROMPT_FORMAT: An unexpected error occurred during prompt formatting: {e}. Prompt template: {prompt_template}"
 
+    # THIS IS THE ACT METHOD SPECIFICALLY FOR THE JUDGE AGENT
+    # It overrides the base Agent.act (which raises NotImplementedError)
+    # It handles getting summary and formatting prompt for judge analysis.
+    def act(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None] = None, stream: bool = False,
+            priority: int = PRIORITY_INTERACTIVE) -> Union[str, Iterator[str]]:
+        """Analyzes the debate history and provides commentary based on summary."""
+        with tracer.span('act', 'agent', agent=self.name, role=self.role_type, stage=stage):
+            user_prompt, error = self._build_judge_prompt(stage, debate_summary)
+            if error:
+                 return error
 
-        # Get the max tokens limit for the judge stage
-        max_tokens = MAX_TOKENS_PER_STAGE.get(stage, -1)
+            # Get the max tokens limit for the judge stage
+            max_tokens = MAX_TOKENS_PER_STAGE.get(stage, -1)
+            # A summary too long for the context window loses its start
+            user_prompt, include_examples = self._fit_text_prompt(stage, debate_summary, lambda summary: self._build_judge_prompt(stage, summary)[0], max_tokens)
+
+            # Call generate_response. Judge's task doesn't involve retrieving RAG context
+            # for its output, so retrieved_context is an empty string.
+            analysis = self.generate_response(user_prompt, stage=stage, max_tokens=max_tokens, retrieved_context="", stream=stream, priority=priority,
+                                              include_examples=include_examples)
 
-        # Call generate_response. Judge's task doesn't involve retrieving RAG context
-        # for its output, so retrieved_context is an empty string.
-        analysis = self.generate_response(user_prompt, stage=stage, max_tokens=max_tokens, retrieved_context="")
+            return analysis
 
-        return analysis
+    async def aact(self, debate_state: DebateState, stage: str, debate_summary: Union[str, None] = None, stream: bool = False,
+                   priority: int = PRIORITY_INTERACTIVE) -> Union[str, AsyncIterator[str]]:
+        """Async version of act()."""
+        with tracer.span('act', 'agent', agent=self.name, role=self.role_type, stage=stage):
+            user_prompt, error = self._build_judge_prompt(stage, debate_summary)
+            if error:
+                 return error
+
+            max_tokens = MAX_TOKENS_PER_STAGE.get(stage, -1)
+            user_prompt, include_examples = self._fit_text_prompt(stage, debate_summary, lambda summary: self._build_judge_prompt(stage, summary)[0], max_tokens)
+            return await self.agenerate_response(user_prompt, stage=stage, max_tokens=max_tokens, retrieved_context="", stream=stream, priority=priority,
+                                                 include_examples=include_examples)
 
 
 # --- Debate Orchestrator Class ---
@@ -265,7 +663,9 @@ class JudgeAgent(Agent):
 class DebateOrchestrator(Agent):
     """Manages the flow of the debate."""
     # __init__ signature: 3 positional (self, name, debate_state, agents), then keyword-only (*)
-    def __init__(self, name: str, debate_state: DebateState, agents: list[Agent], *, model: str = 'llama3'):
+    def __init__(self, name: str, debate_state: DebateState, agents: list[Agent], *, model: str = 'llama3', stream_responses: bool = STREAM_RESPONSES,
+                 parallel_turns: bool = PARALLEL_STAGE_TURNS, max_parallel_turns: int = MAX_PARALLEL_TURNS, session_id: Union[str, None] = None,
+                 priority: int = PRIORITY_INTERACTIVE):
          # Call parent Agent's __init__. Pass name positionally, role_type ('DebateOrchestrator') positionally, then keywords.
          # Orchestrator doesn't need retriever or agent_photo for its base Agent identity
          super().__init__(name, 'DebateOrchestrator', model=model, retriever=None, agent_photo=None)
@@ -279,6 +679,17 @@ class DebateOrchestrator(Agent):
          self.negative_agents = [a for a in self.agents if isinstance(a, NegativeAgent)]
          self.judge_agent = next((a for a in self.agents if isinstance(a, JudgeAgent)), None)
 
+         # Tag every LLM call of this debate with its session so the shared scheduler can interleave sessions fairly
+         self.session_id = session_id
+         for agent in self.agents:
+             agent.session_id = session_id
+         # Scheduler priority of this debate's calls: PRIORITY_BACKGROUND when nobody is watching it live (batch runs)
+         self.priority = priority
+
+         # One metrics collector for every LLM call, retrieval and summary of this debate
+         self.metrics = DebateMetrics()
+         for agent in self.agents:
+             agent.metrics = self.metrics
 
          if not self.affirmative_agents or not self.negative_agents:
              # Removed Streamlit error here, raise Python ValueError
@@ -287,77 +698,332 @@ class DebateOrchestrator(Agent):
          self.turn_delay_seconds = 1 # Delay between turns
          self.summary_model = SUMMARY_MODEL
          self.summary_system_prompt = AGENT_SYSTEM_PROMPTS.get('Summarizer').format() if AGENT_SYSTEM_PROMPTS.get('Summarizer') else ""
+         # When True, run_debate yields 'argument_delta' events while each argument is generated
+         self.stream_responses = stream_responses
+
+         # When True, independent turns within a stage run concurrently (see _run_stage)
+         self.parallel_turns = parallel_turns
+         self.max_parallel_turns = max(1, max_parallel_turns)
+
+         # Retrieval cache hits/misses during the last debate run (see _retrieval_stats_since)
+         self.retrieval_stats = {"hits": 0, "misses": 0, "prefetched": 0}
+         # Breakdown of the last debate run (DebateMetrics.report), set when the run completes
+         self.metrics_report = None
+         # Trace file written for the last debate run (only when tracing is enabled)
+         self.trace_path = None
+         # Trace of the current (or last) run, see _start_trace
+         self.trace_id = None
+
+         # Rolling summary state: last successful summary and how many history entries it covers
+         self._last_summary = None
+         self._summarized_upto = 0
+
+    # Method to generate a summary of debate history (used internally by orchestrator)
+    # Decides what the next summary call needs to send.
+    # Returns (summary, None, history_len) when no LLM call is needed, else (None, user_prompt, history_len).
+    def _prepare_summary(self) -> tuple:
+        """Builds the summarization prompt for the rolling summary."""
+        history_len = len(self.debate_state.history)
+        if history_len == 0:
+             return "No debate history to summarize yet.", None, history_len
+
+        # History can only shrink if the state was swapped or reset; start over in that case
+        if self._summarized_upto > history_len:
+             self._last_summary = None
+             self._summarized_upto = 0
+
+        if self._last_summary is not None and self._summarized_upto == history_len:
+             print("--- No new arguments since last summary. Reusing it. ---", flush=True)
+             return self._last_summary, None, history_len
+
+        if self._last_summary is None:
+             # First summary of this debate: summarize the full history
+             # Only the arguments are fitted to the window; the topic header is added back by render
+             history_text = self.debate_state.get_history_body()
+             debate_state = self.debate_state
+             render = lambda history: SUMMARY_PROMPT_TEMPLATE.format(debate_history=debate_state.format_history_text(history))
+        else:
+             # Fold only the new arguments into the previous summary
+             history_text = self.debate_state.get_history_text_since(self._summarized_upto)
+             previous_summary = self._last_summary
+             render = lambda new_arguments: INCREMENTAL_SUMMARY_PROMPT_TEMPLATE.format(previous_summary=previous_summary, new_arguments=new_arguments)
+        # History that doesn't fit the context window loses its oldest arguments
+        user_prompt, _ = self._fit_text_prompt('summary', history_text, render, MAX_SUMMARY_TOKENS, section='history')
+        return None, user_prompt, history_len
+
+    def _record_summary(self, summary: str, history_len: int):
+        """Stores a freshly generated summary as the base for the next incremental call."""
+        # Only advance the watermark on success so a failed call is retried in full next time
+        if not summary.startswith("ERROR:"):
+             self._last_summary = summary
+             self._summarized_upto = history_len
 
     # Method to generate a summary of debate history (used internally by orchestrator)
     def _generate_summary(self) -> str:
-        """Generates a summary of the current debate history using an LLM."""
+        """Generates a summary of the debate history using an LLM.
+
+        The summary is rolling: after the first call only the arguments added since the
+        last successful summary are sent, together with that previous summary. If nothing
+        was added since, the previous summary is returned without calling the LLM.
+        """
         # print messages to console
         print("\n--- Orchestrator is summarizing debate history... ---", flush=True)
+        started = time.perf_counter()
 
-        history_text = self.debate_state.get_history_text()
-        if not history_text.strip() or "-- Debate History --\nNo arguments yet.\n\n-- End of History --" in history_text:
-             return "No debate history to summarize yet."
+        ready_summary, user_prompt, history_len = self._prepare_summary()
+        if ready_summary is not None:
+             self._record_timing('summary', 'summary', started)
+             return ready_summary
 
-        user_prompt = SUMMARY_PROMPT_TEMPLATE.format(debate_history=history_text)
+        try:
+            # Use the generate_response method from the base Agent class for summary generation
+            # The orchestrator is an Agent, so it can call its own generate_response
+            with tracer.span('summary', 'orchestrator', history_turns=history_len):
+                summary = self.generate_response(user_prompt, stage='summary', max_tokens=MAX_SUMMARY_TOKENS, retrieved_context="", priority=self.priority)
+            print("--- Summary Generated ---", flush=True)
+            self._record_summary(summary, history_len)
+        except Exception as e:
+            print(f"Error during summarization from Ollama: {e}", flush=True)
+            summary = f"ERROR: Failed to generate summary due to error: {e}"
+        self._record_timing('summary', 'summary', started)
+        return summary
 
-        messages = []
-        if self.summary_system_prompt:
-            messages.append({'role': 'system', 'content': self.summary_system_prompt})
-        messages.append({'role': 'user', 'content': user_prompt})
+    async def _agenerate_summary(self) -> str:
+        """Async version of _generate_summary()."""
+        print("\n--- Orchestrator is summarizing debate history... ---", flush=True)
+        started = time.perf_counter()
 
-        options = {}
-        if MAX_SUMMARY_TOKENS > 0:
-            options['num_predict'] = MAX_SUMMARY_TOKENS
+        ready_summary, user_prompt, history_len = self._prepare_summary()
+        if ready_summary is not None:
+             self._record_timing('summary', 'summary', started)
+             return ready_summary
 
         try:
-            # Use the generate_response method from the base Agent class for summary generation
-            # The orchestrator is an Agent, so it can call its own generate_response
-            summary = self.generate_response(user_prompt, stage='summary', max_tokens=MAX_SUMMARY_TOKENS, retrieved_context="")
+            with tracer.span('summary', 'orchestrator', history_turns=history_len):
+                summary = await self.agenerate_response(user_prompt, stage='summary', max_tokens=MAX_SUMMARY_TOKENS, retrieved_context="", priority=self.priority)
             print("--- Summary Generated ---", flush=True)
-            return summary
+            self._record_summary(summary, history_len)
         except Exception as e:
             print(f"Error during summarization from Ollama: {e}", flush=True)
-            return f"ERROR: Failed to generate summary due to error: {e}"
+            summary = f"ERROR: Failed to generate summary due to error: {e}"
+        self._record_timing('summary', 'summary', started)
+        return summary
 
 
+    # Runs one agent's act() and returns the final argument text.
+    # This is a generator: in streaming mode it yields 'argument_delta' events as chunks arrive.
+    def _collect_argument(self, agent: Agent, stage: str, debate_summary: Union[str, None]):
+        """Gets an agent's argument for a stage, yielding 'argument_delta' events when streaming."""
+        if not self.stream_responses:
+            return agent.act(self.debate_state, stage, debate_summary=debate_summary, priority=self.priority)
+
+        result = agent.act(self.debate_state, stage, debate_summary=debate_summary, stream=True, priority=self.priority)
+        if isinstance(result, str):
+            # act() failed before generation started (e.g. prompt formatting) and returned an error string
+            return result
+
+        chunks = []
+        try:
+            for chunk in result:
+                chunks.append(chunk)
+                yield {"type": "argument_delta", "agent_name": agent.name, "agent_role": agent.role_type, "delta": chunk, "agent_photo": agent.agent_photo}
+        except ollama.ResponseError as e:
+            return f"ERROR: Agent failed to generate response due to Ollama error: {e}"
+        except Exception as e:
+            return f"ERROR: Agent failed due to an unexpected error: {e}"
+        return "".join(chunks).strip()
+
+    # Runs a single debater turn: status event, (optional) deltas, history update and final argument event
+    def _run_turn(self, agent: Agent, stage: str, debate_summary: Union[str, None], round_index: int = 0):
+        """Runs one debater turn and yields its UI events."""
+        # Yield status indicating who is speaking
+        yield {"type": "status", "message": f"{agent.name} ({agent.role_type}) speaking..."}
+        argument_text = yield from self._collect_argument(agent, stage, debate_summary)
+        # Add argument to debate history if not an error
+        if not argument_text.startswith("ERROR:"):
+            self.debate_state.add_argument(agent.name, agent.role_type, argument_text, stage=stage, round_index=round_index)
+        # Yield the argument for the UI
+        yield {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": argument_text, "agent_photo": agent.agent_photo}
+        # Optional: Add a small pause between agents within a stage
+        # time.sleep(self.turn_delay_seconds)
+
+
+    # --- Retrieval Prefetch ---
+    # A debater's retrieval query only depends on the topic, its stance, the stage and the stage's
+    # summary, so every query of a stage is known when it starts. In sequential stages, as each
+    # speaker's turn begins, the lookups of the next RETRIEVAL_PREFETCH_SPEAKERS pending speakers are
+    # started in the background and fill the shared retrieval cache while the current speaker's LLM
+    # call runs; their own act() then finds the documents cached (or waits for the lookup in flight).
+
+    def _prefetch_candidates(self, pending: list[Agent], agent: Agent) -> list[Agent]:
+        """The pending speakers right after `agent` whose retrieval should be prefetched now."""
+        if RETRIEVAL_PREFETCH_SPEAKERS <= 0 or retrieval_cache.max_entries <= 0 or agent not in pending:
+            return []
+        index = pending.index(agent)
+        return [a for a in pending[index + 1:index + 1 + RETRIEVAL_PREFETCH_SPEAKERS] if isinstance(a, DebateAgent)]
+
+    def _prefetch_queries(self, agents: list[Agent], stage: str, debate_summary: Union[str, None], prefetched: set) -> list[tuple]:
+        """Returns (agent, query) for each agent not prefetched yet that retrieves in this stage; marks them prefetched."""
+        queries = []
+        for agent in agents:
+            if agent.name in prefetched:
+                continue
+            prefetched.add(agent.name)
+            query = agent._build_retrieval_query(self.debate_state, stage, debate_summary)
+            if query:
+                queries.append((agent, query))
+        return queries
+
+    # --- Resuming ---
+    # A DebateState loaded from a store already holds the turns completed before a crash. Those
+    # turns are replayed as 'argument' events (marked "replayed") instead of being generated again.
+
+    def _pending_agents(self, stage_agents: list[Agent], stage: str, round_index: int = 0) -> list[Agent]:
+        """Returns the agents whose turn in this stage/round is not in the debate state yet."""
+        return [agent for agent in stage_agents if self.debate_state.get_turn(stage, round_index, agent.name) is None]
+
+    @staticmethod
+    def _replayed_argument_event(agent: Agent, entry: dict) -> dict:
+        """The 'argument' event for a turn restored from the store."""
+        return {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": entry['argument'], "agent_photo": agent.agent_photo, "replayed": True}
+
+    # Runs every agent's turn for one stage, in speaking order.
+    # Turns within a stage don't depend on each other (they share the same summary), so in
+    # parallel mode all act() calls are started up front on a bounded worker pool and the
+    # results are committed to DebateState and yielded in the original order as they complete.
+    # Only the first speaker's call is interactive; the rest queue behind other sessions' current turns.
+    def _run_stage(self, stage_agents: list[Agent], stage: str, debate_summary: Union[str, None], round_index: int = 0):
+        """Runs all turns of a stage, sequentially or on a worker pool. Completed turns are replayed."""
+        pending = self._pending_agents(stage_agents, stage, round_index)
+        if not self.parallel_turns or len(pending) <= 1:
+            prefetched = set() # Names of the agents whose retrieval was already started
+            prefetch_executor = None
+            try:
+                for agent in stage_agents:
+                    entry = self.debate_state.get_turn(stage, round_index, agent.name)
+                    if entry is not None:
+                        yield self._replayed_argument_event(agent, entry)
+                        continue
+                    for upcoming, query in self._prefetch_queries(self._prefetch_candidates(pending, agent), stage, debate_summary, prefetched):
+                        if prefetch_executor is None:
+                            prefetch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=RETRIEVAL_PREFETCH_SPEAKERS, thread_name_prefix="retrieval-prefetch")
+                        # copy_context() carries the debate's trace (see run_debate) into the worker thread
+                        prefetch_executor.submit(contextvars.copy_context().run, upcoming.prefetch_documents, query, stage)
+                    yield from self._run_turn(agent, stage, debate_summary, round_index)
+            finally:
+                if prefetch_executor is not None:
+                    prefetch_executor.shutdown(wait=False, cancel_futures=True)
+            return
+
+        # Parallel turns are not streamed: interleaved deltas from several speakers would be unreadable
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_parallel_turns)
+        try:
+            futures = {agent.name: executor.submit(contextvars.copy_context().run, agent.act, self.debate_state, stage, debate_summary=debate_summary,
+                                                   priority=self.priority if index == 0 else PRIORITY_BACKGROUND)
+                       for index, agent in enumerate(pending)}
+            for agent in stage_agents:
+                entry = self.debate_state.get_turn(stage, round_index, agent.name)
+                if entry is not None:
+                    yield self._replayed_argument_event(agent, entry)
+                    continue
+                yield {"type": "status", "message": f"{agent.name} ({agent.role_type}) speaking..."}
+                try:
+                    argument_text = futures[agent.name].result()
+                except Exception as e:
+                    argument_text = f"ERROR: Agent failed due to an unexpected error: {e}"
+                if not argument_text.startswith("ERROR:"):
+                    self.debate_state.add_argument(agent.name, agent.role_type, argument_text, stage=stage, round_index=round_index)
+                yield {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": argument_text, "agent_photo": agent.agent_photo}
+        finally:
+            # Don't block if the consumer stops the debate mid-stage; drop turns that haven't started
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+    def _retrieval_stats_since(self, start: int) -> dict:
+        """Returns the retrieval cache hits/misses/prefetched of this debate's agents since metrics position `start`.
+
+        Counted through the debate's own metrics collector, so debates running at the same time don't
+        show up in each other's numbers (the cache's own counters are process-wide).
+        """
+        totals = self.metrics.summarize(start)
+        return {"hits": totals['retrieval_cache_hits'], "misses": totals['retrieval_cache_misses'],
+                "prefetched": totals['retrieval_cache_prefetched']}
+
+    # --- Metrics Events ---
+    # Stages are delimited by their 'stage' events, so run_debate()/arun_debate() wrap the debate
+    # flow and insert a 'metrics' event whenever a stage ends (covering its summary and turns),
+    # then a per-debate report once the flow is done. The same boundaries close the stage and
+    # debate trace spans. Everything the run records goes into its own trace (see _start_trace), which
+    # is written out when the run ends, also when it fails or is stopped early.
+
+    def _stage_metrics_event(self, stage_name: str, start: int, started: float) -> dict:
+        tracer.complete(stage_name.strip('- '), 'stage', started, session=self.session_id)
+        return {"type": "metrics", "scope": "stage", "stage_name": stage_name, "metrics": self.metrics.summarize(start)}
+
+    def _debate_metrics_event(self, start: int, started: float) -> dict:
+        self.metrics_report = self.metrics.report(start)
+        print(f"--- Debate metrics ---\n{DebateMetrics.format_report(self.metrics_report)}", flush=True)
+        tracer.complete('debate', 'stage', started, session=self.session_id, topic=self.debate_state.topic)
+        return {"type": "metrics", "scope": "debate", "metrics": self.metrics_report}
+
+    def _start_trace(self) -> str:
+        # A new trace per run: a stopped run can still be exporting while the same session starts the next one.
+        # Kept on the orchestrator so the UI can add its own markers to the run it is showing.
+        self.trace_id = tracer.new_trace(self.session_id or self.debate_state.debate_id or "debate")
+        return self.trace_id
+
+    def _export_trace(self, trace_id: str):
+        """Writes the spans of one run of this debate to TRACE_OUTPUT_DIR, if tracing is enabled."""
+        if not tracer.enabled:
+            return
+        label = self.debate_state.debate_id or self.session_id or "debate"
+        self.trace_path = tracer.export(os.path.join(TRACE_OUTPUT_DIR, f"trace_{label}_{int(time.time() * 1000)}.json"), trace_id)
+        if self.trace_path:
+            print(f"--- Trace written to {self.trace_path} ---", flush=True)
+
     # Main method to run the debate flow
     # This is a generator function that yields events back to the UI
     def run_debate(self, num_rebuttal_rounds: int):
-        """Runs the full debate sequence, yielding output for the UI."""
+        """Runs the full debate sequence, yielding output for the UI (plus 'metrics' events)."""
+        trace_id = self._start_trace()
+        with tracer.bound(trace_id):
+            try:
+                debate_start, debate_started = self.metrics.mark(), time.perf_counter()
+                stage_name, stage_start, stage_started = None, debate_start, debate_started
+                for event in self._debate_flow(num_rebuttal_rounds):
+                    if event["type"] == "stage":
+                        if stage_name is not None:
+                            yield self._stage_metrics_event(stage_name, stage_start, stage_started)
+                        stage_name, stage_start, stage_started = event["stage_name"], self.metrics.mark(), time.perf_counter()
+                    yield event
+                if stage_name is not None:
+                    yield self._stage_metrics_event(stage_name, stage_start, stage_started)
+                yield self._debate_metrics_event(debate_start, debate_started)
+            finally:
+                self._export_trace(trace_id)
+
+    def _debate_flow(self, num_rebuttal_rounds: int):
+        """The debate itself: stages, summaries and turns, as UI events."""
+        metrics_start = self.metrics.mark()
         # Yield messages for the UI
         yield {"type": "status", "message": "Starting Debate...", "topic": self.debate_state.topic}
         yield {"type": "stage", "stage_name": "Opening Statements"}
 
         # Opening Statements Stage
-        # Affirmative Team's Opening Statements
-        for agent in self.affirmative_agents:
-             # Yield status indicating who is speaking
-             yield {"type": "status", "message": f"{agent.name} ({agent.role_type}) speaking..."}
-             # Call the agent's act method
-             argument_text = agent.act(self.debate_state, 'opening_statement', debate_summary=None) # Opening needs no summary
-             # Add argument to debate history if not an error
-             if not argument_text.startswith("ERROR:"):
-                 self.debate_state.add_argument(agent.name, agent.role_type, argument_text)
-             # Yield the argument for the UI
-             yield {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": argument_text, "agent_photo": agent.agent_photo}
-             # Optional: Add a small pause between agents within a stage
-             # time.sleep(self.turn_delay_seconds)
-
-        # Negative Team's Opening Statements
-        for agent in self.negative_agents:
-             yield {"type": "status", "message": f"{agent.name} ({agent.role_type}) speaking..."}
-             argument_text = agent.act(self.debate_state, 'opening_statement', debate_summary=None)
-             if not argument_text.startswith("ERROR:"):
-                 self.debate_state.add_argument(agent.name, agent.role_type, argument_text)
-             yield {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": argument_text, "agent_photo": agent.agent_photo}
-             # Optional: Add a small pause
-             # time.sleep(self.turn_delay_seconds)
+        # Affirmative Team first, then Negative Team. Opening needs no summary.
+        yield from self._run_stage(self.affirmative_agents + self.negative_agents, 'opening_statement', None)
 
 
         # Rebuttal Rounds Stage
+        debaters = self.affirmative_agents + self.negative_agents
         for i in range(num_rebuttal_rounds):
             yield {"type": "stage", "stage_name": f"--- Rebuttal Round {i+1} ---"}
 
+            if not self._pending_agents(debaters, 'rebuttal', i + 1):
+                # Resumed debate: this whole round is already stored, so no summary is needed to replay it
+                yield from self._run_stage(debaters, 'rebuttal', None, round_index=i + 1)
+                continue
+
             # Summarize debate history before each rebuttal round
             yield {"type": "status", "message": "Orchestrator summarizing debate..."}
             self.current_summary = self._generate_summary()
@@ -368,65 +1034,34 @@ class DebateOrchestrator(Agent):
                  yield {"type": "status", "message": f"Skipping remaining debate due to summarization error: {self.current_summary}"}
                  break # Stop the debate loop if summarization fails
 
-            # Affirmative Team's Rebuttals
-            for agent in self.affirmative_agents:
-                 yield {"type": "status", "message": f"{agent.name} ({agent.role_type}) speaking..."}
-                 # Pass the current debate summary to the agent's act method
-                 argument_text = agent.act(self.debate_state, 'rebuttal', debate_summary=self.current_summary)
-                 if not argument_text.startswith("ERROR:"):
-                     self.debate_state.add_argument(agent.name, agent.role_type, argument_text)
-                 yield {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": argument_text, "agent_photo": agent.agent_photo}
-                 # Optional: Add a pause
-                 # time.sleep(self.turn_delay_seconds)
-
-            # Negative Team's Rebuttals
-            for agent in self.negative_agents:
-                 yield {"type": "status", "message": f"{agent.name} ({agent.role_type}) speaking..."}
-                 argument_text = agent.act(self.debate_state, 'rebuttal', debate_summary=self.current_summary)
-                 if not argument_text.startswith("ERROR:"):
-                     self.debate_state.add_argument(agent.name, agent.role_type, argument_text)
-                 yield {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": argument_text, "agent_photo": agent.agent_photo}
-                 # Optional: Add a pause
-                 # time.sleep(self.turn_delay_seconds)
+            # Affirmative Team's Rebuttals, then Negative Team's, all against the current debate summary
+            yield from self._run_stage(debaters, 'rebuttal', self.current_summary, round_index=i + 1)
 
 
         # Closing Statements Stage
         yield {"type": "stage", "stage_name": "Closing Statements"}
 
-        # Summarize debate history before closing statements
-        yield {"type": "status", "message": "Orchestrator summarizing debate..."}
-        self.current_summary = self._generate_summary()
-        yield {"type": "status", "message": "Summary Generated."}
+        # Summarize debate history before closing statements (unless they are all stored already)
+        if self._pending_agents(debaters, 'closing_statement'):
+            yield {"type": "status", "message": "Orchestrator summarizing debate..."}
+            self.current_summary = self._generate_summary()
+            yield {"type": "status", "message": "Summary Generated."}
+        else:
+            self.current_summary = None
 
         # Check if summarization failed
         if isinstance(self.current_summary, str) and self.current_summary.startswith("ERROR:"):
              yield {"type": "status", "message": f"Skipping closing statements and judge due to summarization error: {self.current_summary}"}
         else:
-            # Affirmative Team's Closing Statements
-            for agent in self.affirmative_agents:
-                 yield {"type": "status", "message": f"{agent.name} ({agent.role_type}) speaking..."}
-                 # Pass the current debate summary
-                 argument_text = agent.act(self.debate_state, 'closing_statement', debate_summary=self.current_summary)
-                 if not argument_text.startswith("ERROR:"):
-                     self.debate_state.add_argument(agent.name, agent.role_type, argument_text)
-                 yield {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": argument_text, "agent_photo": agent.agent_photo}
-                 # Optional: Add a pause
-                 # time.sleep(self.turn_delay_seconds)
-
-            # Negative Team's Closing Statements
-            for agent in self.negative_agents:
-                 yield {"type": "status", "message": f"{agent.name} ({agent.role_type}) speaking..."}
-                 # Pass the current debate summary
-                 argument_text = agent.act(self.debate_state, 'closing_statement', debate_summary=self.current_summary)
-                 if not argument_text.startswith("ERROR:"):
-                     self.debate_state.add_argument(agent.name, agent.role_type, argument_text)
-                 yield {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": argument_text, "agent_photo": agent.agent_photo}
-                 # Optional: Add a pause
-                 # time.sleep(self.turn_delay_seconds)
+            # Affirmative Team's Closing Statements, then Negative Team's
+            yield from self._run_stage(debaters, 'closing_statement', self.current_summary)
 
 
             # Judge Analysis Stage (Optional)
-            if self.judge_agent:
+            if self.judge_agent and self.debate_state.judge_analysis:
+                yield {"type": "stage", "stage_name": "Judge Analysis"}
+                yield self._replayed_argument_event(self.judge_agent, self.debate_state.judge_analysis)
+            elif self.judge_agent:
                 yield {"type": "stage", "stage_name": "Judge Analysis"}
                 # Summarize debate history for the judge's analysis
                 yield {"type": "status", "message": "Orchestrator summarizing debate for Judge..."}
@@ -438,10 +1073,186 @@ class DebateOrchestrator(Agent):
                      yield {"type": "status", "message": f"Skipping judge analysis due to summarization error: {final_summary}"}
                 else:
                      # Call the Judge agent's act method, passing the final summary
-                    analysis = self.judge_agent.act(self.debate_state, stage='judge_analysis', debate_summary=final_summary)
+                    analysis = yield from self._collect_argument(self.judge_agent, 'judge_analysis', final_summary)
+                    if not analysis.startswith("ERROR:"):
+                        self.debate_state.set_judge_analysis(self.judge_agent.name, self.judge_agent.role_type, analysis)
                     # Yield the judge's analysis argument
                     yield {"type": "argument", "agent_name": self.judge_agent.name, "agent_role": self.judge_agent.role_type, "argument": analysis, "agent_photo": self.judge_agent.agent_photo}
 
+            if not self.debate_state.finished:
+                self.debate_state.mark_finished()
+
 
         # End of Debate
-        yield {"type": "status", "message": "Debate Concluded."}
\ No newline at end of file
+        self.retrieval_stats = self._retrieval_stats_since(metrics_start)
+        print(f"--- Retrieval cache: {self.retrieval_stats['hits']} hits, {self.retrieval_stats['misses']} misses, "
+              f"{self.retrieval_stats['prefetched']} prefetched ---", flush=True)
+        yield {"type": "status", "message": "Debate Concluded."}
+
+
+    # --- Async API ---
+    # Mirrors run_debate() event for event, using aact()/agenerate_response() so many debates
+    # can share one event loop instead of tying up a thread per step.
+
+    async def _arun_turn(self, agent: Agent, stage: str, debate_summary: Union[str, None], record: bool = True, round_index: int = 0):
+        """Async version of _run_turn(). With record=False (judge) no status is sent and history is not updated."""
+        if record:
+            yield {"type": "status", "message": f"{agent.name} ({agent.role_type}) speaking..."}
+
+        if not self.stream_responses:
+            argument_text = await agent.aact(self.debate_state, stage, debate_summary=debate_summary, priority=self.priority)
+        else:
+            result = await agent.aact(self.debate_state, stage, debate_summary=debate_summary, stream=True, priority=self.priority)
+            if isinstance(result, str):
+                argument_text = result
+            else:
+                chunks = []
+                try:
+                    async for chunk in result:
+                        chunks.append(chunk)
+                        yield {"type": "argument_delta", "agent_name": agent.name, "agent_role": agent.role_type, "delta": chunk, "agent_photo": agent.agent_photo}
+                    argument_text = "".join(chunks).strip()
+                except ollama.ResponseError as e:
+                    argument_text = f"ERROR: Agent failed to generate response due to Ollama error: {e}"
+                except Exception as e:
+                    argument_text = f"ERROR: Agent failed due to an unexpected error: {e}"
+
+        if record and not argument_text.startswith("ERROR:"):
+            self.debate_state.add_argument(agent.name, agent.role_type, argument_text, stage=stage, round_index=round_index)
+        yield {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": argument_text, "agent_photo": agent.agent_photo}
+
+    async def _arun_stage(self, stage_agents: list[Agent], stage: str, debate_summary: Union[str, None], round_index: int = 0):
+        """Async version of _run_stage(). Parallel turns run as tasks bounded by a semaphore."""
+        pending = self._pending_agents(stage_agents, stage, round_index)
+        if not self.parallel_turns or len(pending) <= 1:
+            prefetched = set()
+            prefetch_tasks = {} # agent name -> prefetch task
+            try:
+                for agent in stage_agents:
+                    entry = self.debate_state.get_turn(stage, round_index, agent.name)
+                    if entry is not None:
+                        yield self._replayed_argument_event(agent, entry)
+                        continue
+                    for upcoming, query in self._prefetch_queries(self._prefetch_candidates(pending, agent), stage, debate_summary, prefetched):
+                        prefetch_tasks[upcoming.name] = asyncio.create_task(upcoming.aprefetch_documents(query, stage))
+                    async for event in self._arun_turn(agent, stage, debate_summary, round_index=round_index):
+                        yield event
+            finally:
+                for task in prefetch_tasks.values():
+                    task.cancel()
+            return
+
+        semaphore = asyncio.Semaphore(self.max_parallel_turns)
+
+        async def bounded_act(agent, priority):
+            async with semaphore:
+                return await agent.aact(self.debate_state, stage, debate_summary=debate_summary, priority=priority)
+
+        tasks = {agent.name: asyncio.create_task(bounded_act(agent, self.priority if index == 0 else PRIORITY_BACKGROUND))
+                 for index, agent in enumerate(pending)}
+        try:
+            for agent in stage_agents:
+                entry = self.debate_state.get_turn(stage, round_index, agent.name)
+                if entry is not None:
+                    yield self._replayed_argument_event(agent, entry)
+                    continue
+                yield {"type": "status", "message": f"{agent.name} ({agent.role_type}) speaking..."}
+                try:
+                    argument_text = await tasks[agent.name]
+                except Exception as e:
+                    argument_text = f"ERROR: Agent failed due to an unexpected error: {e}"
+                if not argument_text.startswith("ERROR:"):
+                    self.debate_state.add_argument(agent.name, agent.role_type, argument_text, stage=stage, round_index=round_index)
+                yield {"type": "argument", "agent_name": agent.name, "agent_role": agent.role_type, "argument": argument_text, "agent_photo": agent.agent_photo}
+        finally:
+            # The consumer may stop iterating mid-stage; don't leave orphaned LLM calls running
+            for task in tasks.values():
+                task.cancel()
+
+    async def arun_debate(self, num_rebuttal_rounds: int):
+        """Async generator version of run_debate(), yielding the same events."""
+        trace_id = self._start_trace()
+        with tracer.bound(trace_id):
+            try:
+                debate_start, debate_started = self.metrics.mark(), time.perf_counter()
+                stage_name, stage_start, stage_started = None, debate_start, debate_started
+                async for event in self._adebate_flow(num_rebuttal_rounds):
+                    if event["type"] == "stage":
+                        if stage_name is not None:
+                            yield self._stage_metrics_event(stage_name, stage_start, stage_started)
+                        stage_name, stage_start, stage_started = event["stage_name"], self.metrics.mark(), time.perf_counter()
+                    yield event
+                if stage_name is not None:
+                    yield self._stage_metrics_event(stage_name, stage_start, stage_started)
+                yield self._debate_metrics_event(debate_start, debate_started)
+            finally:
+                self._export_trace(trace_id)
+
+    async def _adebate_flow(self, num_rebuttal_rounds: int):
+        """Async version of _debate_flow()."""
+        metrics_start = self.metrics.mark()
+        yield {"type": "status", "message": "Starting Debate...", "topic": self.debate_state.topic}
+        yield {"type": "stage", "stage_name": "Opening Statements"}
+
+        async for event in self._arun_stage(self.affirmative_agents + self.negative_agents, 'opening_statement', None):
+            yield event
+
+        debaters = self.affirmative_agents + self.negative_agents
+        for i in range(num_rebuttal_rounds):
+            yield {"type": "stage", "stage_name": f"--- Rebuttal Round {i+1} ---"}
+
+            if not self._pending_agents(debaters, 'rebuttal', i + 1):
+                async for event in self._arun_stage(debaters, 'rebuttal', None, round_index=i + 1):
+                    yield event
+                continue
+
+            yield {"type": "status", "message": "Orchestrator summarizing debate..."}
+            self.current_summary = await self._agenerate_summary()
+            yield {"type": "status", "message": "Summary Generated."}
+
+            if isinstance(self.current_summary, str) and self.current_summary.startswith("ERROR:"):
+                 yield {"type": "status", "message": f"Skipping remaining debate due to summarization error: {self.current_summary}"}
+                 break
+
+            async for event in self._arun_stage(debaters, 'rebuttal', self.current_summary, round_index=i + 1):
+                yield event
+
+        yield {"type": "stage", "stage_name": "Closing Statements"}
+
+        if self._pending_agents(debaters, 'closing_statement'):
+            yield {"type": "status", "message": "Orchestrator summarizing debate..."}
+            self.current_summary = await self._agenerate_summary()
+            yield {"type": "status", "message": "Summary Generated."}
+        else:
+            self.current_summary = None
+
+        if isinstance(self.current_summary, str) and self.current_summary.startswith("ERROR:"):
+             yield {"type": "status", "message": f"Skipping closing statements and judge due to summarization error: {self.current_summary}"}
+        else:
+            async for event in self._arun_stage(debaters, 'closing_statement', self.current_summary):
+                yield event
+
+            if self.judge_agent and self.debate_state.judge_analysis:
+                yield {"type": "stage", "stage_name": "Judge Analysis"}
+                yield self._replayed_argument_event(self.judge_agent, self.debate_state.judge_analysis)
+            elif self.judge_agent:
+                yield {"type": "stage", "stage_name": "Judge Analysis"}
+                yield {"type": "status", "message": "Orchestrator summarizing debate for Judge..."}
+                final_summary = await self._agenerate_summary()
+                yield {"type": "status", "message": "Summary Generated for Judge."}
+
+                if isinstance(final_summary, str) and final_summary.startswith("ERROR:"):
+                     yield {"type": "status", "message": f"Skipping judge analysis due to summarization error: {final_summary}"}
+                else:
+                    async for event in self._arun_turn(self.judge_agent, 'judge_analysis', final_summary, record=False):
+                        if event["type"] == "argument" and not event["argument"].startswith("ERROR:"):
+                            self.debate_state.set_judge_analysis(self.judge_agent.name, self.judge_agent.role_type, event["argument"])
+                        yield event
+
+            if not self.debate_state.finished:
+                self.debate_state.mark_finished()
+
+        self.retrieval_stats = self._retrieval_stats_since(metrics_start)
+        print(f"--- Retrieval cache: {self.retrieval_stats['hits']} hits, {self.retrieval_stats['misses']} misses, "
+              f"{self.retrieval_stats['prefetched']} prefetched ---", flush=True)
+        yield {"type": "status", "message": "Debate Concluded."}
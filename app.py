@@ -6,8 +6,9 @@ import os
 import random
 from collections import deque
 import base64
-import concurrent.futures
-import queue
+import hashlib
+import io
+import uuid
 
 
 # Import backend components
@@ -16,22 +17,45 @@ from config import (
     DEFAULT_MODEL, SUMMARY_MODEL,
     ENABLE_RAG, KB_DIRECTORY, VECTOR_STORE_PATH, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, RETRIEVER_K,
     AGENT_PHOTO_PATHS, SOUTH_INDIAN_NAMES,
+    PARALLEL_STAGE_TURNS,
 )
 from debate_state import DebateState
+from debate_store import debate_store # Persists each debate's turns as they happen (None if disabled)
 from agents import Agent, DebateOrchestrator, AffirmativeAgent, NegativeAgent, JudgeAgent # Ensure Agent is imported
 from rag_pipeline import index_knowledge_base, get_retriever
+from debate_worker import DebateWorker
+from tracing import tracer # Opt-in span tracing (no-op unless enabled in config)
 
 
 # --- Streamlit App Configuration ---
 st.set_page_config(layout="wide", page_title="Autonomous AI Debating Society")
 
 
-# --- Helper function to get base64 encoded image ---
+# --- Helper functions for base64 encoded avatar images ---
+# Avatars are shown at 90px (agent tiles) and 45px (chat), so one thumbnail at 2x the larger
+# size covers both on high-DPI screens without shipping the full-size photo.
+AVATAR_THUMBNAIL_PX = 180
+AVATAR_CACHE_ENTRIES = 64
+
+@st.cache_data(max_entries=AVATAR_CACHE_ENTRIES, show_spinner=False)
+def _encode_image_thumbnail(image_path, mtime, size_px):
+    """Reads, downsizes and base64-encodes an image. Cached by (path, mtime, size) across reruns."""
+    try:
+        from PIL import Image # Pillow ships with Streamlit
+        with Image.open(image_path) as img:
+            img.thumbnail((size_px, size_px))
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG")
+            return base64.b64encode(buffer.getvalue()).decode('utf-8')
+    except ImportError:
+        with open(image_path, "rb") as img_file:
+            return base64.b64encode(img_file.read()).decode('utf-8')
+
 def get_image_base64(image_path):
     try:
         if image_path and os.path.exists(image_path):
-             with open(image_path, "rb") as img_file:
-                 return base64.b64encode(img_file.read()).decode('utf-8')
+             # Only a stat per call; the encode happens once per image version
+             return _encode_image_thumbnail(image_path, os.path.getmtime(image_path), AVATAR_THUMBNAIL_PX)
         else:
             print(f"Image file not found or path is invalid: {image_path}", flush=True)
             return None
@@ -39,6 +63,25 @@ def get_image_base64(image_path):
         print(f"Error encoding image {image_path}: {e}", flush=True)
         return None
 
+def avatar_css_class(image_path):
+    """CSS class carrying an image's avatar, defined once per rerun by avatar_css_rules()."""
+    return "avatar-img-" + hashlib.sha1(str(image_path).encode('utf-8')).hexdigest()[:12]
+
+def avatar_css_rules(image_paths):
+    """Returns a <style> block defining one background-image class per distinct avatar."""
+    rules = []
+    for image_path in sorted({p for p in image_paths if p}):
+        base64_img_string = get_image_base64(image_path)
+        if base64_img_string:
+            rules.append(f".{avatar_css_class(image_path)} {{ background-image: url('data:image/png;base64,{base64_img_string}'); background-size: cover; background-position: center; }}")
+    return "<style>\n" + "\n".join(rules) + "\n</style>"
+
+def avatar_tag(image_path):
+    """Chat avatar element referencing the shared CSS class instead of inlining the image."""
+    if image_path and os.path.exists(image_path):
+        return f'<div class="avatar {avatar_css_class(image_path)}"></div>'
+    return '<div class="avatar" style="border: 1px solid red; border-radius: 50%; flex-shrink: 0; display: flex; justify-content: center; align-items: center; font-size: 0.6em;">Err</div>'
+
 
 # Inject custom CSS
 st.markdown("""
@@ -337,23 +380,100 @@ if 'status_message' not in st.session_state:
     st.session_state.status_message = "Configure and start the debate."
 if 'agent_statuses' not in st.session_state:
     st.session_state.agent_statuses = {}
+if 'live_argument' not in st.session_state:
+    st.session_state.live_argument = None # Argument currently being streamed: {'name', 'role', 'photo', 'text'}
+
+if 'chat_html_cache' not in st.session_state:
+    st.session_state.chat_html_cache = "" # HTML of debate_history (newest first), extended by add_chat_item
+
+
+# --- Chat History Rendering ---
+# Each history item is rendered to its final HTML once, when it is added, and its fragment is put in
+# front of the cached history HTML (newest first); the fragment of an item falling out of the bounded
+# history is cut off the end. A rerun then emits that string as one markdown element instead of
+# re-joining (or re-rendering) every item.
+CHAT_FRAGMENT_SEPARATOR = "\n\n" # Blank lines keep each fragment a separate HTML block for the markdown parser
+
+def bubble_class_for_role(role):
+    if 'affirmative' in role.lower():
+        return "affirmative"
+    elif 'negative' in role.lower():
+        return "negative"
+    elif 'judge' in role.lower():
+        return "judge"
+    return ""
+
+def render_chat_item_html(item):
+    """Returns the HTML fragment for one status, stage or message item."""
+    if item["type"] == "status":
+        return f"<div class='status-message'>{item['message']}</div>"
+    elif item["type"] == "stage":
+        return f"<div class='stage-separator'><span>{item['stage_name']}</span></div>"
+    elif item["type"] == "message":
+        bubble_class = bubble_class_for_role(item['role'])
+        return f"""
+<div class="chat-message {bubble_class}">
+    {avatar_tag(item.get("photo", ''))}
+    <div class="message-content">
+        <strong>{item['name']}</strong>
+        <div class="agent-text-bubble {bubble_class}">
+{item['text']}
+        </div>
+    </div>
+</div>
+"""
+    return ""
+
+def add_chat_item(item):
+    """Appends an item to the chat history with its HTML rendered once up front, and adds it to the cached HTML."""
+    item['html'] = render_chat_item_html(item)
+    history = st.session_state.debate_history
+    evicted = history[0] if len(history) == history.maxlen else None
+    history.append(item)
+
+    cache = st.session_state.chat_html_cache
+    if evicted is not None:
+        # The oldest item's fragment is the last one in the newest-first string
+        cache = cache[:max(0, len(cache) - len(evicted['html']) - len(CHAT_FRAGMENT_SEPARATOR))]
+    st.session_state.chat_html_cache = item['html'] + CHAT_FRAGMENT_SEPARATOR + cache if cache else item['html']
+
+def reset_chat_history():
+    st.session_state.debate_history = deque(maxlen=500)
+    st.session_state.chat_html_cache = ""
+
+def get_chat_html():
+    """Returns the full chat HTML, newest first."""
+    return st.session_state.chat_html_cache
+
+
+# --- Session State for the Debate Worker ---
+if 'debate_worker' not in st.session_state:
+    st.session_state.debate_worker = None # DebateWorker running the current debate, if any
+if 'debate_metrics' not in st.session_state:
+    st.session_state.debate_metrics = None # Per-debate performance report from the last finished debate
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex # Identifies this browser session to the shared LLM scheduler
+
+# While a debate runs, every script run shows up as a marker on its trace timeline, next to the
+# debate's own spans. Nothing is recorded between debates, so an idle session doesn't accumulate events.
+def running_debate_trace_id():
+    """The trace of the debate run this session is showing (see DebateOrchestrator._start_trace), or None."""
+    if not st.session_state.debate_started or st.session_state.orchestrator is None:
+        return None
+    return st.session_state.orchestrator.trace_id
 
-# --- Session State for Threading ---
-if 'debate_result_queue' not in st.session_state:
-    st.session_state.debate_result_queue = queue.Queue()
-if 'debate_step_processing' not in st.session_state:
-    st.session_state.debate_step_processing = False
+rerun_trace_id = running_debate_trace_id()
+if rerun_trace_id is not None:
+    with tracer.bound(rerun_trace_id):
+        tracer.instant('streamlit.rerun', 'streamlit', session=st.session_state.session_id)
 
+DEBATE_POLL_INTERVAL_SECONDS = 0.5 # How often the UI checks the worker for new events
 
-# --- Function to run one step of the debate generator in a thread ---
-def run_debate_step(generator, result_queue):
-    """Gets the next item from the generator and puts it in the queue."""
-    try:
-        item = next(generator, None)
-        time.sleep(0.01)
-        result_queue.put({"item": item, "error": None})
-    except Exception as e:
-        result_queue.put({"item": None, "error": e})
+
+def stop_debate_worker():
+    if st.session_state.debate_worker is not None:
+        st.session_state.debate_worker.stop()
+        st.session_state.debate_worker = None
 
 
 # --- Dynamic Agent Configuration ---
@@ -439,11 +559,9 @@ def create_dynamic_agent_configs(num_pairs, include_judge):
 
 
 # --- RAG Setup Function ---
-# ... (Keep setup_rag function as is)
 def setup_rag(enable):
     st.session_state.status_message = "Setting up Knowledge Base (RAG)..."
-    st.session_state.debate_history.append({"type": "status", "message": st.session_state.status_message})
-    st.rerun()
+    add_chat_item({"type": "status", "message": st.session_state.status_message})
 
     if enable:
         try:
@@ -453,6 +571,7 @@ def setup_rag(enable):
                  st.session_state.retriever = None
                  print(f"RAG Setup failed: KB directory empty or missing {KB_DIRECTORY}")
             else:
+                # Reuses the process-wide warm vector store handle if this store was opened before
                 vector_store = index_knowledge_base(
                     kb_directory=KB_DIRECTORY,
                     vector_store_path=VECTOR_STORE_PATH,
@@ -478,7 +597,7 @@ def setup_rag(enable):
         st.session_state.status_message = "RAG disabled by user configuration."
         st.session_state.retriever = None
 
-    st.session_state.debate_history.append({"type": "status", "message": st.session_state.status_message})
+    add_chat_item({"type": "status", "message": st.session_state.status_message})
     st.rerun()
 
 
@@ -495,6 +614,7 @@ with st.sidebar:
     st.write(f"KB Directory: `{KB_DIRECTORY}`")
     st.write(f"Vector Store: `{VECTOR_STORE_PATH}`")
     st.write(f"Embedding Model: `{EMBEDDING_MODEL}`")
+    st.session_state.parallel_turns_toggle = st.checkbox("Run Turns Within a Stage in Parallel", st.session_state.get('parallel_turns_toggle', PARALLEL_STAGE_TURNS))
 
     kb_dir_exists_and_not_empty = os.path.exists(KB_DIRECTORY) and os.path.isdir(KB_DIRECTORY) and len(os.listdir(KB_DIRECTORY)) > 0
 
@@ -518,15 +638,17 @@ with st.sidebar:
 
     can_create_agents = (st.session_state.num_agent_pairs * 2 + (1 if st.session_state.include_judge else 0)) > 0 and available_photos_count > 0
 
-    start_button_disabled = st.session_state.debate_started or (st.session_state.enable_rag_toggle and kb_dir_exists_and_not_empty and st.session_state.retriever is None) or not can_create_agents or st.session_state.debate_step_processing
+    start_button_disabled = st.session_state.debate_started or (st.session_state.enable_rag_toggle and kb_dir_exists_and_not_empty and st.session_state.retriever is None) or not can_create_agents
 
 
     if st.button("Start Debate", disabled=start_button_disabled):
         st.session_state.debate_started = True
         st.session_state.debate_finished = False
-        st.session_state.debate_history = deque(maxlen=500) # Clear history
+        reset_chat_history() # Clear history
+        st.session_state.live_argument = None
+        st.session_state.debate_metrics = None
         st.session_state.status_message = "Initializing debate..."
-        st.session_state.debate_step_processing = False # Ensure this is reset
+        stop_debate_worker() # Ensure no previous worker is still running
 
         st.session_state.agent_configs = create_dynamic_agent_configs(
             st.session_state.num_agent_pairs,
@@ -535,7 +657,7 @@ with st.sidebar:
         if not st.session_state.agent_configs: # Check if config creation failed (due to names/photos)
              st.session_state.status_message = "Agent configuration failed. Cannot start debate."
              st.session_state.debate_started = False
-             st.session_state.debate_history.append({"type": "status", "message": st.session_state.status_message})
+             add_chat_item({"type": "status", "message": st.session_state.status_message})
              st.rerun()
         else:
             all_agents = []
@@ -568,22 +690,25 @@ with st.sidebar:
 
                     all_agents.append(agent_instance)
 
-                debate_state = DebateState(topic=st.session_state.topic_input)
+                debate_state = DebateState(topic=st.session_state.topic_input, store=debate_store)
                 st.session_state.orchestrator = DebateOrchestrator(
                     name="The Moderator",
                     debate_state=debate_state,
                     agents=all_agents,
-                    model=DEFAULT_MODEL
+                    model=DEFAULT_MODEL,
+                    stream_responses=True, # Show each argument as it is generated (see live_argument)
+                    parallel_turns=st.session_state.parallel_turns_toggle,
+                    session_id=st.session_state.session_id
                 )
-                st.session_state.debate_generator = st.session_state.orchestrator.run_debate(st.session_state.rounds_input)
-                st.session_state.debate_step_processing = False # Ensure this is False initially
+                # One long-lived worker drains the whole debate into its queue
+                st.session_state.debate_worker = DebateWorker(st.session_state.orchestrator.run_debate(st.session_state.rounds_input)).start()
                 st.rerun()
 
             except Exception as e:
                  st.session_state.status_message = f"Error initializing debate or agents: {e}"
                  st.session_state.debate_started = False
                  st.session_state.orchestrator = None
-                 st.session_state.debate_history.append({"type": "status", "message": st.session_state.status_message + " -- Setup failed."})
+                 add_chat_item({"type": "status", "message": st.session_state.status_message + " -- Setup failed."})
                  print(f"Initialization Error: {e}")
                  st.rerun()
 
@@ -592,20 +717,32 @@ with st.sidebar:
          if st.button("Stop Debate"):
              st.session_state.debate_started = False
              st.session_state.status_message = "Debate manually stopped."
-             st.session_state.debate_history.append({"type": "status", "message": st.session_state.status_message})
+             add_chat_item({"type": "status", "message": st.session_state.status_message})
              st.session_state.agent_statuses = {name: "Stopped" for name in st.session_state.agent_statuses}
-             st.session_state.debate_step_processing = False
+             stop_debate_worker()
              st.rerun()
 
 
+    if st.session_state.debate_metrics:
+        with st.expander("Last Debate Performance"):
+            total = st.session_state.debate_metrics['total']
+            st.write(f"LLM calls: {total['llm_calls']} ({total['cached_calls']} cached)")
+            st.write(f"Tokens: {total['prompt_tokens']} prompt / {total['completion_tokens']} generated")
+            st.write(f"Prefill: {total['prefill_seconds']:.1f}s | Decode: {total['decode_seconds']:.1f}s")
+            st.write(f"Retrieval: {total['retrieval_seconds']:.1f}s | Summaries: {total['summary_seconds']:.1f}s")
+            if total['budgeted_prompts']:
+                st.write(f"Prompts trimmed to fit the context window: {total['trimmed_prompts']} of {total['budgeted_prompts']}")
+            st.json(st.session_state.debate_metrics['by_stage'], expanded=False)
+
     if st.button("Clear Debate History"):
-        st.session_state.debate_history = deque(maxlen=500)
+        reset_chat_history()
+        st.session_state.live_argument = None
         st.session_state.debate_finished = False
         st.session_state.debate_started = False
         st.session_state.status_message = "Debate history cleared."
         st.session_state.orchestrator = None
         st.session_state.agent_statuses = {}
-        st.session_state.debate_step_processing = False
+        stop_debate_worker()
         st.rerun()
 
 
@@ -704,154 +841,194 @@ with chat_panel_col: # This column will contain the chat header and container
 
 
     with chat_container:
-         for item in reversed(st.session_state.debate_history):
-            # Initialize bubble_class and avatar_img_tag for each item in the loop
-            bubble_class = ""
-            avatar_img_tag = '<div class="avatar" style="border: 1px solid red; border-radius: 50%; flex-shrink: 0; display: flex; justify-content: center; align-items: center; font-size: 0.6em;">Err</div>'
-
-
-            if item["type"] == "status":
-                st.markdown(f"<div class='status-message'>{item['message']}</div>", unsafe_allow_html=True)
-            elif item["type"] == "stage":
-                 st.markdown(f"<div class='stage-separator'><span>{item['stage_name']}</span></div>", unsafe_allow_html=True)
-            elif item["type"] == "message":
-                photo = item.get("photo", '')
-                if 'affirmative' in item['role'].lower():
-                    bubble_class = "affirmative"
-                elif 'negative' in item['role'].lower():
-                    bubble_class = "negative"
-                elif 'judge' in item['role'].lower():
-                     bubble_class = "judge"
-
-                base64_avatar_string = get_image_base64(photo)
-
-                if base64_avatar_string:
-                     avatar_img_tag = f'<img src="data:image/png;base64,{base64_avatar_string}" class="avatar">'
-                else:
-                     pass
-
-
-            if item["type"] == "message": # Only render message HTML for items of type 'message'
-                 message_div_class = f"chat-message {bubble_class}"
-
-                 st.markdown(f"""
-                 <div class="{message_div_class}">
-                     {avatar_img_tag}
-                     <div class="message-content">
-                         <strong>{item['name']}</strong>
-                         <div class="agent-text-bubble {bubble_class}">
-                             {item['text']}
-                         </div>
-                     </div>
-                 </div>
-                 """, unsafe_allow_html=True)
-
-
-# --- Debate Loop ---
-if st.session_state.debate_started and st.session_state.orchestrator and st.session_state.debate_generator and not st.session_state.debate_step_processing:
-    st.session_state.debate_step_processing = True
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(run_debate_step, st.session_state.debate_generator, st.session_state.debate_result_queue)
-
+         # Define each avatar image once as a CSS class; messages only reference the class
+         live = st.session_state.live_argument
+         chat_photos = [item.get("photo") for item in st.session_state.debate_history if item["type"] == "message"]
+         if live:
+             chat_photos.append(live.get('photo'))
+         st.markdown(avatar_css_rules(chat_photos), unsafe_allow_html=True)
+
+         # Argument still being streamed (newest, so shown on top)
+         if live:
+             st.markdown(render_chat_item_html({"type": "message", "name": live['name'], "role": live['role'], "text": live['text'], "photo": live.get('photo')}), unsafe_allow_html=True)
+
+         # Finished items: one element built from cached fragments
+         st.markdown(get_chat_html(), unsafe_allow_html=True)
+
+
+# --- Processing Results from the Debate Worker ---
+MAX_EVENTS_PER_BATCH = 200 # Upper bound on events applied per rerun, so one huge backlog can't stall the UI
+
+def is_progress_status(message):
+    """True for the statuses that only say what is happening right now (who speaks, summarizing)."""
+    return "speaking..." in message or "summarizing debate" in message or "Summary Generated" in message
+
+def status_agent_updates(message):
+    """Agent status display changes implied by a status message, as {agent name: status}."""
+    updates = {}
+    if "speaking..." in message:
+         speaking_name = message.split(" speaking...")[0]
+         if speaking_name in st.session_state.agent_statuses:
+             for name in st.session_state.agent_statuses:
+                if name == speaking_name:
+                    updates[name] = "Speaking..."
+                elif st.session_state.debate_started:
+                    updates[name] = "Listening..."
+
+    elif "summarizing debate" in message:
+         updates = {name: "Summarizing..." for name in st.session_state.agent_statuses}
+    elif "Summary Generated" in message:
+         updates = {name: "Listening..." for name in st.session_state.agent_statuses}
+    return updates
+
+def new_pending_status():
+    """Progress statuses of a batch not applied yet: the last message and the last update per agent."""
+    return {'message': None, 'agent_statuses': {}}
+
+def flush_pending_status(pending):
+    """Applies the coalesced progress statuses: one status line in the chat and one update per agent."""
+    if pending['message'] is None:
+        return
+    st.session_state.status_message = pending['message']
+    add_chat_item({"type": "status", "message": pending['message']}) # Store as status
+    st.session_state.agent_statuses.update(pending['agent_statuses'])
+    pending.update(new_pending_status())
+
+def apply_debate_event(yielded_item, pending_status):
+    """Applies one event from the debate generator to session state. Does not rerun.
+
+    Progress statuses (see is_progress_status) are only collected in pending_status; they are applied
+    (see flush_pending_status) before the next stage, argument or other status, so the chat keeps its
+    order, or at the end of the batch. Every other status always goes into the chat.
+    """
+    item_type = yielded_item.get("type")
+    agent_name = yielded_item.get("agent_name")
+
+    if item_type == "status":
+        message = yielded_item.get("message", "")
+        if is_progress_status(message):
+            pending_status['message'] = message
+            pending_status['agent_statuses'].update(status_agent_updates(message))
+            return
+        flush_pending_status(pending_status)
+        st.session_state.status_message = message
+        add_chat_item({"type": "status", "message": message}) # Store as status
+        return
+    if item_type in ("stage", "argument"):
+        flush_pending_status(pending_status)
+
+    if item_type == "stage":
+        st.session_state.status_message = f"Stage: {yielded_item.get('stage_name', 'Unknown')}"
+        add_chat_item({"type": "stage", "stage_name": yielded_item.get("stage_name", "Unknown")}) # Store as stage
+        st.session_state.agent_statuses = {name: "Listening..." for name in st.session_state.agent_statuses}
+
+
+    elif item_type == "argument_delta":
+        # Accumulate streamed tokens; the final 'argument' event replaces this preview
+        live = st.session_state.live_argument
+        if not live or live['name'] != agent_name:
+            live = {'name': agent_name, 'role': yielded_item.get("agent_role", ""), 'photo': yielded_item.get("agent_photo"), 'text': ""}
+        live['text'] += yielded_item.get("delta", "")
+        st.session_state.live_argument = live
+
+
+    elif item_type == "argument":
+        st.session_state.live_argument = None
+        agent_name = yielded_item.get("agent_name")
+        agent_role = yielded_item.get("agent_role")
+        argument_text = yielded_item.get("argument", "")
+        agent_photo = yielded_item.get("agent_photo")
+
+        st.session_state.status_message = f"{agent_name} ({agent_role}) finished speaking."
+
+        add_chat_item({
+            "type": "message",
+            "name": agent_name,
+            'role': agent_role,
+            'text': argument_text,
+            'photo': agent_photo
+        })
 
-# --- Processing Results from Thread ---
-if not st.session_state.debate_result_queue.empty():
+        if agent_name in st.session_state.agent_statuses:
+            st.session_state.agent_statuses[agent_name] = "Waiting..."
+
+
+    elif item_type == "summary":
+         pass # Handled by status messages
+
+
+    elif item_type == "metrics":
+        # Not shown in the chat; the per-debate report is shown in the sidebar
+        if yielded_item.get("scope") == "debate":
+            st.session_state.debate_metrics = yielded_item.get("metrics")
+
+
+# The worker thread runs the whole debate and queues every event; this fragment polls the queue
+# on a short timer. Polls that find nothing only rerun this fragment. Otherwise every event already
+# queued is applied in one pass (a run of progress statuses is coalesced into its last message and
+# the last status per agent; streamed text simply extends the live argument) and the app reruns once
+# for the whole batch. The fragment is only rendered (and so only polls) while a debate is running.
+@st.fragment(run_every=DEBATE_POLL_INTERVAL_SECONDS)
+def poll_debate_worker():
+    worker = st.session_state.debate_worker
+    if worker is None or not st.session_state.debate_started:
+        return
+    results = worker.drain(MAX_EVENTS_PER_BATCH)
+    if not results and not worker.is_alive():
+        # The thread may have queued its final result right after the drain above
+        results = worker.drain(MAX_EVENTS_PER_BATCH)
+        if not results:
+            # It died without reporting how the debate ended
+            results = [{"item": None, "error": RuntimeError("The debate worker stopped unexpectedly.")}]
+    if not results:
+        return
+
+    started = time.perf_counter()
+    pending_status = new_pending_status()
     try:
-        result = st.session_state.debate_result_queue.get(timeout=0.01)
-
-        if result["item"] is not None:
-             st.session_state.debate_step_processing = False
-
-
-        if result["error"]:
-            error = result["error"]
-            st.session_state.debate_started = False
-            st.session_state.debate_step_processing = False
-            st.session_state.status_message = f"An error occurred during the debate turn: {error}"
-            st.session_state.debate_history.append({"type": "status", "message": st.session_state.status_message + " -- Debate ended."})
-            print(f"Debate Thread Error: {error}", flush=True)
-            st.session_state.agent_statuses = {name: "Error" for name in st.session_state.agent_statuses}
-            st.rerun()
-
-        else: # Successfully got an item from the generator
-            yielded_item = result["item"]
-
-            if yielded_item is not None:
-                item_type = yielded_item.get("type")
-                agent_name = yielded_item.get("agent_name")
-
-                if item_type == "status":
-                    st.session_state.status_message = yielded_item.get("message", "")
-                    st.session_state.debate_history.append({"type": "status", "message": st.session_state.status_message}) # Store as status
-                    # Update agent status display based on the message
-                    if "speaking..." in yielded_item.get("message", ""):
-                         speaking_name = yielded_item.get("message").split(" speaking...")[0]
-                         if speaking_name in st.session_state.agent_statuses:
-                             for name in st.session_state.agent_statuses:
-                                if name == speaking_name:
-                                    st.session_state.agent_statuses[name] = "Speaking..."
-                                elif st.session_state.debate_started:
-                                    st.session_state.agent_statuses[name] = "Listening..."
-                                else:
-                                     pass
-
-                    elif "summarizing debate" in yielded_item.get("message", ""):
-                         st.session_state.agent_statuses = {name: "Summarizing..." for name in st.session_state.agent_statuses}
-                    elif "Summary Generated" in yielded_item.get("message", ""):
-                         st.session_state.agent_statuses = {name: "Listening..." for name in st.session_state.agent_statuses}
-
-
-                elif item_type == "stage":
-                    st.session_state.status_message = f"Stage: {yielded_item.get('stage_name', 'Unknown')}"
-                    st.session_state.debate_history.append({"type": "stage", "stage_name": yielded_item.get("stage_name", "Unknown")}) # Store as stage
-                    st.session_state.agent_statuses = {name: "Listening..." for name in st.session_state.agent_statuses}
-
-
-                elif item_type == "argument":
-                    agent_name = yielded_item.get("agent_name")
-                    agent_role = yielded_item.get("agent_role")
-                    argument_text = yielded_item.get("argument", "")
-                    agent_photo = yielded_item.get("agent_photo")
-
-                    st.session_state.status_message = f"{agent_name} ({agent_role}) finished speaking."
-
-                    st.session_state.debate_history.append({
-                        "type": "message",
-                        "name": agent_name,
-                        'role': agent_role,
-                        'text': argument_text,
-                        'photo': agent_photo
-                    })
-
-                    if agent_name in st.session_state.agent_statuses:
-                        st.session_state.agent_statuses[agent_name] = "Waiting..."
-
-
-                elif item_type == "summary":
-                     pass # Handled by status messages
+        for result in results:
+            if result["error"] or result["item"] is None:
+                flush_pending_status(pending_status)
 
-                st.rerun()
+            if result["error"]:
+                error = result["error"]
+                st.session_state.debate_started = False
+                st.session_state.status_message = f"An error occurred during the debate turn: {error}"
+                add_chat_item({"type": "status", "message": st.session_state.status_message + " -- Debate ended."})
+                print(f"Debate Thread Error: {error}", flush=True)
+                st.session_state.agent_statuses = {name: "Error" for name in st.session_state.agent_statuses}
+                break
 
-            else:
+            elif result["item"] is None:
                 st.session_state.debate_started = False
                 st.session_state.debate_finished = True
-                st.session_state.debate_step_processing = False
                 st.session_state.status_message = "Debate concluded."
-                st.session_state.debate_history.append({"type": "status", "message": st.session_state.status_message})
+                add_chat_item({"type": "status", "message": st.session_state.status_message})
                 st.session_state.agent_statuses = {name: "Finished" for name in st.session_state.agent_statuses}
-                st.rerun()
+                break
+
+            else: # Successfully got an item from the generator
+                apply_debate_event(result["item"], pending_status)
+        else:
+            flush_pending_status(pending_status)
 
-    except queue.Empty:
-         pass
     except Exception as e:
         st.session_state.debate_started = False
-        st.session_state.debate_step_processing = False
         st.session_state.status_message = f"An error occurred while processing debate item: {e}"
-        st.session_state.debate_history.append({"type": "status", "message": st.session_state.status_message + " -- Debate ended."})
+        add_chat_item({"type": "status", "message": st.session_state.status_message + " -- Debate ended."})
         print(f"Debate Item Processing Error: {e}", flush=True)
         st.session_state.agent_statuses = {name: "Error" for name in st.session_state.agent_statuses}
-        st.rerun()
+
+    trace_id = getattr(st.session_state.orchestrator, 'trace_id', None)
+    if trace_id is not None: # Once the run has exported its trace, the marker is dropped
+        with tracer.bound(trace_id):
+            tracer.complete('streamlit.apply_events', 'streamlit', started, events=len(results))
+    # One full rerun for the whole batch
+    st.rerun()
+
+
+if st.session_state.debate_worker is not None and st.session_state.debate_started:
+    poll_debate_worker()
 
 
 # --- End of UI Rendering ---
@@ -0,0 +1,402 @@
+# benchmark.py
+
+# Reproducible, offline benchmark of the debate pipeline. A stub Ollama HTTP server (chat + embeddings,
+# with configurable prefill and per-token latency) stands in for the model, so runs measure our own
+# orchestration, retrieval and indexing overhead and can be compared between changes, e.g.:
+#   python benchmark.py --pairs 1,3,5 --rounds 1,2,3,4,5 --token-latency-ms 2 --json bench.json
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Union
+
+try:
+    import resource # Unix only; peak RSS is reported as n/a elsewhere
+except ImportError:
+    resource = None
+
+import config
+
+
+# --- Stub Ollama Server ---
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token), used for the stub's prompt sizes."""
+    return max(1, len(text) // 4)
+
+
+class StubOllamaServer:
+    """Minimal Ollama-compatible HTTP server for benchmarks and tests.
+
+    Serves /api/chat (blocking and streamed NDJSON), /api/embed, /api/embeddings and /api/tags.
+    Each chat call sleeps prefill_ms_per_token per prompt token, then token_latency_ms per generated
+    token, and reports the same counts/durations fields as Ollama. Embeddings are derived from a hash
+    of the text, so they are deterministic. Request counts are kept in self.stats.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, token_latency_ms: float = 0.0, prefill_ms_per_token: float = 0.0,
+                 default_output_tokens: int = 128, embedding_dim: int = 256):
+        self.host = host
+        self.port = port
+        self.token_latency_ms = token_latency_ms
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.default_output_tokens = default_output_tokens
+        self.embedding_dim = embedding_dim
+        self.url = None
+        self._httpd = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"chat_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "embed_calls": 0, "embedded_texts": 0}
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def embed(self, text: str) -> list[float]:
+        """Deterministic unit vector for a text."""
+        values = []
+        counter = 0
+        while len(values) < self.embedding_dim:
+            digest = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+            values.extend((byte - 127.5) / 127.5 for byte in digest)
+            counter += 1
+        values = values[:self.embedding_dim]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    def start(self) -> str:
+        """Starts serving on a background thread and returns the base URL."""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, like the real server
+
+            def log_message(self, format, *args):
+                pass # Quiet
+
+            def _send_json(self, payload: dict, status: int = 200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _write_chunk(self, payload: dict):
+                data = (json.dumps(payload) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                if self.path.startswith("/api/tags"):
+                    self._send_json({"models": []})
+                elif self.path.startswith("/api/version"):
+                    self._send_json({"version": "0.0.0-stub"})
+                else:
+                    body = b"Ollama is running"
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json({"error": "invalid JSON"}, status=400)
+                    return
+                if self.path.startswith("/api/chat"):
+                    self._chat(request)
+                elif self.path.startswith("/api/embeddings"):
+                    # Legacy single-text endpoint (used by langchain_community's OllamaEmbeddings)
+                    stub._count(embed_calls=1, embedded_texts=1)
+                    self._send_json({"embedding": stub.embed(request.get("prompt", ""))})
+                elif self.path.startswith("/api/embed"):
+                    texts = request.get("input", "")
+                    texts = [texts] if isinstance(texts, str) else list(texts)
+                    stub._count(embed_calls=1, embedded_texts=len(texts))
+                    self._send_json({"model": request.get("model"), "embeddings": [stub.embed(text) for text in texts]})
+                else:
+                    self._send_json({"error": f"unknown endpoint {self.path}"}, status=404)
+
+            def _chat(self, request: dict):
+                model = request.get("model", "stub")
+                prompt_text = "".join(message.get("content", "") for message in request.get("messages", []))
+                prompt_tokens = estimate_tokens(prompt_text)
+                num_predict = (request.get("options") or {}).get("num_predict") or stub.default_output_tokens
+                output_tokens = max(1, num_predict)
+                stub._count(chat_calls=1, prompt_tokens=prompt_tokens, completion_tokens=output_tokens)
+
+                prefill_seconds = prompt_tokens * stub.prefill_ms_per_token / 1000
+                token_seconds = stub.token_latency_ms / 1000
+                time.sleep(prefill_seconds)
+
+                # Deterministic filler text, one word per token
+                rng = random.Random(hashlib.sha256(prompt_text.encode("utf-8")).hexdigest())
+                words = [f"point{rng.randint(0, 999)}" for _ in range(output_tokens)]
+                final = {
+                    "model": model, "created_at": "1970-01-01T00:00:00Z", "done": True, "done_reason": "length",
+                    "prompt_eval_count": prompt_tokens, "eval_count": output_tokens,
+                    "load_duration": 0, "prompt_eval_duration": int(prefill_seconds * 1e9),
+                    "eval_duration": int(output_tokens * token_seconds * 1e9),
+                    "total_duration": int((prefill_seconds + output_tokens * token_seconds) * 1e9),
+                }
+
+                if not request.get("stream", True):
+                    time.sleep(output_tokens * token_seconds)
+                    self._send_json({**final, "message": {"role": "assistant", "content": " ".join(words)}})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, word in enumerate(words):
+                    time.sleep(token_seconds)
+                    self._write_chunk({"model": model, "created_at": "1970-01-01T00:00:00Z", "done": False,
+                                       "message": {"role": "assistant", "content": word if i == 0 else " " + word}})
+                self._write_chunk({**final, "message": {"role": "assistant", "content": ""}})
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self.url = f"http://{self.host}:{self.port}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-ollama", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+# --- Synthetic Knowledge Base ---
+_VOCABULARY = ("autonomous vehicles safety traffic policy infrastructure sensors liability insurance jobs "
+               "emissions regulation cities mobility accessibility software reliability testing data privacy "
+               "economics transition congestion pedestrians weather mapping standards public trust").split()
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_text_pdf(path: str, lines: list[str]):
+    """Writes a minimal single-page PDF containing the given lines of ASCII text (enough for PyPDFLoader)."""
+    content = "BT /F1 10 Tf 50 780 Td 12 TL\n" + "".join(f"({_pdf_escape(line)}) '\n" for line in lines) + "ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{obj}\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n"
+    with open(path, "w", encoding="ascii") as f:
+        f.write(pdf)
+
+def build_synthetic_kb(directory: str, num_docs: int, lines_per_doc: int, seed: int = 0):
+    """Creates num_docs PDFs of deterministic pseudo-text in directory."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    for i in range(num_docs):
+        lines = [" ".join(rng.choice(_VOCABULARY) for _ in range(12)) for _ in range(lines_per_doc)]
+        write_text_pdf(os.path.join(directory, f"doc_{i:04d}.pdf"), lines)
+
+
+# --- Measurements ---
+def peak_rss_mb() -> Union[float, None]:
+    """Peak resident set size of this process so far, in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024, 1)
+
+
+def benchmark_indexing(stub: StubOllamaServer, workdir: str, num_docs: int, lines_per_doc: int) -> tuple:
+    """Cold index of a synthetic KB, then an unchanged re-sync. Returns (one result row per run, vector store)."""
+    from rag_pipeline import index_knowledge_base, evict_vector_store
+
+    kb_directory = os.path.join(workdir, "knowledge")
+    vector_store_path = os.path.join(workdir, "chroma_db")
+    build_synthetic_kb(kb_directory, num_docs, lines_per_doc)
+
+    results = []
+    for label in ("index (cold)", "index (unchanged)"):
+        stub.reset_stats()
+        start = time.perf_counter()
+        vector_store = index_knowledge_base(kb_directory=kb_directory, vector_store_path=vector_store_path,
+                                            embedding_model=config.EMBEDDING_MODEL, chunk_size=config.CHUNK_SIZE,
+                                            chunk_overlap=config.CHUNK_OVERLAP)
+        results.append({"scenario": label, "wall_seconds": round(time.perf_counter() - start, 3),
+                        "embed_calls": stub.stats["embed_calls"], "embedded_texts": stub.stats["embedded_texts"],
+                        "peak_rss_mb": peak_rss_mb()})
+        if vector_store is None:
+            print("ERROR: Indexing failed; skipping retrieval and RAG debates.", flush=True)
+            return results, None
+        # Measure the re-sync against a freshly opened store rather than the warm registry entry
+        evict_vector_store(vector_store_path, config.EMBEDDING_MODEL)
+    return results, vector_store
+
+
+def benchmark_retrieval(stub: StubOllamaServer, vector_store, num_queries: int) -> dict:
+    """Uncached retriever lookups (the retrieval cache is cleared before each query)."""
+    from rag_pipeline import get_retriever, retrieval_cache
+
+    retriever = get_retriever(vector_store)
+    rng = random.Random(1)
+    queries = [" ".join(rng.choice(_VOCABULARY) for _ in range(8)) for _ in range(num_queries)]
+    stub.reset_stats()
+    start = time.perf_counter()
+    for query in queries:
+        retrieval_cache.clear()
+        retriever.invoke(query)
+    wall = time.perf_counter() - start
+    return {"scenario": f"retrieval x{num_queries}", "wall_seconds": round(wall, 3),
+            "ms_per_query": round(wall / max(1, num_queries) * 1000, 2),
+            "embed_calls": stub.stats["embed_calls"], "peak_rss_mb": peak_rss_mb()}
+
+
+def benchmark_debate(stub: StubOllamaServer, pairs: int, rounds: int, retriever, stream: bool, parallel: bool, embeddings=None) -> dict:
+    """Runs one full debate against the stub and returns its measurements.
+
+    Every scenario starts cold: the retrieval cache and the query embedding cache (embeddings, the
+    vector store's CachedEmbeddings, in memory and in its SQLite file) are emptied first.
+    """
+    from agents import DebateOrchestrator
+    from debate_state import DebateState
+    from main import build_agent_configs, create_agent_instance
+    from rag_pipeline import CachedEmbeddings, retrieval_cache
+
+    retrieval_cache.clear()
+    if isinstance(embeddings, CachedEmbeddings):
+        embeddings.clear()
+    agents = [create_agent_instance(agent_config, retriever=retriever) for agent_config in build_agent_configs(pairs, True)]
+    orchestrator = DebateOrchestrator("The Moderator", DebateState(topic=config.DEBATE_TOPIC), agents,
+                                      model=config.DEFAULT_MODEL, stream_responses=stream, parallel_turns=parallel,
+                                      session_id=f"bench-{pairs}-{rounds}")
+    stub.reset_stats()
+    start = time.perf_counter()
+    events = 0
+    for _ in orchestrator.run_debate(num_rebuttal_rounds=rounds):
+        events += 1
+    wall = time.perf_counter() - start
+
+    total = orchestrator.metrics_report["total"] if orchestrator.metrics_report else {}
+    return {"scenario": f"debate pairs={pairs} rounds={rounds}", "pairs": pairs, "rounds": rounds,
+            "wall_seconds": round(wall, 3), "events": events,
+            "llm_calls": stub.stats["chat_calls"], "prompt_tokens": stub.stats["prompt_tokens"],
+            "completion_tokens": stub.stats["completion_tokens"], "embed_calls": stub.stats["embed_calls"],
+            "retrieval_seconds": total.get("retrieval_seconds"), "summary_seconds": total.get("summary_seconds"),
+            "peak_rss_mb": peak_rss_mb()}
+
+
+def print_table(rows: list[dict], columns: list[str]):
+    widths = {column: max(len(column), *(len(str(row.get(column, ""))) for row in rows)) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns), flush=True)
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(widths[column]) for column in columns), flush=True)
+
+
+def parse_int_list(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the debate pipeline against a stub Ollama server.")
+    parser.add_argument("--pairs", type=parse_int_list, default=[1, 3, 5], help="Comma-separated debating pair counts")
+    parser.add_argument("--rounds", type=parse_int_list, default=[1, 2, 3, 4, 5], help="Comma-separated rebuttal round counts")
+    parser.add_argument("--token-latency-ms", type=float, default=0.0, help="Stub decode latency per generated token")
+    parser.add_argument("--prefill-latency-ms", type=float, default=0.0, help="Stub prefill latency per prompt token")
+    parser.add_argument("--docs", type=int, default=20, help="Synthetic PDFs in the benchmark knowledge base")
+    parser.add_argument("--lines-per-doc", type=int, default=60, help="Text lines per synthetic PDF")
+    parser.add_argument("--queries", type=int, default=50, help="Retriever lookups in the retrieval benchmark")
+    parser.add_argument("--no-rag", action="store_true", help="Skip indexing/retrieval and run debates without a retriever")
+    parser.add_argument("--stream", action="store_true", help="Stream responses (as the UI does)")
+    parser.add_argument("--parallel-turns", action="store_true", help="Run the turns within a stage concurrently")
+    parser.add_argument("--json", help="Also write all results to this JSON file")
+    parser.add_argument("--workdir", help="Directory for the synthetic KB and stores (default: a temporary directory)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="debate-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    stub = StubOllamaServer(token_latency_ms=args.token_latency_ms, prefill_ms_per_token=args.prefill_latency_ms)
+    url = stub.start()
+    print(f"Stub Ollama server listening on {url} (workdir: {workdir})", flush=True)
+
+    # Point everything at the stub and keep all state inside workdir. The pipeline modules read these
+    # settings when they are imported, so they are only imported (inside the benchmark functions) after this.
+    config.OLLAMA_HOST = url
+    config.EMBEDDING_CACHE_PATH = os.path.join(workdir, "embedding_cache.sqlite")
+    config.DEBATE_STORE_DIR = None
+    config.LLM_RESPONSE_CACHE_ENABLED = False
+
+    results = {"settings": {key: value for key, value in vars(args).items() if key != "json"}, "index": [], "retrieval": None, "debates": []}
+    try:
+        retriever = None
+        embeddings = None
+        if not args.no_rag:
+            results["index"], vector_store = benchmark_indexing(stub, workdir, args.docs, args.lines_per_doc)
+            if vector_store is not None:
+                from rag_pipeline import get_retriever
+                results["retrieval"] = benchmark_retrieval(stub, vector_store, args.queries)
+                retriever = get_retriever(vector_store)
+                embeddings = vector_store.embeddings
+
+        for pairs in args.pairs:
+            for rounds in args.rounds:
+                row = benchmark_debate(stub, pairs, rounds, retriever, args.stream, args.parallel_turns, embeddings)
+                results["debates"].append(row)
+                print(f"{row['scenario']}: {row['wall_seconds']:.2f}s, {row['llm_calls']} LLM calls, {row['prompt_tokens']} prompt tokens", flush=True)
+    finally:
+        stub.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n--- Benchmark Results ---", flush=True)
+    if results["index"]:
+        print_table(results["index"], ["scenario", "wall_seconds", "embed_calls", "embedded_texts", "peak_rss_mb"])
+    if results["retrieval"]:
+        print_table([results["retrieval"]], ["scenario", "wall_seconds", "ms_per_query", "embed_calls", "peak_rss_mb"])
+    if results["debates"]:
+        print_table(results["debates"], ["scenario", "wall_seconds", "llm_calls", "prompt_tokens", "completion_tokens",
+                                         "embed_calls", "retrieval_seconds", "summary_seconds", "peak_rss_mb"])
+    print("(peak_rss_mb is the process-wide peak so far, so it only grows across rows)", flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}", flush=True)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -19,9 +19,23 @@ EMBEDDING_MODEL = 'nomic-embed-text'
 # Chunk size and overlap for splitting documents
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
+# Indexing: PDFs are parsed and split on a process pool, and chunks are embedded/inserted in batches
+INGEST_WORKERS = 0 # Number of worker processes (0 = one per CPU core)
+INDEX_BATCH_SIZE = 64 # Chunks per embedding/insert call
+EMBEDDING_CONCURRENCY = 4 # Embedding batches sent to Ollama at the same time
+EMBEDDING_MAX_RETRIES = 3 # Retries (with exponential backoff) for a failed embedding batch
 # Flag to indicate if RAG should be enabled
 ENABLE_RAG = True
 RETRIEVER_K = 3 # Number of relevant documents to retrieve for RAG
+# Retrieved documents are cached per (normalized query, k, index version) and shared by all agents
+RETRIEVAL_CACHE_SIZE = 256 # Max cached queries (0 disables the cache)
+RETRIEVAL_CACHE_TTL_SECONDS = 600 # Entries older than this are re-retrieved (0 = no expiry)
+# While one debater generates, the lookups of the next speakers in the stage run in the background (their
+# queries only depend on topic, stance, stage and the stage's summary) and land in the retrieval cache
+RETRIEVAL_PREFETCH_SPEAKERS = 2 # Upcoming speakers to prefetch for (0 disables; needs the retrieval cache)
+# Embedding vectors are cached by (embedding model, text hash) in memory; query vectors also in this SQLite file
+EMBEDDING_CACHE_PATH = "./embedding_cache/embeddings.sqlite" # Set to None to keep the cache in memory only
+EMBEDDING_CACHE_MEMORY_SIZE = 10000 # Max vectors held in memory
 
 # --- Agent Configuration ---
 # --- Agent Configuration ---
@@ -124,6 +138,16 @@ SUMMARY_PROMPT_TEMPLATE = (
     "\n\nProvide the summary in a few sentences or a short paragraph."
 )
 
+# Used once a summary exists: only the arguments made since that summary are sent along with it
+INCREMENTAL_SUMMARY_PROMPT_TEMPLATE = (
+    "Here is a concise, neutral summary of the debate so far:\n\n"
+    "{previous_summary}"
+    "\n\nThe following new arguments have been made since that summary:\n\n"
+    "{new_arguments}"
+    "\n\nUpdate the summary so it also covers the new arguments, keeping the main arguments and counter-arguments "
+    "of both the Affirmative and Negative teams. Provide the summary in a few sentences or a short paragraph."
+)
+
 # --- Max Tokens Configuration ---
 MAX_TOKENS_PER_STAGE = {
     'opening_statement': 300, # Increased slightly to accommodate potential context
@@ -134,6 +158,73 @@ MAX_TOKENS_PER_STAGE = {
 
 MAX_SUMMARY_TOKENS = 100
 
+# --- Context Window Budget ---
+# Debate turn prompts (system prompt, few-shot examples, retrieved context, summary) are sized against the
+# model's context window before they are sent, leaving room for the stage's MAX_TOKENS_PER_STAGE output
+# (see prompt_budget.py). Otherwise Ollama silently truncates an overflowing prompt. Shorter prompts also
+# mean less prefill work per turn.
+# Off by default, since a fixed value would shrink the window of models whose default is larger (and drop
+# context that fit before). Set it to the window you run the model with, e.g. 2048, to enable budgeting.
+LLM_NUM_CTX = None # Sent to Ollama as num_ctx with every call, and every prompt is fitted to it; None = model default (no budgeting)
+PROMPT_BUDGET_MARGIN_TOKENS = 64 # Headroom for the chat template and for estimation error
+CHARS_PER_TOKEN = 4 # Token counts are estimated from text length (no tokenizer needed)
+
+# --- Streaming Configuration ---
+# When True, the orchestrator streams tokens from Ollama and yields 'argument_delta' events
+# while an argument is being generated, followed by the usual final 'argument' event. Off by default, so
+# callers keep getting only the final 'argument' event unless they opt in (the UI always does, to show them live).
+STREAM_RESPONSES = False
+
+# --- Parallel Turn Configuration ---
+# When True, the independent turns within a stage (e.g. all opening statements) are sent to Ollama
+# concurrently and yielded in speaking order. Ollama only serves them in parallel if it is allowed to
+# (OLLAMA_NUM_PARALLEL on the server). Streaming is not used for turns run in parallel.
+PARALLEL_STAGE_TURNS = False
+MAX_PARALLEL_TURNS = 4 # Upper bound on concurrent act() calls per stage
+
+# --- LLM Request Scheduling ---
+# Every agent's Ollama chat call goes through one process-wide scheduler (llm_scheduler.py), so several
+# debate sessions sharing this server take turns fairly instead of piling requests onto Ollama.
+OLLAMA_HOST = None # e.g. "http://127.0.0.1:11434" (None = the OLLAMA_HOST environment variable, else Ollama's default)
+LLM_DEFAULT_CONCURRENCY = 2 # Chat requests in flight per model, across all sessions
+LLM_MODEL_CONCURRENCY = {} # Per-model overrides, e.g. {'llama3': 1}
+# How long Ollama keeps a model (and its prompt cache) loaded after a request. Turns reuse the cached
+# system prompt + few-shot prefix only while the model stays loaded. None = Ollama's default (5 minutes).
+OLLAMA_KEEP_ALIVE = "30m"
+# Sampling options sent with every chat call (None = leave Ollama's default: temperature 0.8, random seed)
+LLM_TEMPERATURE = None
+LLM_SEED = None
+
+# --- LLM Response Cache ---
+# Opt-in on-disk cache of chat responses keyed by (model, full message list, options). Only reproducible
+# requests are cached, i.e. LLM_TEMPERATURE = 0 or a fixed LLM_SEED; otherwise every call goes to Ollama.
+# Lets regression runs and demos of an already-run debate replay instantly.
+LLM_RESPONSE_CACHE_ENABLED = False
+LLM_RESPONSE_CACHE_PATH = "./llm_cache/responses.sqlite"
+LLM_RESPONSE_CACHE_MAX_MB = 256 # Least recently used responses are evicted beyond this size
+
+# --- Debate Persistence ---
+# Each debate's turns are appended to <DEBATE_STORE_DIR>/<debate_id>.jsonl as they complete, so a debate
+# survives a restart and a crashed one can be resumed from its last completed turn (see debate_store.py).
+# Opt-in for the UI, which never reads these files back or deletes them. main.py always keeps its debates
+# in a store under each sweep's output directory (used by --resume), whatever this is set to.
+DEBATE_STORE_DIR = None # e.g. "./debate_store" to persist UI debates (None = keep them in memory only)
+DEBATE_STORE_FSYNC = False # fsync every record (slower; also protects against power loss)
+
+# --- Batch Runner (main.py) ---
+# Headless runs: one debate per line of a topics file, several debates at a time, transcripts written as JSONL
+BATCH_WORKERS = 2 # Debates run concurrently
+BATCH_NUM_AGENT_PAIRS = 1 # Affirmative/Negative pairs per debate
+BATCH_OUTPUT_DIR = "./transcripts" # One <index>-<topic>.jsonl file per debate
+
+# --- Tracing ---
+# Opt-in span tracing (see tracing.py): debate stages, act() calls, retrieval, embedding, Ollama calls and
+# summaries are recorded and written as a Chrome trace (open in https://ui.perfetto.dev or chrome://tracing)
+# when each debate finishes. Disabled tracing costs one attribute check per span.
+TRACE_ENABLED = False
+TRACE_OUTPUT_DIR = "./traces" # One trace_<debate id>_<timestamp ms>.json file per debate run, one trace_index_<timestamp ms>.json per KB sync
+TRACE_MAX_EVENTS = 200000 # Spans beyond this (between two exports) are dropped to bound memory
+
 # --- Few-Shot Examples ---
 # Update examples to show the *expected* format when context is present.
 # We'll include a placeholder indicating where context *would* be.
@@ -0,0 +1,152 @@
+# debate_metrics.py
+
+import threading
+
+NS_PER_SECOND = 1_000_000_000 # Ollama reports durations in nanoseconds
+
+
+class DebateMetrics:
+    """Collects where the time of one debate goes.
+
+    Every record is a dict with a 'kind':
+      'llm'       - one Ollama chat call: token counts and the load/prefill/decode durations Ollama
+                    reports, plus the wall time seen by the caller (cached responses have no durations)
+      'retrieval' - one knowledge base lookup in DebateAgent.act()
+      'summary'   - one orchestrator summarization step, end to end (its LLM call is also an 'llm' record)
+      'prompt_budget' - the estimated token budget of one debate turn prompt (see prompt_budget.py)
+      'retrieval_cache' - one turn's lookup in the shared retrieval cache: a miss, a hit on an entry filled
+                    by the speaker's prefetch ('prefetched'), or a hit on one another lookup filled
+    Records are tagged with agent name, role, stage and model. The orchestrator attaches one
+    collector to all of its agents; appends are locked because parallel turns record concurrently.
+    """
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+        self._prefetched_keys = set() # Retrieval cache keys filled by a prefetch and not yet used by a turn
+
+    def _append(self, record: dict):
+        with self._lock:
+            self.records.append(record)
+
+    def mark(self) -> int:
+        """Position to pass to summarize() later to cover only the records added from now on."""
+        with self._lock:
+            return len(self.records)
+
+    def record_llm_call(self, agent, stage: str, response, wall_seconds: float, cached: bool = False):
+        """Records one chat call from the final response (or final stream chunk) Ollama returned."""
+        response = response or {}
+        self._append({
+            'kind': 'llm', 'agent': agent.name, 'role': agent.role_type, 'stage': stage, 'model': agent.model,
+            'cached': cached,
+            'prompt_tokens': response.get('prompt_eval_count') or 0,
+            'completion_tokens': response.get('eval_count') or 0,
+            'load_seconds': (response.get('load_duration') or 0) / NS_PER_SECOND,
+            'prefill_seconds': (response.get('prompt_eval_duration') or 0) / NS_PER_SECOND,
+            'decode_seconds': (response.get('eval_duration') or 0) / NS_PER_SECOND,
+            'wall_seconds': wall_seconds,
+        })
+
+    def record_timing(self, kind: str, agent, stage: str, seconds: float):
+        """Records a non-LLM step ('retrieval' or 'summary')."""
+        self._append({'kind': kind, 'agent': agent.name, 'role': agent.role_type, 'stage': stage, 'model': agent.model,
+                      'wall_seconds': seconds})
+
+    def note_prefetched(self, key: tuple):
+        """Marks a retrieval cache entry as filled by a prefetch lookup (which is not recorded itself)."""
+        with self._lock:
+            self._prefetched_keys.add(key)
+
+    def record_retrieval_cache(self, agent, stage: str, hit: bool, key: tuple = None):
+        """Records whether a turn's retrieval was answered by the shared retrieval cache.
+
+        The first hit on an entry a prefetch filled is recorded as 'prefetched' rather than as a hit:
+        the lookup still happened, just ahead of the turn.
+        """
+        with self._lock:
+            prefetched = hit and key in self._prefetched_keys
+            self._prefetched_keys.discard(key)
+            self.records.append({'kind': 'retrieval_cache', 'agent': agent.name, 'role': agent.role_type, 'stage': stage,
+                                 'model': agent.model, 'hit': hit and not prefetched, 'prefetched': prefetched})
+
+    def record_prompt_budget(self, agent, stage: str, report: dict):
+        """Records the PromptBudget report of a prompt (estimated tokens per section, what was cut)."""
+        self._append({'kind': 'prompt_budget', 'agent': agent.name, 'role': agent.role_type, 'stage': stage, 'model': agent.model,
+                      'estimated_tokens': report['prompt_tokens'],
+                      'trimmed': bool(report['dropped_documents'] or report['examples_dropped'] or report['trimmed'])})
+
+    @staticmethod
+    def _totals(records: list) -> dict:
+        totals = {
+            'llm_calls': 0, 'cached_calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+            'load_seconds': 0.0, 'prefill_seconds': 0.0, 'decode_seconds': 0.0, 'llm_wall_seconds': 0.0,
+            'retrievals': 0, 'retrieval_seconds': 0.0, 'summaries': 0, 'summary_seconds': 0.0,
+            'budgeted_prompts': 0, 'trimmed_prompts': 0, 'estimated_prompt_tokens': 0,
+            'retrieval_cache_hits': 0, 'retrieval_cache_misses': 0, 'retrieval_cache_prefetched': 0,
+        }
+        for record in records:
+            if record['kind'] == 'llm':
+                totals['llm_calls'] += 1
+                totals['cached_calls'] += 1 if record['cached'] else 0
+                for key in ('prompt_tokens', 'completion_tokens', 'load_seconds', 'prefill_seconds', 'decode_seconds'):
+                    totals[key] += record[key]
+                totals['llm_wall_seconds'] += record['wall_seconds']
+            elif record['kind'] == 'retrieval':
+                totals['retrievals'] += 1
+                totals['retrieval_seconds'] += record['wall_seconds']
+            elif record['kind'] == 'summary':
+                totals['summaries'] += 1
+                totals['summary_seconds'] += record['wall_seconds']
+            elif record['kind'] == 'retrieval_cache':
+                if record['prefetched']:
+                    totals['retrieval_cache_prefetched'] += 1
+                else:
+                    totals['retrieval_cache_hits' if record['hit'] else 'retrieval_cache_misses'] += 1
+            elif record['kind'] == 'prompt_budget':
+                totals['budgeted_prompts'] += 1
+                totals['trimmed_prompts'] += 1 if record['trimmed'] else 0
+                totals['estimated_prompt_tokens'] += record['estimated_tokens']
+        totals['prefill_tokens_per_second'] = totals['prompt_tokens'] / totals['prefill_seconds'] if totals['prefill_seconds'] else None
+        totals['decode_tokens_per_second'] = totals['completion_tokens'] / totals['decode_seconds'] if totals['decode_seconds'] else None
+        for key, value in totals.items():
+            if isinstance(value, float):
+                totals[key] = round(value, 3)
+        return totals
+
+    def summarize(self, start: int = 0) -> dict:
+        """Totals over the records from position `start` (see mark()) to now."""
+        with self._lock:
+            records = self.records[start:]
+        return self._totals(records)
+
+    def report(self, start: int = 0) -> dict:
+        """Per-debate breakdown: overall totals plus totals per stage and per agent."""
+        with self._lock:
+            records = self.records[start:]
+        by_stage = {}
+        by_agent = {}
+        for record in records:
+            by_stage.setdefault(record['stage'] or 'unknown', []).append(record)
+            by_agent.setdefault(record['agent'], []).append(record)
+        return {
+            'total': self._totals(records),
+            'by_stage': {stage: self._totals(stage_records) for stage, stage_records in by_stage.items()},
+            'by_agent': {agent: self._totals(agent_records) for agent, agent_records in by_agent.items()},
+        }
+
+    @staticmethod
+    def format_report(report: dict) -> str:
+        """Human-readable version of report() for the console."""
+        lines = []
+        total = report['total']
+        lines.append(f"LLM calls: {total['llm_calls']} ({total['cached_calls']} cached), "
+                     f"{total['prompt_tokens']} prompt tokens, {total['completion_tokens']} generated tokens")
+        lines.append(f"Prefill: {total['prefill_seconds']:.2f}s | Decode: {total['decode_seconds']:.2f}s | "
+                     f"Model load: {total['load_seconds']:.2f}s | Retrieval: {total['retrieval_seconds']:.2f}s "
+                     f"({total['retrievals']}) | Summaries: {total['summary_seconds']:.2f}s ({total['summaries']})")
+        if total['trimmed_prompts']:
+            lines.append(f"Prompts trimmed to fit the context window: {total['trimmed_prompts']} of {total['budgeted_prompts']}")
+        for stage, totals in report['by_stage'].items():
+            lines.append(f"  {stage}: prefill {totals['prefill_seconds']:.2f}s, decode {totals['decode_seconds']:.2f}s, "
+                         f"retrieval {totals['retrieval_seconds']:.2f}s, {totals['prompt_tokens']}/{totals['completion_tokens']} tokens")
+        return "\n".join(lines)
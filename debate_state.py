@@ -1,36 +1,129 @@
 # debate_state.py
 
+import sys
+
+
+class Turn:
+    """One argument in the debate history.
+
+    Slotted (no per-instance __dict__) and with interned agent/role/stage names, since the same
+    few names repeat on every turn. Supports entry['argument']-style reads like the dicts it replaced.
+    """
+    __slots__ = ('agent', 'role', 'argument', 'stage', 'round')
+
+    def __init__(self, agent: str, role: str, argument: str, stage: str = None, round_index: int = 0):
+        self.agent = sys.intern(agent)
+        self.role = sys.intern(role)
+        self.argument = argument
+        self.stage = sys.intern(stage) if stage else None
+        self.round = round_index or 0
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def to_dict(self) -> dict:
+        return {'agent': self.agent, 'role': self.role, 'argument': self.argument, 'stage': self.stage, 'round': self.round}
+
+    def format(self) -> str:
+        """The turn as it appears in the history text."""
+        return f"[{self.role} - {self.agent}]:\n{self.argument}\n\n"
+
+
 class DebateState:
-    """Holds the state of the debate, including the topic and history."""
-    def __init__(self, topic: str):
+    """Holds the state of the debate, including the topic and history.
+
+    With a store (see debate_store.py), every argument is also appended to the debate's log as it
+    is added, so a crashed debate can be loaded again and resumed from its last completed turn.
+    """
+    def __init__(self, topic: str, *, debate_id: str = None, store=None):
         self.topic = topic
-        self.history = [] # List of dictionaries: [{'agent': name, 'role': role, 'argument': text}]
+        self.history = [] # List of Turn records, in speaking order
+        self.store = store
+        self.debate_id = debate_id
+        if store is not None:
+            self.debate_id = store.create(topic, debate_id) # Starts a new log (DebateStore.load() attaches the store afterwards)
+        self.judge_analysis = None # {'agent', 'role', 'argument'} once the judge has spoken
+        self.finished = False # True once the debate concluded normally
+
+        # Indexes, kept up to date by restore_argument()
+        self._turns = {} # (stage, round, agent name) -> Turn, for resuming
+        self._by_role = {} # role -> list of Turns, in order
+        self._by_stage = {} # stage -> list of Turns, in order
 
-    def add_argument(self, agent_name: str, agent_role: str, argument: str):
-        """Adds an argument to the debate history."""
-        self.history.append({
-            'agent': agent_name,
-            'role': agent_role,
-            'argument': argument
-        })
+        # Formatted history body, extended with only the new turns when it is next read
+        self._history_body = ""
+        self._history_body_upto = 0
+
+    def add_argument(self, agent_name: str, agent_role: str, argument: str, stage: str = None, round_index: int = 0):
+        """Adds an argument to the debate history (and to the store, if any)."""
+        turn = self.restore_argument(Turn(agent_name, agent_role, argument, stage, round_index))
+        if self.store is not None:
+            self.store.append(self.debate_id, {'type': 'turn', **turn.to_dict()})
+
+    def restore_argument(self, entry) -> Turn:
+        """Adds an argument loaded from a store (a Turn or a record dict), without writing it back."""
+        if not isinstance(entry, Turn):
+            entry = Turn(entry['agent'], entry['role'], entry['argument'], entry.get('stage'), entry.get('round'))
+        self.history.append(entry)
+        self._by_role.setdefault(entry.role, []).append(entry)
+        if entry.stage:
+            self._by_stage.setdefault(entry.stage, []).append(entry)
+            self._turns[(entry.stage, entry.round, entry.agent)] = entry
+        return entry
+
+    def get_turn(self, stage: str, round_index: int, agent_name: str) -> Turn or None:
+        """Returns the stored history entry for a completed turn, or None if it hasn't happened yet."""
+        return self._turns.get((stage, round_index, agent_name))
+
+    def get_turns_by_role(self, role: str) -> list:
+        """Returns every Turn from a role, in order."""
+        return list(self._by_role.get(role, ()))
+
+    def get_turns_by_stage(self, stage: str) -> list:
+        """Returns every Turn of a stage (all rounds), in order."""
+        return list(self._by_stage.get(stage, ()))
+
+    def set_judge_analysis(self, agent_name: str, agent_role: str, analysis: str):
+        """Records the judge's analysis (kept out of history, which only feeds the debaters' summaries)."""
+        self.judge_analysis = {'agent': agent_name, 'role': agent_role, 'argument': analysis}
+        if self.store is not None:
+            self.store.append(self.debate_id, {'type': 'judge', **self.judge_analysis})
+
+    def mark_finished(self):
+        """Marks the debate as concluded so it isn't resumed."""
+        self.finished = True
+        if self.store is not None:
+            self.store.append(self.debate_id, {'type': 'finished'})
 
     def get_history_text(self) -> str:
         """Returns the full debate history as formatted text."""
-        history_text = f"Debate Topic: {self.topic}\n\n-- Debate History --\n"
-        if not self.history:
-            history_text += "No arguments yet.\n"
-        else:
-            for entry in self.history:
-                history_text += f"[{entry['role']} - {entry['agent']}]:\n{entry['argument']}\n\n"
-        history_text += "-- End of History --\n"
-        return history_text
+        return self.format_history_text(self.get_history_body())
+
+    def get_history_body(self) -> str:
+        """Returns the formatted arguments of the full history, without the topic header."""
+        # Only turns added since the last call are formatted; history is append-only
+        if self._history_body_upto < len(self.history):
+            self._history_body += self.get_history_text_since(self._history_body_upto)
+            self._history_body_upto = len(self.history)
+        return self._history_body
+
+    def format_history_text(self, body: str) -> str:
+        """Wraps formatted arguments (e.g. a trimmed history body) in the topic header and history markers."""
+        if not body:
+            return f"Debate Topic: {self.topic}\n\n-- Debate History --\nNo arguments yet.\n-- End of History --\n"
+        return f"Debate Topic: {self.topic}\n\n-- Debate History --\n{body}-- End of History --\n"
+
+    def get_history_text_since(self, start_index: int) -> str:
+        """Returns only the arguments from history[start_index:] as formatted text."""
+        return "".join(turn.format() for turn in self.history[start_index:])
 
     def get_last_argument_text(self, from_role: str) -> str or None:
         """Returns the text of the last argument from a specific role."""
-        for entry in reversed(self.history):
-            if entry['role'] == from_role:
-                return entry['argument']
-        return None
+        turns = self._by_role.get(from_role)
+        return turns[-1].argument if turns else None
 
     def get_full_history_for_prompt(self) -> list:
         """Returns history formatted for Ollama's chat message list."""
@@ -39,4 +132,4 @@ class DebateState:
         # For now, let's just pass the whole history as a user message in the prompt string
         # or include relevant previous messages directly if we manage history more granularly for the API
         # For simplicity with current STAGE_PROMPTS, we'll format it as a string in the prompt.
-        return self.get_history_text() # Or a more structured format if needed
\ No newline at end of file
+        return self.get_history_text() # Or a more structured format if needed
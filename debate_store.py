@@ -0,0 +1,127 @@
+# debate_store.py
+
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Union
+
+from config import DEBATE_STORE_DIR, DEBATE_STORE_FSYNC
+from debate_state import DebateState
+
+
+class DebateStore:
+    """Append-only JSONL log of debates, one file per debate: <directory>/<debate_id>.jsonl
+
+    The first line is a 'debate' header (id, topic, created). After that every completed turn
+    appends a 'turn' record, the judge's analysis a 'judge' record and a normally concluded debate
+    a 'finished' record. Lines are never rewritten, so a crash can at worst leave a partially
+    written last line. load() cuts such a line off the file, so the next append starts on a line
+    of its own instead of being glued onto the fragment.
+    """
+    def __init__(self, directory: str = DEBATE_STORE_DIR, fsync: bool = DEBATE_STORE_FSYNC):
+        self.directory = directory
+        self.fsync = fsync # fsync after every record (survives power loss, not just a process crash)
+        self._lock = threading.Lock()
+
+    def _path(self, debate_id: str) -> str:
+        return os.path.join(self.directory, f"{debate_id}.jsonl")
+
+    def exists(self, debate_id: str) -> bool:
+        return os.path.isfile(self._path(debate_id))
+
+    def create(self, topic: str, debate_id: Union[str, None] = None) -> str:
+        """Starts a new debate log (replacing any existing log with the same id) and returns its id."""
+        debate_id = debate_id or uuid.uuid4().hex
+        os.makedirs(self.directory, exist_ok=True)
+        header = {"type": "debate", "debate_id": debate_id, "topic": topic, "created": time.time()}
+        with self._lock:
+            with open(self._path(debate_id), "w", encoding="utf-8") as f:
+                f.write(json.dumps(header, ensure_ascii=False) + "\n")
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+        return debate_id
+
+    def append(self, debate_id: str, record: dict):
+        """Appends one record to a debate's log."""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self._path(debate_id), "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+    def list_debates(self) -> list[dict]:
+        """Returns the header of every stored debate. Only the first line of each log is read."""
+        if not os.path.isdir(self.directory):
+            return []
+        headers = []
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".jsonl"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), "r", encoding="utf-8") as f:
+                    header = json.loads(f.readline())
+            except (OSError, ValueError):
+                continue
+            if header.get("type") == "debate":
+                headers.append(header)
+        return headers
+
+    def load(self, debate_id: str) -> Union[DebateState, None]:
+        """Rebuilds a DebateState from its log, attached to this store so new turns keep being appended.
+
+        Returns None if there is no log with that id.
+        """
+        try:
+            f = open(self._path(debate_id), "rb") # Binary, so line lengths are byte offsets for truncating
+        except FileNotFoundError:
+            return None
+
+        debate_state = None
+        intact_bytes = 0 # End of the last complete record
+        torn = False
+        with f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("no line end")
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash; anything after it can't be trusted either
+                    torn = True
+                    break
+                intact_bytes += len(line)
+                record_type = record.get("type")
+                if record_type == "debate":
+                    debate_state = DebateState(record["topic"], debate_id=debate_id)
+                elif debate_state is None:
+                    break
+                elif record_type == "turn":
+                    debate_state.restore_argument(record)
+                elif record_type == "judge":
+                    debate_state.judge_analysis = record
+                elif record_type == "finished":
+                    debate_state.finished = True
+        if torn and debate_state is not None:
+            print(f"Warning: Dropping truncated record at the end of debate log '{debate_id}'.", flush=True)
+            self._truncate(debate_id, intact_bytes)
+        if debate_state is not None:
+            debate_state.store = self # Attached only now so restoring doesn't write the records again
+        return debate_state
+
+    def _truncate(self, debate_id: str, size: int):
+        """Cuts a debate's log back to its first `size` bytes."""
+        with self._lock:
+            with open(self._path(debate_id), "r+b") as f:
+                f.truncate(size)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+
+# Store used by the UI (None unless DEBATE_STORE_DIR is set in config)
+debate_store = DebateStore(DEBATE_STORE_DIR) if DEBATE_STORE_DIR else None
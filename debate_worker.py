@@ -0,0 +1,54 @@
+# debate_worker.py
+
+import queue
+import threading
+
+
+class DebateWorker:
+    """Runs a debate event generator to completion on one long-lived background thread.
+
+    Every yielded event is put on `events` as {"item": event, "error": None} as soon as it is
+    produced, so turns run back to back while the UI drains the queue at its own pace.
+    When the generator finishes, {"item": None, "error": None} is queued; if it raises,
+    {"item": None, "error": exception} is queued instead.
+    """
+    def __init__(self, generator, name: str = "debate-worker"):
+        self.generator = generator
+        self.events = queue.Queue()
+        self._stop_requested = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            for event in self.generator:
+                self.events.put({"item": event, "error": None})
+                if self._stop_requested.is_set():
+                    break
+            self.events.put({"item": None, "error": None})
+        except Exception as e:
+            print(f"Debate Worker Error: {e}", flush=True)
+            self.events.put({"item": None, "error": e})
+        finally:
+            # Runs the generator's cleanup (e.g. cancelling parallel turns) on this thread
+            self.generator.close()
+
+    def stop(self):
+        """Asks the worker to stop after the event currently being produced."""
+        self._stop_requested.set()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def drain(self, max_items: int = 0) -> list:
+        """Returns every result queued right now (at most max_items if > 0) without waiting."""
+        results = []
+        while max_items <= 0 or len(results) < max_items:
+            try:
+                results.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return results
@@ -0,0 +1,95 @@
+# llm_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Union
+
+from config import LLM_RESPONSE_CACHE_ENABLED, LLM_RESPONSE_CACHE_PATH, LLM_RESPONSE_CACHE_MAX_MB
+
+
+class LLMResponseCache:
+    """On-disk cache of chat responses keyed by (model, full message list, options).
+
+    Only deterministic requests are cached: an explicit temperature of 0, or a fixed seed. With
+    Ollama's default sampling (temperature 0.8, random seed) the same request legitimately returns
+    different text, so those calls always go to the model. Entries are evicted least recently used
+    first once the stored text exceeds max_bytes.
+    """
+    def __init__(self, cache_path: str, max_bytes: int):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._total_bytes = 0
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, size INTEGER, last_used REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._db.commit()
+            self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        except Exception as e:
+            print(f"Could not open LLM response cache at {cache_path}: {e}. Response caching disabled.", flush=True)
+            self._db = None
+
+    @staticmethod
+    def is_cacheable(options: dict) -> bool:
+        """True if the options make the response reproducible (temperature 0, or a fixed seed)."""
+        return options.get('seed') is not None or options.get('temperature') == 0
+
+    @staticmethod
+    def make_key(model: str, messages: list, options: dict) -> str:
+        payload = json.dumps({'model': model, 'messages': messages, 'options': options}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Union[str, None]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, key: str, response: str):
+        if self._db is None:
+            return
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)",
+                             (key, response, size, time.time()))
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # Caller must hold self._lock. Drops least recently used entries until under max_bytes.
+        while self._total_bytes > self.max_bytes:
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 100").fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    return
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes": self._total_bytes}
+
+
+# Shared by all agents; None unless enabled in config (opt-in)
+llm_response_cache = LLMResponseCache(LLM_RESPONSE_CACHE_PATH, LLM_RESPONSE_CACHE_MAX_MB * 1024 * 1024) if LLM_RESPONSE_CACHE_ENABLED else None
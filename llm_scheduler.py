@@ -0,0 +1,174 @@
+# llm_scheduler.py
+
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Union
+
+from config import LLM_DEFAULT_CONCURRENCY, LLM_MODEL_CONCURRENCY
+
+# Request priorities (lower value is served first)
+PRIORITY_INTERACTIVE = 0 # A viewer is waiting on this call (the current speaker, a summary)
+PRIORITY_BACKGROUND = 1  # Work that is only needed later (e.g. parallel turns further down the speaking order)
+
+DEFAULT_SESSION = "default"
+
+
+class _Ticket:
+    """One waiting request. Granted by the scheduler; wakes a thread or an asyncio future."""
+    def __init__(self, session_id: str, priority: int, loop: Union[asyncio.AbstractEventLoop, None] = None):
+        self.session_id = session_id
+        self.priority = priority
+        self.granted = False
+        self.cancelled = False
+        self._event = threading.Event()
+        self._loop = loop
+        self._future = loop.create_future() if loop else None
+
+    def grant(self):
+        self.granted = True
+        self._event.set()
+        if self._future is not None:
+            self._loop.call_soon_threadsafe(lambda: self._future.done() or self._future.set_result(None))
+
+
+class _ModelQueue:
+    """Waiting tickets for one model, kept per session so sessions can be served round-robin."""
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self.waiting = {}          # session_id -> deque of tickets
+        self.round_robin = deque() # sessions with waiting tickets, in turn order
+
+    def push(self, ticket: _Ticket):
+        if ticket.session_id not in self.waiting:
+            self.waiting[ticket.session_id] = deque()
+            self.round_robin.append(ticket.session_id)
+        self.waiting[ticket.session_id].append(ticket)
+
+    def pop_next(self) -> Union[_Ticket, None]:
+        """Picks the most urgent head-of-queue ticket; ties go to the session whose turn it is."""
+        best_session = None
+        best_priority = None
+        for session_id in self.round_robin:
+            head = self.waiting[session_id][0]
+            if best_priority is None or head.priority < best_priority:
+                best_session, best_priority = session_id, head.priority
+        if best_session is None:
+            return None
+
+        tickets = self.waiting[best_session]
+        ticket = tickets.popleft()
+        # The served session goes to the back of the line
+        self.round_robin.remove(best_session)
+        if tickets:
+            self.round_robin.append(best_session)
+        else:
+            del self.waiting[best_session]
+        return ticket
+
+    def remove(self, ticket: _Ticket):
+        tickets = self.waiting.get(ticket.session_id)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self.waiting[ticket.session_id]
+                self.round_robin.remove(ticket.session_id)
+
+
+class LLMScheduler:
+    """Process-wide gate that every Agent LLM call goes through.
+
+    Each model gets its own concurrency limit. When a slot frees up, the next request is
+    the most urgent one (PRIORITY_INTERACTIVE before PRIORITY_BACKGROUND) and, among equally
+    urgent ones, the one from the session that was served least recently. That way one
+    session's burst of parallel turns can't starve another session's current speaker.
+    """
+    def __init__(self, default_limit: int = LLM_DEFAULT_CONCURRENCY, model_limits: Union[dict, None] = None):
+        self.default_limit = default_limit
+        self.model_limits = dict(model_limits or {})
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def _queue_for(self, model: str) -> _ModelQueue:
+        # Caller must hold self._lock
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = _ModelQueue(self.model_limits.get(model, self.default_limit))
+            self._queues[model] = queue
+        return queue
+
+    def _dispatch(self, queue: _ModelQueue):
+        # Caller must hold self._lock
+        while queue.active < queue.limit:
+            ticket = queue.pop_next()
+            if ticket is None:
+                return
+            queue.active += 1
+            ticket.grant()
+
+    def _enqueue(self, model: str, ticket: _Ticket):
+        with self._lock:
+            queue = self._queue_for(model)
+            queue.push(ticket)
+            self._dispatch(queue)
+
+    def _release(self, model: str):
+        with self._lock:
+            queue = self._queue_for(model)
+            queue.active -= 1
+            self._dispatch(queue)
+
+    def _abandon(self, model: str, ticket: _Ticket):
+        """Withdraws a ticket whose caller gave up; frees its slot if it was already granted."""
+        with self._lock:
+            ticket.cancelled = True
+            queue = self._queue_for(model)
+            if ticket.granted:
+                queue.active -= 1
+                self._dispatch(queue)
+            else:
+                queue.remove(ticket)
+
+    @contextmanager
+    def slot(self, model: str, session_id: Union[str, None] = None, priority: int = PRIORITY_INTERACTIVE):
+        """Blocks until a request slot for `model` is granted, and holds it for the with-block."""
+        ticket = _Ticket(session_id or DEFAULT_SESSION, priority)
+        self._enqueue(model, ticket)
+        try:
+            ticket._event.wait()
+        except BaseException:
+            self._abandon(model, ticket)
+            raise
+        try:
+            yield
+        finally:
+            self._release(model)
+
+    @asynccontextmanager
+    async def aslot(self, model: str, session_id: Union[str, None] = None, priority: int = PRIORITY_INTERACTIVE):
+        """Async version of slot(); waits without blocking the event loop."""
+        ticket = _Ticket(session_id or DEFAULT_SESSION, priority, loop=asyncio.get_running_loop())
+        self._enqueue(model, ticket)
+        try:
+            await ticket._future
+        except BaseException:
+            self._abandon(model, ticket)
+            raise
+        try:
+            yield
+        finally:
+            self._release(model)
+
+    def stats(self) -> dict:
+        """Returns {model: {'active', 'waiting', 'limit'}} for monitoring."""
+        with self._lock:
+            return {model: {'active': queue.active,
+                            'waiting': sum(len(tickets) for tickets in queue.waiting.values()),
+                            'limit': queue.limit}
+                    for model, queue in self._queues.items()}
+
+
+# Shared by every session in the process
+llm_scheduler = LLMScheduler(LLM_DEFAULT_CONCURRENCY, LLM_MODEL_CONCURRENCY)
@@ -1,8 +1,25 @@
 # main.py
 
-from config import DEBATE_TOPIC, AGENTS_CONFIG, NUMBER_OF_REBUTTAL_ROUNDS, ENABLE_RAG, KB_DIRECTORY
+# Headless batch runner: runs one debate per topic (optionally several at a time) without the UI
+# and writes each debate's events to a JSONL transcript. Used for evaluation sweeps, e.g.:
+#   python main.py --topics topics.txt --workers 4 --output ./transcripts
+import argparse
+import concurrent.futures
+import json
+import os
+import re
+import time
+from typing import Union
+
+from config import (
+    DEBATE_TOPIC, NUMBER_OF_REBUTTAL_ROUNDS, DEFAULT_MODEL, SOUTH_INDIAN_NAMES,
+    ENABLE_RAG, KB_DIRECTORY, VECTOR_STORE_PATH, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP,
+    PARALLEL_STAGE_TURNS, BATCH_WORKERS, BATCH_NUM_AGENT_PAIRS, BATCH_OUTPUT_DIR
+)
 from debate_state import DebateState
+from debate_store import DebateStore # Append-only debate logs, used for --resume
 from agents import DebateOrchestrator, AffirmativeAgent, NegativeAgent, JudgeAgent, Agent
+from llm_scheduler import PRIORITY_BACKGROUND
 from rag_pipeline import index_knowledge_base, get_retriever # Import RAG functions
 
 # Mapping from config type string to Agent class
@@ -39,62 +56,204 @@ def create_agent_instance(agent_config: dict, retriever=None) -> Agent:
              return agent_class(name=agent_name)
 
 
-def main():
-    """Sets up and runs the multi-agent debate with optional RAG."""
+def build_agent_configs(num_pairs: int, include_judge: bool) -> list[dict]:
+    """Agent configs for one debate: alternating Affirmative/Negative pairs, then the judge.
+
+    Names are taken from SOUTH_INDIAN_NAMES in order (not shuffled like the UI) so repeated
+    batch runs produce comparable transcripts.
+    """
+    total_agents = num_pairs * 2 + (1 if include_judge else 0)
+    names = [SOUTH_INDIAN_NAMES[i % len(SOUTH_INDIAN_NAMES)] for i in range(total_agents)]
+
+    agent_configs = []
+    for i in range(num_pairs):
+        agent_configs.append({'type': 'AffirmativeAgent', 'name': names[2 * i], 'model': DEFAULT_MODEL})
+        agent_configs.append({'type': 'NegativeAgent', 'name': names[2 * i + 1], 'model': DEFAULT_MODEL})
+    if include_judge:
+        agent_configs.append({'type': 'JudgeAgent', 'name': names[-1], 'model': DEFAULT_MODEL})
+    return agent_configs
+
+
+def load_topics(topics_path: Union[str, None]) -> list[str]:
+    """One topic per line; blank lines and lines starting with '#' are skipped. Defaults to DEBATE_TOPIC."""
+    if not topics_path:
+        return [DEBATE_TOPIC]
+    with open(topics_path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+
+def transcript_path(output_dir: str, index: int, topic: str) -> str:
+    """File name for a debate's transcript: <index>-<topic slug>.jsonl"""
+    slug = re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-")[:60] or "debate"
+    return os.path.join(output_dir, f"{index:03d}-{slug}.jsonl")
 
+
+def setup_retriever():
+    """Indexes/loads the knowledge base and returns a retriever, or None if RAG can't be used."""
+    print("\n--- Setting up Knowledge Base (RAG) ---", flush=True)
+    vector_store = index_knowledge_base(
+        kb_directory=KB_DIRECTORY,
+        vector_store_path=VECTOR_STORE_PATH,
+        embedding_model=EMBEDDING_MODEL,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
     retriever = None
-    if ENABLE_RAG:
-        print("\n--- Setting up Knowledge Base (RAG) ---", flush=True)
-        vector_store = index_knowledge_base(kb_directory=KB_DIRECTORY)
-        if vector_store:
-            retriever = get_retriever(vector_store)
-            if not retriever:
-                 print("Failed to get retriever from vector store. RAG will be disabled.", flush=True)
-                 retriever = None
-        else:
-            print("Knowledge base indexing failed or no documents found. RAG will be disabled.", flush=True)
-            retriever = None
-        print("--- Knowledge Base Setup Complete ---", flush=True)
+    if vector_store:
+        retriever = get_retriever(vector_store)
+        if not retriever:
+             print("Failed to get retriever from vector store. RAG will be disabled.", flush=True)
+    else:
+        print("Knowledge base indexing failed or no documents found. RAG will be disabled.", flush=True)
+    print("--- Knowledge Base Setup Complete ---", flush=True)
+    return retriever
 
 
-    debate_state = DebateState(topic=DEBATE_TOPIC)
+# Runs one complete debate and writes every event to its transcript as it happens.
+# Each debate has its own agents and DebateState; only the retriever (and its caches) is shared.
+# store is the sweep's DebateStore (see batch_debate_store), or None to keep the debate in memory only.
+def run_single_debate(index: int, topic: str, args: argparse.Namespace, retriever, output_dir: str,
+                      store: Union[DebateStore, None] = None) -> dict:
+    """Runs one debate to completion and returns its result record."""
+    path = transcript_path(output_dir, index, topic)
+    start_time = time.perf_counter()
+    result = {"type": "result", "index": index, "topic": topic, "transcript": path, "resumed": False,
+              "arguments": 0, "replayed_arguments": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    # The transcript name doubles as the debate id in the sweep's store, so a rerun with --resume finds it again
+    debate_id = os.path.splitext(os.path.basename(path))[0]
+    debate_state = None
+    if store is not None and args.resume:
+        debate_state = store.load(debate_id)
+        if debate_state is not None and debate_state.topic != topic:
+            debate_state = None # Topics file changed; this log belongs to a different debate
+        if debate_state is not None:
+            result["resumed"] = True
+            print(f"Resuming debate {index} ('{topic}') from {len(debate_state.history)} stored turn(s).", flush=True)
+    if debate_state is None:
+        debate_state = DebateState(topic=topic, debate_id=debate_id, store=store)
 
-    # Create agent instances from config, pass the retriever
     all_agents = []
-    for agent_config in AGENTS_CONFIG:
-        if agent_config.get('optional', False) and not True:
-             continue
+    for agent_config in build_agent_configs(args.pairs, not args.no_judge):
+        agent_instance = create_agent_instance(agent_config, retriever=retriever)
+        agent_instance.set_topic(topic)
+        all_agents.append(agent_instance)
+
+    orchestrator = DebateOrchestrator(
+        name="The Moderator",
+        debate_state=debate_state,
+        agents=all_agents,
+        model=DEFAULT_MODEL, # Orchestrator (summary) model
+        stream_responses=False, # Nobody is watching token by token
+        parallel_turns=args.parallel_turns,
+        session_id=f"batch-{index}", # Lets the LLM scheduler interleave concurrent debates fairly
+        priority=PRIORITY_BACKGROUND # Nobody is waiting on a batch turn (the scheduler only orders calls within this process)
+    )
+
+    with open(path, "w", encoding="utf-8") as f:
         try:
-            # Pass the retriever to the agent creation function
-            agent_instance = create_agent_instance(agent_config, retriever=retriever)
-            all_agents.append(agent_instance)
-            print(f"Created agent: {agent_instance.name} ({agent_instance.role_type}) using model {agent_instance.model}", flush=True)
-        except ValueError as e:
-            print(f"Skipping agent configuration due to error: {e}", flush=True)
+            for event in orchestrator.run_debate(num_rebuttal_rounds=args.rounds):
+                if event.get("type") == "argument" and event.get("replayed"):
+                    # Generated by an earlier run; token counts only cover this run's calls anyway
+                    result["replayed_arguments"] += 1
+                elif event.get("type") == "argument":
+                    result["arguments"] += 1
+                    if event.get("argument", "").startswith("ERROR:"):
+                        result["errors"] += 1
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
         except Exception as e:
-             print(f"An unexpected error occurred creating agent {agent_config.get('name', 'Unknown')}: {e}", flush=True)
+            result["error"] = f"ERROR: Debate failed: {e}"
+            print(f"Debate {index} ('{topic}') failed: {e}", flush=True)
 
+        for agent in all_agents + [orchestrator]:
+            result["prompt_tokens"] += agent.token_usage["prompt_tokens"]
+            result["completion_tokens"] += agent.token_usage["completion_tokens"]
+        result["duration_seconds"] = round(time.perf_counter() - start_time, 3)
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    return result
+
+
+# Debate ids are only unique within one output directory, so each sweep keeps its logs there
+# rather than in the UI's DEBATE_STORE_DIR, where sweeps would replace (or resume) each other's debates.
+def batch_debate_store(output_dir: str) -> DebateStore:
+    """The debate store of the sweep writing to output_dir."""
+    return DebateStore(os.path.join(output_dir, "debate_store"))
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run debates headlessly and write JSONL transcripts.")
+    parser.add_argument("--topics", help="File with one debate topic per line (default: DEBATE_TOPIC from config.py)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Debates to run concurrently")
+    parser.add_argument("--output", default=BATCH_OUTPUT_DIR, help="Directory for transcript files")
+    parser.add_argument("--pairs", type=int, default=BATCH_NUM_AGENT_PAIRS, help="Affirmative/Negative pairs per debate")
+    parser.add_argument("--rounds", type=int, default=NUMBER_OF_REBUTTAL_ROUNDS, help="Rebuttal rounds per debate")
+    parser.add_argument("--no-judge", action="store_true", help="Run without the judge agent")
+    parser.add_argument("--no-rag", action="store_true", help="Don't set up or use the knowledge base")
+    parser.add_argument("--resume", action="store_true", help="Continue debates from their stored turns instead of starting over")
+    parser.add_argument("--parallel-turns", action=argparse.BooleanOptionalAction, default=PARALLEL_STAGE_TURNS,
+                        help="Run the turns within a stage concurrently (default: PARALLEL_STAGE_TURNS from config.py)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Runs every topic as a debate on a worker pool and reports throughput."""
+    args = parse_args(argv)
+    if args.pairs < 1:
+        print("ERROR: --pairs must be at least 1.", flush=True)
+        return 1
 
-    # Create the orchestrator
-    try:
-        # Orchestrator doesn't need the retriever itself, agents do
-        orchestrator = DebateOrchestrator(
-            name="The Moderator",
-            debate_state=debate_state,
-            agents=all_agents,
-            model='dolphin-phi:latest' # Orchestrator model
-        )
-        print(f"Created orchestrator: {orchestrator.name}", flush=True)
-    except ValueError as e:
-         print(f"Failed to create orchestrator: {e}. Exiting.", flush=True)
-         return
-
-
-    # Run the debate
     try:
-        orchestrator.run_debate(num_rebuttal_rounds=NUMBER_OF_REBUTTAL_ROUNDS)
-    except Exception as e:
-        print(f"\nAn error occurred during the debate execution: {e}", flush=True)
+        topics = load_topics(args.topics)
+    except OSError as e:
+        print(f"ERROR: Could not read topics file: {e}", flush=True)
+        return 1
+    if not topics:
+        print("ERROR: No topics to debate.", flush=True)
+        return 1
+
+    retriever = setup_retriever() if ENABLE_RAG and not args.no_rag else None
+    os.makedirs(args.output, exist_ok=True)
+    store = batch_debate_store(args.output)
+
+    workers = max(1, args.workers)
+    print(f"\n--- Running {len(topics)} debate(s) with {workers} worker(s) ---", flush=True)
+    batch_start = time.perf_counter()
+    results = []
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_single_debate, index, topic, args, retriever, args.output, store): topic
+                   for index, topic in enumerate(topics, start=1)}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # Agent/orchestrator construction failed before a transcript could be written
+                print(f"ERROR: Debate '{futures[future]}' could not be started: {e}", flush=True)
+                continue
+            results.append(result)
+            print(f"Finished debate {result['index']}/{len(topics)} in {result['duration_seconds']:.1f}s "
+                  f"({result['arguments']} arguments{', %d replayed' % result['replayed_arguments'] if result['resumed'] else ''}, "
+                  f"{result['completion_tokens']} tokens) -> {result['transcript']}", flush=True)
+
+    # --- Throughput report ---
+    elapsed = time.perf_counter() - batch_start
+    completed = [r for r in results if "error" not in r]
+    # Debates resumed from the store were partly (or entirely) generated by an earlier run, so only
+    # debates generated from scratch count towards debates/hour
+    generated = [r for r in completed if not r["resumed"]]
+    resumed = [r for r in completed if r["resumed"]]
+    completion_tokens = sum(r["completion_tokens"] for r in results)
+    prompt_tokens = sum(r["prompt_tokens"] for r in results)
+    print("\n--- Batch Complete ---", flush=True)
+    print(f"Debates completed: {len(completed)}/{len(topics)} in {elapsed:.1f}s", flush=True)
+    if resumed:
+        print(f"Resumed: {len(resumed)} debate(s), {sum(r['replayed_arguments'] for r in resumed)} argument(s) replayed from the store "
+              f"and {sum(r['arguments'] for r in resumed)} generated (not counted in debates/hour)", flush=True)
+    print(f"Throughput: {len(generated) / elapsed * 3600:.1f} debates/hour" if elapsed > 0 else "Throughput: n/a", flush=True)
+    print(f"Tokens: {prompt_tokens} prompt, {completion_tokens} generated "
+          f"({completion_tokens / elapsed:.1f} generated tokens/s)" if elapsed > 0 else "Tokens: n/a", flush=True)
+    return 0 if len(completed) == len(topics) else 1
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
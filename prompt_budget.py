@@ -0,0 +1,154 @@
+# prompt_budget.py
+
+import math
+from typing import Callable, Union
+
+from langchain.schema import Document
+
+from config import CHARS_PER_TOKEN, PROMPT_BUDGET_MARGIN_TOKENS
+
+MESSAGE_OVERHEAD_TOKENS = 4 # Chat template tokens around each message (role markers etc.)
+MIN_TRIMMED_DOCUMENT_TOKENS = 32 # A chunk cut shorter than this is dropped instead
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for text (no tokenizer needed); about right for English, but can be over or under.
+
+    PromptBudget leaves PROMPT_BUDGET_MARGIN_TOKENS of headroom to absorb the estimation error.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+def estimate_message_tokens(messages) -> int:
+    """Estimated tokens for a list of chat messages."""
+    return sum(estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+def truncate_to_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """Cuts text to about max_tokens, marking the cut with '...'. keep_end keeps the last part instead of the first."""
+    max_chars = max(0, max_tokens * CHARS_PER_TOKEN - 3)
+    if len(text) <= max_chars + 3:
+        return text
+    return "..." + text[len(text) - max_chars:] if keep_end else text[:max_chars] + "..."
+
+
+class PromptBudget:
+    """Fits a prompt into the model's context window (num_ctx).
+
+    The window has to hold the prompt plus the tokens the model will generate (reserved_output_tokens),
+    with some headroom for the chat template. The prompt is accounted per section: system prompt,
+    few-shot examples, retrieved context, summary and the stage instruction itself. If it is too big,
+    the lowest-value pieces go first:
+      1. retrieved chunks, lowest ranked first, down to the best one
+      2. the few-shot examples (the instruction already describes the format)
+      3. the end of the remaining chunk (dropped entirely if too little would be left)
+      4. the start of the summary (the latest arguments are at its end)
+    The system prompt and the instruction are never cut. Prompts with a single variable-length part
+    (the summarizer's history, the judge's summary) go through fit_text() instead.
+    """
+    def __init__(self, num_ctx: int, reserved_output_tokens: int, margin_tokens: int = PROMPT_BUDGET_MARGIN_TOKENS):
+        self.num_ctx = num_ctx
+        self.reserved_output_tokens = max(0, reserved_output_tokens)
+        self.prompt_limit = num_ctx - self.reserved_output_tokens - margin_tokens
+
+    def fit(self, system_messages, example_messages, documents: list[Document], summary: Union[str, None],
+            render: Callable[[list, Union[str, None]], tuple]) -> tuple:
+        """Chooses what goes into the prompt.
+
+        render(documents, summary) must return (user_prompt, error) like DebateAgent._build_turn_prompt.
+        Returns (user_prompt, error, include_examples, report); report is the budget used (see _report).
+        """
+        documents = list(documents)
+        include_examples = True
+        system_tokens = estimate_message_tokens(system_messages)
+        example_tokens = estimate_message_tokens(example_messages)
+        dropped_documents, trimmed = 0, []
+
+        def over_by(user_prompt: str) -> int:
+            total = system_tokens + (example_tokens if include_examples else 0) + estimate_tokens(user_prompt) + MESSAGE_OVERHEAD_TOKENS
+            return total - self.prompt_limit
+
+        user_prompt, error = render(documents, summary)
+        if error:
+            return user_prompt, error, include_examples, None
+
+        # 1. Lowest-ranked chunks
+        while over_by(user_prompt) > 0 and len(documents) > 1:
+            documents.pop()
+            dropped_documents += 1
+            user_prompt, error = render(documents, summary)
+        # 2. Few-shot examples
+        if over_by(user_prompt) > 0 and example_messages:
+            include_examples = False
+        # 3. The remaining chunk
+        excess = over_by(user_prompt)
+        if excess > 0 and documents:
+            original = documents[0] # Documents are shared with the retrieval cache, so trim a copy
+            keep_tokens = estimate_tokens(original.page_content) - excess
+            while excess > 0 and keep_tokens >= MIN_TRIMMED_DOCUMENT_TOKENS:
+                documents[0] = Document(page_content=truncate_to_tokens(original.page_content, keep_tokens), metadata=original.metadata)
+                user_prompt, error = render(documents, summary)
+                excess = over_by(user_prompt)
+                keep_tokens -= max(1, excess) # Estimates round up, so a cut can land a token or two short
+            if excess > 0:
+                documents = []
+                dropped_documents += 1
+                user_prompt, error = render(documents, summary)
+            else:
+                trimmed.append('retrieved_context')
+        # 4. The summary
+        excess = over_by(user_prompt)
+        if excess > 0 and summary:
+            summary = truncate_to_tokens(summary, max(0, estimate_tokens(summary) - excess), keep_end=True)
+            trimmed.append('summary')
+            user_prompt, error = render(documents, summary)
+
+        report = self._report(system_tokens, example_tokens if include_examples else 0, documents, summary, user_prompt)
+        report.update({'dropped_documents': dropped_documents, 'examples_dropped': bool(example_messages) and not include_examples,
+                       'trimmed': trimmed, 'fits': over_by(user_prompt) <= 0})
+        return user_prompt, error, include_examples, report
+
+    def fit_text(self, system_messages, example_messages, text: str, render: Callable[[str], str], section: str = 'summary') -> tuple:
+        """Chooses what goes into a prompt whose only variable part is text.
+
+        render(text) must return the user prompt. If it is too big the few-shot examples go first, then
+        the start of text (the latest arguments are at its end); section names text in the report.
+        Returns (user_prompt, include_examples, report).
+        """
+        include_examples = True
+        system_tokens = estimate_message_tokens(system_messages)
+        example_tokens = estimate_message_tokens(example_messages)
+        trimmed = []
+
+        def over_by(user_prompt: str) -> int:
+            total = system_tokens + (example_tokens if include_examples else 0) + estimate_tokens(user_prompt) + MESSAGE_OVERHEAD_TOKENS
+            return total - self.prompt_limit
+
+        user_prompt = render(text)
+        if over_by(user_prompt) > 0 and example_messages:
+            include_examples = False
+        excess = over_by(user_prompt)
+        if excess > 0 and text:
+            original = text
+            keep_tokens = estimate_tokens(original) - excess
+            while excess > 0 and keep_tokens > 0:
+                text = truncate_to_tokens(original, keep_tokens, keep_end=True)
+                user_prompt = render(text)
+                excess = over_by(user_prompt)
+                keep_tokens -= max(1, excess) # Estimates round up, so a cut can land a token or two short
+            trimmed.append(section)
+
+        report = self._report(system_tokens, example_tokens if include_examples else 0, [], text, user_prompt)
+        report.update({'dropped_documents': 0, 'examples_dropped': bool(example_messages) and not include_examples,
+                       'trimmed': trimmed, 'fits': over_by(user_prompt) <= 0})
+        return user_prompt, include_examples, report
+
+    def _report(self, system_tokens: int, example_tokens: int, documents: list, summary: Union[str, None], user_prompt: str) -> dict:
+        """Estimated tokens per section of the final prompt, and the limits they were fitted to."""
+        context_tokens = sum(estimate_tokens(doc.page_content) for doc in documents)
+        summary_tokens = estimate_tokens(summary) if summary else 0
+        prompt_tokens = system_tokens + example_tokens + estimate_tokens(user_prompt) + MESSAGE_OVERHEAD_TOKENS
+        return {
+            'num_ctx': self.num_ctx, 'reserved_output_tokens': self.reserved_output_tokens, 'prompt_limit': self.prompt_limit,
+            'system': system_tokens, 'examples': example_tokens, 'retrieved_context': context_tokens, 'summary': summary_tokens,
+            'instruction': max(0, prompt_tokens - system_tokens - example_tokens - context_tokens - summary_tokens),
+            'prompt_tokens': prompt_tokens, 'documents': len(documents),
+        }
@@ -2,47 +2,165 @@
 
 import os
 import time
+import asyncio
+import array
+import hashlib
+import json
+import sqlite3
+import threading
+import concurrent.futures
+import contextvars
+import multiprocessing
 import ollama
-from typing import Union # <-- Import Union
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Union # <-- Import Union
 
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
+from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.retrievers import BaseRetriever
+from langchain_core.embeddings import Embeddings
 
 
-from config import KB_DIRECTORY, VECTOR_STORE_PATH, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, RETRIEVER_K
+from config import (
+    KB_DIRECTORY, VECTOR_STORE_PATH, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, RETRIEVER_K,
+    RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL_SECONDS,
+    EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MEMORY_SIZE,
+    INGEST_WORKERS, INDEX_BATCH_SIZE, EMBEDDING_CONCURRENCY, EMBEDDING_MAX_RETRIES,
+    OLLAMA_HOST, TRACE_OUTPUT_DIR
+)
+from tracing import tracer # Opt-in span tracing (no-op unless enabled in config)
 
 
-def load_documents(directory: str):
-    # ... (same as before)
-    print(f"Loading documents from {directory}...", flush=True)
-    if not os.path.exists(directory):
-        print(f"Knowledge base directory not found: {directory}", flush=True)
-        return []
-    loader = DirectoryLoader(directory, glob="*.pdf", loader_cls=PyPDFLoader)
-    documents = loader.load()
-    print(f"Loaded {len(documents)} documents.", flush=True)
-    return documents
-
-def split_text_into_chunks(documents, chunk_size: int, chunk_overlap: int):
-    # ... (same as before)
-    print(f"Splitting documents into chunks (size={chunk_size}, overlap={chunk_overlap})...", flush=True)
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap
-    )
-    chunks = text_splitter.split_documents(documents)
-    print(f"Created {len(chunks)} chunks.", flush=True)
-    return chunks
+# --- Embedding Cache ---
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that caches vectors by (model name, query/document, text hash).
+
+    Vectors are kept in a bounded in-memory LRU, so repeated retrieval queries and duplicate chunks
+    skip the Ollama round trip. If cache_path is set, query vectors are also kept in a SQLite file
+    so they survive restarts. Document vectors are not written there: Chroma already persists them,
+    and the manifest keeps unchanged files from being embedded again.
+    """
+    def __init__(self, embeddings: Embeddings, model_name: str, cache_path: Union[str, None] = None, max_memory_entries: int = EMBEDDING_CACHE_MEMORY_SIZE):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict() # key -> list[float]
+        self._lock = threading.Lock()
+        self._db = None
+        if cache_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+                self._db = sqlite3.connect(cache_path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+                self._db.commit()
+            except Exception as e:
+                print(f"Could not open embedding cache at {cache_path}: {e}. Using in-memory cache only.", flush=True)
+                self._db = None
+
+    def _key(self, text: str, kind: str) -> str:
+        # Queries and documents are kept apart: OllamaEmbeddings prefixes them with different instructions
+        return f"{self.model_name}:{kind}:" + hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _remember(self, key: str, vector: list):
+        # Caller must hold self._lock
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup_many(self, keys: list, persistent: bool = False) -> dict:
+        """Returns {key: vector} for every key found in memory (or, if persistent, on disk)."""
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                else:
+                    missing.append(key)
+            if missing and persistent and self._db is not None:
+                # Query in slices to stay under SQLite's bound-parameter limit
+                for i in range(0, len(missing), 500):
+                    batch = missing[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._db.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch).fetchall()
+                    for key, blob in rows:
+                        vector = array.array('d', blob).tolist()
+                        found[key] = vector
+                        self._remember(key, vector)
+        return found
+
+    def _store_many(self, items: list, persistent: bool = False):
+        """Stores (key, vector) pairs in memory (and, if persistent, on disk)."""
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+            if persistent and self._db is not None and items:
+                self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                                     [(key, array.array('d', vector).tobytes()) for key, vector in items])
+                self._db.commit()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text, "doc") for text in texts]
+        found = self._lookup_many(list(dict.fromkeys(keys)))
+
+        # Embed each distinct uncached text once
+        to_embed = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in to_embed:
+                to_embed[key] = text
+        with self._lock:
+            self.hits += len(texts) - len(to_embed)
+            self.misses += len(to_embed)
+
+        if to_embed:
+            with tracer.span('embedding', 'ollama', model=self.model_name, texts=len(to_embed)):
+                vectors = self.embeddings.embed_documents(list(to_embed.values()))
+            new_items = list(zip(to_embed.keys(), vectors))
+            self._store_many(new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self._key(text, "query")
+        found = self._lookup_many([key], persistent=True)
+        with self._lock:
+            if key in found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if key in found:
+            return found[key]
+        with tracer.span('embedding', 'ollama', model=self.model_name, texts=1, query=True):
+            vector = self.embeddings.embed_query(text)
+        self._store_many([(key, vector)], persistent=True)
+        return vector
+
+    def clear(self):
+        """Forgets every cached vector, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
 
 
 def create_embeddings(embedding_model: str):
     # ... (same as before)
     print(f"Creating embeddings model using Ollama: {embedding_model}...", flush=True)
     try:
-        embeddings = OllamaEmbeddings(model=embedding_model)
+        # Wrapped in a cache so identical texts/queries are only embedded once (see CachedEmbeddings)
+        # OllamaEmbeddings ignores the OLLAMA_HOST environment variable, so pass the configured host explicitly
+        base_embeddings = OllamaEmbeddings(model=embedding_model, base_url=OLLAMA_HOST) if OLLAMA_HOST else OllamaEmbeddings(model=embedding_model)
+        embeddings = CachedEmbeddings(base_embeddings, embedding_model, cache_path=EMBEDDING_CACHE_PATH)
         print("Embeddings model created successfully.", flush=True)
         return embeddings
     except Exception as e:
@@ -51,20 +169,93 @@ def create_embeddings(embedding_model: str):
         return None
 
 
-def create_vector_store(chunks, embeddings, vector_store_path: str):
-    # ... (same as before)
-    print(f"Creating vector store at {vector_store_path}...", flush=True)
-    if not embeddings:
-        print("Embeddings model is not available. Cannot create vector store.", flush=True)
-        return None
-    try:
-        vector_store = Chroma.from_documents(chunks, embeddings, persist_directory=vector_store_path)
-        # vector_store.persist() # Deprecated in newer Chroma
-        print("Vector store created and persisted.", flush=True)
-        return vector_store
-    except Exception as e:
-        print(f"Error creating vector store: {e}", flush=True)
-        return None
+# --- Batched Chunk Writer ---
+def _embed_with_retry(embeddings, texts: list, max_retries: int = EMBEDDING_MAX_RETRIES) -> list:
+    """Embeds a batch of texts, retrying with exponential backoff on failure."""
+    for attempt in range(max_retries + 1):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = 2 ** attempt
+            print(f"Embedding batch failed ({e}). Retrying in {delay}s...", flush=True)
+            time.sleep(delay)
+
+def write_chunks(vector_store, chunks: list, ids: list,
+                 batch_size: int = INDEX_BATCH_SIZE,
+                 concurrency: int = EMBEDDING_CONCURRENCY,
+                 progress_callback: Union[Callable[[int, int, float], None], None] = None) -> int:
+    """Embeds and upserts chunks into the vector store in batches.
+
+    Up to `concurrency` batches are embedded by Ollama at once while finished batches are
+    written to Chroma from this thread. Chunks whose ids are already in the store are
+    skipped, so with stable ids a crashed run resumes where it stopped. Progress and
+    throughput (chunks/s) are printed and passed to progress_callback(done, total, rate).
+    Returns the number of chunks written.
+    """
+    total = len(chunks)
+    if total == 0:
+        return 0
+    embeddings = vector_store.embeddings
+    start_time = time.monotonic()
+    done = 0
+    written = 0
+
+    def report():
+        elapsed = max(time.monotonic() - start_time, 1e-6)
+        rate = written / elapsed
+        print(f"Embedded {done}/{total} chunks ({rate:.1f} chunks/s)", flush=True)
+        if progress_callback:
+            progress_callback(done, total, rate)
+
+    # Skip batches (or parts of them) that an earlier, interrupted run already wrote
+    pending = []
+    for start in range(0, total, batch_size):
+        batch_chunks = chunks[start:start + batch_size]
+        batch_ids = ids[start:start + batch_size]
+        existing_ids = set(vector_store.get(ids=batch_ids, include=[]).get('ids', []))
+        if existing_ids:
+            done += len(existing_ids)
+            batch = [(chunk, chunk_id) for chunk, chunk_id in zip(batch_chunks, batch_ids) if chunk_id not in existing_ids]
+            batch_chunks = [chunk for chunk, _ in batch]
+            batch_ids = [chunk_id for _, chunk_id in batch]
+        if batch_chunks:
+            pending.append((batch_chunks, batch_ids))
+    if done:
+        print(f"Resuming: {done}/{total} chunks already in the vector store.", flush=True)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        pending_iter = iter(pending)
+        in_flight = {}
+
+        def submit_next():
+            batch = next(pending_iter, None)
+            if batch is not None:
+                texts = [chunk.page_content for chunk in batch[0]]
+                # In the caller's context, so the embedding spans land in the caller's trace
+                in_flight[executor.submit(contextvars.copy_context().run, _embed_with_retry, embeddings, texts)] = batch
+
+        for _ in range(max(1, concurrency) * 2):
+            submit_next()
+        while in_flight:
+            finished, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                batch_chunks, batch_ids = in_flight.pop(future)
+                vectors = future.result()
+                # Same call Chroma.add_texts makes, with the vectors we already computed
+                vector_store._collection.upsert(
+                    ids=batch_ids,
+                    embeddings=vectors,
+                    metadatas=[chunk.metadata or {'source': 'N/A'} for chunk in batch_chunks], # Chroma rejects empty metadata
+                    documents=[chunk.page_content for chunk in batch_chunks],
+                )
+                done += len(batch_ids)
+                written += len(batch_ids)
+                report()
+                submit_next()
+    return written
+
 
 def load_vector_store(embeddings, vector_store_path: str):
     # ... (same as before)
@@ -84,6 +275,153 @@ def load_vector_store(embeddings, vector_store_path: str):
         return None
 
 
+# --- Index Versioning ---
+# Every write to a vector store bumps its version, so cached retrieval results from
+# before the write are never served afterwards.
+_index_versions = {}
+
+def _vector_store_key(vector_store) -> str:
+    """Identifies a vector store by its persist directory (or object id for in-memory stores)."""
+    return getattr(vector_store, '_persist_directory', None) or f"memory:{id(vector_store)}"
+
+def bump_index_version(vector_store):
+    """Marks the vector store's contents as changed."""
+    key = _vector_store_key(vector_store)
+    _index_versions[key] = _index_versions.get(key, 0) + 1
+
+def get_index_version(retriever) -> str:
+    """Returns a version stamp for the index behind a retriever."""
+    vector_store = getattr(retriever, 'vectorstore', None)
+    if vector_store is None:
+        return f"retriever:{id(retriever)}"
+    key = _vector_store_key(vector_store)
+    return f"{key}@{_index_versions.get(key, 0)}"
+
+
+# --- Retrieval Result Cache ---
+class RetrievalCache:
+    """Thread-safe LRU/TTL cache of retrieved documents keyed by (normalized query, k, index version).
+
+    Teammates on the same side build identical queries for the same stage, so only the first
+    of them pays for the query embedding and the Chroma search.
+    """
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE, ttl_seconds: float = RETRIEVAL_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> (stored_at, documents)
+        self._lock = threading.Lock()
+        self._key_locks = {} # key -> Lock, so concurrent misses on one key retrieve only once
+        self._async_key_locks = {} # (event loop id, key) -> asyncio.Lock, the same for coroutines
+
+    @staticmethod
+    def make_key(query: str, k: int, index_version: str) -> tuple:
+        # Normalize case and whitespace so trivially different queries share an entry
+        return (" ".join(query.lower().split()), k, index_version)
+
+    def _lookup(self, key: tuple):
+        # Caller must hold self._lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, documents = entry
+        if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return documents
+
+    def get(self, query: str, k: int, index_version: str):
+        """Returns the cached documents or None, counting a hit or miss."""
+        key = self.make_key(query, k, index_version)
+        with self._lock:
+            documents = self._lookup(key)
+            if documents is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return documents
+
+    def put(self, query: str, k: int, index_version: str, documents: list):
+        """Stores retrieved documents, evicting the least recently used entry when full."""
+        if self.max_entries <= 0:
+            return
+        key = self.make_key(query, k, index_version)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(documents))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_retrieve(self, query: str, k: int, index_version: str, retrieve: Callable[[], list]) -> list:
+        """Returns cached documents, or calls retrieve() once per key and caches the result."""
+        key = self.make_key(query, k, index_version)
+        with self._lock:
+            documents = self._lookup(key)
+            if documents is not None:
+                self.hits += 1
+                return documents
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have filled the entry while we waited for the key lock
+            with self._lock:
+                documents = self._lookup(key)
+                if documents is not None:
+                    self.hits += 1
+                    return documents
+                self.misses += 1
+            try:
+                documents = retrieve()
+                self.put(query, k, index_version, documents)
+                return documents
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    async def aget_or_retrieve(self, query: str, k: int, index_version: str, retrieve: Callable[[], Awaitable[list]]) -> list:
+        """Async version of get_or_retrieve(): awaits retrieve() once per key and caches the result."""
+        key = self.make_key(query, k, index_version)
+        # asyncio locks belong to one event loop, so coroutines on different loops don't share them
+        lock_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            documents = self._lookup(key)
+            if documents is not None:
+                self.hits += 1
+                return documents
+            key_lock = self._async_key_locks.setdefault(lock_key, asyncio.Lock())
+
+        async with key_lock:
+            # Another coroutine may have filled the entry while we waited for the key lock
+            with self._lock:
+                documents = self._lookup(key)
+                if documents is not None:
+                    self.hits += 1
+                    return documents
+                self.misses += 1
+            try:
+                documents = await retrieve()
+                self.put(query, k, index_version, documents)
+                return documents
+            finally:
+                with self._lock:
+                    self._async_key_locks.pop(lock_key, None)
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters and current size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by every agent in the process
+retrieval_cache = RetrievalCache()
+
+
 # Correct the type hint here: BaseRetriever | None becomes Union[BaseRetriever, None]
 def get_retriever(vector_store) -> Union[BaseRetriever, None]: # <-- Use Union
     """Gets a retriever object from the vector store using configured k."""
@@ -98,41 +436,310 @@ def get_retriever(vector_store) -> Union[BaseRetriever, None]: # <-- Use Union
         return None
 
 
+# --- Incremental Indexing ---
+# A manifest stored next to the vector store records, for every indexed PDF, its size, mtime,
+# content hash and the ids of its chunks. On each run only added/changed files are re-chunked
+# and re-embedded, and chunks of removed files are deleted.
+MANIFEST_FILENAME = "kb_manifest.json"
+
+def _manifest_path(vector_store_path: str) -> str:
+    return os.path.join(vector_store_path, MANIFEST_FILENAME)
+
+def load_manifest(vector_store_path: str) -> Union[dict, None]:
+    """Returns the indexing manifest, or None if there is none (or it is unreadable)."""
+    path = _manifest_path(vector_store_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Could not read index manifest {path}: {e}. Re-indexing all files.", flush=True)
+        return None
+
+def save_manifest(vector_store_path: str, manifest: dict):
+    """Writes the manifest atomically so a crash never leaves a half-written file."""
+    os.makedirs(vector_store_path, exist_ok=True)
+    path = _manifest_path(vector_store_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def scan_kb_files(kb_directory: str) -> dict:
+    """Returns {source path: {'size', 'mtime'}} for every PDF in the KB directory.
+
+    Paths are formatted the way PyPDFLoader records them in chunk metadata['source'].
+    """
+    files = {}
+    if not os.path.isdir(kb_directory):
+        return files
+    for path in sorted(Path(kb_directory).glob("*.pdf")):
+        if not path.is_file():
+            continue
+        stat = path.stat()
+        files[str(path)] = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    return files
+
+def load_and_split_file(path: str, chunk_size: int, chunk_overlap: int) -> list:
+    """Loads one PDF and splits it into chunks. Runs inside ingest worker processes."""
+    documents = PyPDFLoader(path).load()
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return text_splitter.split_documents(documents)
+
+def iter_split_files(paths: list, chunk_size: int, chunk_overlap: int, workers: int = INGEST_WORKERS):
+    """Yields (path, chunks, error) for each PDF, parsing and splitting them on a process pool.
+
+    Results come back in completion order. At most 2 * workers files are in flight at once,
+    so only a bounded number of parsed files are held in memory while the caller embeds them.
+    """
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(paths))
+
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield path, load_and_split_file(path, chunk_size, chunk_overlap), None
+            except Exception as e:
+                yield path, None, e
+        return
+
+    try:
+        # Spawned rather than forked: this runs inside the Streamlit process, where a forked child could
+        # inherit a lock some server or debate thread held at fork time and deadlock on it
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    except Exception as e:
+        print(f"Could not start ingest process pool ({e}). Parsing PDFs in this process.", flush=True)
+        yield from iter_split_files(paths, chunk_size, chunk_overlap, workers=1)
+        return
+
+    with executor:
+        pending_paths = iter(paths)
+        in_flight = {}
+
+        def submit_next():
+            path = next(pending_paths, None)
+            if path is not None:
+                in_flight[executor.submit(load_and_split_file, path, chunk_size, chunk_overlap)] = path
+
+        for _ in range(workers * 2):
+            submit_next()
+        while in_flight:
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                path = in_flight.pop(future)
+                submit_next()
+                try:
+                    yield path, future.result(), None
+                except Exception as e:
+                    yield path, None, e
+
+def _delete_source_chunks(vector_store, source: str, chunk_ids: Union[list, None]):
+    """Deletes a file's chunks by recorded id, or by metadata['source'] when ids are unknown."""
+    if chunk_ids is None:
+        chunk_ids = vector_store.get(where={"source": source}).get('ids', [])
+    if chunk_ids:
+        vector_store.delete(ids=chunk_ids)
+
+def sync_knowledge_base(vector_store, kb_directory: str, vector_store_path: str, chunk_size: int, chunk_overlap: int) -> dict:
+    """Brings the vector store in line with the PDFs in kb_directory.
+
+    Returns counts of added/changed/removed/unchanged files.
+    """
+    manifest = load_manifest(vector_store_path)
+    settings = {'chunk_size': chunk_size, 'chunk_overlap': chunk_overlap}
+    if manifest is not None and manifest.get('settings') != settings:
+        print("Chunk settings changed since last index. Re-indexing all files.", flush=True)
+        for source, entry in manifest.get('files', {}).items():
+            _delete_source_chunks(vector_store, source, entry.get('chunk_ids'))
+        manifest = None
+
+    current_files = scan_kb_files(kb_directory)
+    if manifest is None:
+        # No manifest (first run, or a store built before manifests existed): drop chunks of
+        # files that are gone; every present file is indexed once (keeping chunks it already has, see below).
+        manifest = {'settings': settings, 'files': {}}
+        existing = vector_store.get(include=["metadatas"])
+        stale_ids = [chunk_id for chunk_id, metadata in zip(existing.get('ids', []), existing.get('metadatas', []))
+                     if (metadata or {}).get('source') not in current_files]
+        if stale_ids:
+            vector_store.delete(ids=stale_ids)
+    removed_sources = [source for source in manifest['files'] if source not in current_files]
+
+    counts = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+
+    # Removed files
+    for source in removed_sources:
+        _delete_source_chunks(vector_store, source, manifest['files'][source].get('chunk_ids'))
+        manifest['files'].pop(source, None)
+        counts['removed'] += 1
+        save_manifest(vector_store_path, manifest)
+
+    # Find added or changed files
+    content_hashes = {}
+    for source, stat in current_files.items():
+        entry = manifest['files'].get(source)
+        if entry and entry['size'] == stat['size'] and entry['mtime'] == stat['mtime']:
+            counts['unchanged'] += 1
+            continue
+
+        try:
+            content_hash = _file_sha256(source)
+        except OSError as e:
+            print(f"Error reading {source}: {e}. Skipping it.", flush=True)
+            continue
+        if entry and entry['sha256'] == content_hash:
+            # Touched but not modified: just record the new mtime
+            entry.update(stat)
+            counts['unchanged'] += 1
+            continue
+        content_hashes[source] = content_hash
+    save_manifest(vector_store_path, manifest)
+
+    # Parse/split them in parallel and embed each file's chunks as soon as it is ready
+    for source, chunks, error in iter_split_files(list(content_hashes), chunk_size, chunk_overlap):
+        if error is not None:
+            # Leave the manifest entry alone so the file is retried on the next run
+            print(f"Error loading {source}: {error}. Skipping it.", flush=True)
+            continue
+        print(f"Indexing {source} ({len(chunks)} chunks)...", flush=True)
+        stat = current_files[source]
+        content_hash = content_hashes[source]
+        entry = manifest['files'].get(source)
+        # Deterministic ids (per path and content): a re-run after a crash finds the chunks it already wrote
+        id_prefix = hashlib.sha1(source.encode('utf-8')).hexdigest()[:12] + "-" + content_hash[:16]
+        chunk_ids = [f"{id_prefix}-{i}" for i in range(len(chunks))]
+        if entry:
+            # Changed file: its previous chunks have other ids (older content hash)
+            _delete_source_chunks(vector_store, source, entry.get('chunk_ids'))
+        else:
+            # New to the manifest, which includes a file whose indexing was interrupted: keep the chunks
+            # already written for this content (write_chunks skips them) and drop any others for this source
+            new_ids = set(chunk_ids)
+            stale_ids = [chunk_id for chunk_id in vector_store.get(where={"source": source}, include=[]).get('ids', []) if chunk_id not in new_ids]
+            if stale_ids:
+                vector_store.delete(ids=stale_ids)
+        write_chunks(vector_store, chunks, chunk_ids)
+        manifest['files'][source] = {**stat, 'sha256': content_hash, 'chunk_ids': chunk_ids}
+        counts['changed' if entry else 'added'] += 1
+        save_manifest(vector_store_path, manifest)
+
+    if counts['added'] or counts['changed'] or counts['removed']:
+        bump_index_version(vector_store)
+    save_manifest(vector_store_path, manifest)
+    print(f"Knowledge base sync: {counts['added']} added, {counts['changed']} changed, "
+          f"{counts['removed']} removed, {counts['unchanged']} unchanged.", flush=True)
+    return counts
+
+
+# --- Warm Vector Store Registry ---
+# Opening Chroma (and the embedding cache) has a noticeable startup cost, so every store opened
+# by index_knowledge_base is kept here, keyed by (absolute path, embedding model), and reused
+# by later RAG setups in the same process.
+_vector_store_registry = {}
+_registry_lock = threading.Lock()
+_registry_key_locks = {} # key -> Lock, so two sessions don't open/sync the same store at once
+
+def _registry_key(vector_store_path: str, embedding_model: str) -> tuple:
+    return (os.path.abspath(vector_store_path), embedding_model)
+
+def _vector_store_is_healthy(vector_store, vector_store_path: str) -> bool:
+    """Cheap integrity check: the directory still exists and the collection answers a count."""
+    if not os.path.isdir(vector_store_path):
+        return False
+    try:
+        vector_store._collection.count()
+        return True
+    except Exception as e:
+        print(f"Cached vector store at {vector_store_path} failed integrity check: {e}", flush=True)
+        return False
+
+def get_registered_vector_store(vector_store_path: str, embedding_model: str):
+    """Returns the warm vector store for (path, model) if one is open and healthy, else None."""
+    key = _registry_key(vector_store_path, embedding_model)
+    with _registry_lock:
+        vector_store = _vector_store_registry.get(key)
+    if vector_store is not None and not _vector_store_is_healthy(vector_store, vector_store_path):
+        evict_vector_store(vector_store_path, embedding_model)
+        return None
+    return vector_store
+
+def evict_vector_store(vector_store_path: str, embedding_model: str):
+    """Forgets a registered vector store so the next setup opens it fresh."""
+    with _registry_lock:
+        _vector_store_registry.pop(_registry_key(vector_store_path, embedding_model), None)
+
+
 def index_knowledge_base(kb_directory: str,
                          vector_store_path: str,
                          embedding_model: str,
                          chunk_size: int,
                          chunk_overlap: int):
-    # ... (same as before)
+    """Opens (or creates, or reuses) the vector store and incrementally syncs it with the KB directory."""
     print("Starting knowledge base indexing/loading...", flush=True)
-    embeddings = create_embeddings(embedding_model)
-    if not embeddings:
-        print("Embedding model creation failed. Cannot index/load knowledge base.", flush=True)
-        return None
+    key = _registry_key(vector_store_path, embedding_model)
+    with _registry_lock:
+        key_lock = _registry_key_locks.setdefault(key, threading.Lock())
 
-    if os.path.exists(vector_store_path):
-        print("Vector store directory found. Attempting to load...", flush=True)
-        vector_store = load_vector_store(embeddings, vector_store_path)
-        if vector_store:
-            print("Vector store loaded successfully. Skipping indexing.", flush=True)
-            return vector_store
-
-    print("Vector store not found or loading failed. Indexing documents...", flush=True)
-    documents = load_documents(kb_directory)
-    if not documents:
-        print("No documents found in KB directory to index.", flush=True)
-        return None
+    with key_lock:
+        vector_store = get_registered_vector_store(vector_store_path, embedding_model)
+        if vector_store is not None:
+            print("Reusing already open vector store.", flush=True)
+        else:
+            embeddings = create_embeddings(embedding_model)
+            if not embeddings:
+                print("Embedding model creation failed. Cannot index/load knowledge base.", flush=True)
+                return None
+
+            if os.path.exists(vector_store_path):
+                print("Vector store directory found. Attempting to load...", flush=True)
+                vector_store = load_vector_store(embeddings, vector_store_path)
+
+            if not vector_store:
+                print(f"Creating vector store at {vector_store_path}...", flush=True)
+                try:
+                    vector_store = Chroma(persist_directory=vector_store_path, embedding_function=embeddings)
+                except Exception as e:
+                    print(f"Error creating vector store: {e}", flush=True)
+                    return None
 
-    chunks = split_text_into_chunks(documents, chunk_size, chunk_overlap)
-    vector_store = create_vector_store(chunks, embeddings, vector_store_path)
+        if not os.path.isdir(kb_directory):
+            print(f"Knowledge base directory not found: {kb_directory}. Using the vector store as is.", flush=True)
+        else:
+            # Indexing isn't part of any debate, so it gets a trace of its own, written out when it is done
+            trace_id = tracer.new_trace("index")
+            try:
+                # Cheap when nothing changed: only file sizes/mtimes are compared
+                with tracer.bound(trace_id), tracer.span('sync_knowledge_base', 'chroma', kb_directory=kb_directory):
+                    sync_knowledge_base(vector_store, kb_directory, vector_store_path, chunk_size, chunk_overlap)
+            except Exception as e:
+                print(f"Error while indexing knowledge base: {e}", flush=True)
+                return None
+            finally:
+                if tracer.enabled:
+                    tracer.export(os.path.join(TRACE_OUTPUT_DIR, f"trace_index_{int(time.time() * 1000)}.json"), trace_id)
 
-    if vector_store:
-        print("Verifying created vector store...", flush=True)
-        verified_store = load_vector_store(embeddings, vector_store_path)
-        if not verified_store:
-            print("Warning: Could not load the newly created vector store.", flush=True)
-        return verified_store
+        # The same handle that was written to is returned; no second client is opened to "verify" it
+        if not _vector_store_is_healthy(vector_store, vector_store_path):
+            print("Warning: Vector store failed its integrity check.", flush=True)
+            evict_vector_store(vector_store_path, embedding_model)
+            return None
 
-    return None
+        with _registry_lock:
+            _vector_store_registry[key] = vector_store
+
+        if vector_store._collection.count() == 0:
+            print("No documents found in KB directory to index.", flush=True)
+            return None
+
+        return vector_store
 
 # Removed __main__ block
\ No newline at end of file
@@ -0,0 +1,24 @@
+# tests/test_debate_metrics.py
+
+from debate_metrics import DebateMetrics
+
+
+class _Agent:
+    def __init__(self, name: str):
+        self.name = name
+        self.role_type = "Affirmative"
+        self.model = "llama3"
+
+
+def test_prefetched_lookups_are_not_counted_as_hits():
+    metrics = DebateMetrics()
+    first, second, teammate = _Agent("Arjun"), _Agent("Kavya"), _Agent("Ravi")
+    metrics.record_retrieval_cache(first, "rebuttal", hit=False, key=("q1", 3, "kb@1")) # Looked up by the turn itself
+    metrics.note_prefetched(("q2", 3, "kb@1")) # Looked up ahead of the next speaker's turn
+    metrics.record_retrieval_cache(second, "rebuttal", hit=True, key=("q2", 3, "kb@1"))
+    metrics.record_retrieval_cache(teammate, "rebuttal", hit=True, key=("q2", 3, "kb@1")) # Reuses the same entry
+
+    totals = metrics.summarize()
+    assert totals['retrieval_cache_misses'] == 1
+    assert totals['retrieval_cache_prefetched'] == 1
+    assert totals['retrieval_cache_hits'] == 1
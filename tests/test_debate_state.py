@@ -0,0 +1,58 @@
+# tests/test_debate_state.py
+
+from debate_state import DebateState
+
+
+def test_empty_history():
+    debate_state = DebateState("Remote work is better")
+    assert debate_state.get_history_text() == (
+        "Debate Topic: Remote work is better\n\n-- Debate History --\nNo arguments yet.\n-- End of History --\n")
+
+
+def test_history_since_only_has_the_new_turns():
+    # The rolling summary only sends the arguments made since the previous summary
+    debate_state = DebateState("Remote work is better")
+    debate_state.add_argument("Arjun", "Affirmative", "First point", stage="opening_statement")
+    debate_state.add_argument("Meera", "Negative", "Counter point", stage="opening_statement")
+    assert debate_state.get_history_text_since(1) == "[Negative - Meera]:\nCounter point\n\n"
+    assert debate_state.get_history_text_since(2) == ""
+
+
+def _formatted_from_scratch(debate_state: DebateState) -> str:
+    body = "".join(f"[{turn.role} - {turn.agent}]:\n{turn.argument}\n\n" for turn in debate_state.history)
+    return f"Debate Topic: {debate_state.topic}\n\n-- Debate History --\n{body}-- End of History --\n"
+
+
+def test_cached_history_text_picks_up_new_turns():
+    debate_state = DebateState("Remote work is better")
+    debate_state.add_argument("Arjun", "Affirmative", "First point", stage="opening_statement")
+    assert debate_state.get_history_text() == _formatted_from_scratch(debate_state)
+    assert debate_state.get_history_text() == _formatted_from_scratch(debate_state) # Read again without changes
+
+    debate_state.add_argument("Meera", "Negative", "Counter point", stage="opening_statement")
+    debate_state.add_argument("Arjun", "Affirmative", "Rebuttal", stage="rebuttal", round_index=1)
+    assert debate_state.get_history_text() == _formatted_from_scratch(debate_state)
+    assert debate_state.get_history_body() == debate_state.get_history_text_since(0)
+
+
+def test_indexes():
+    debate_state = DebateState("Remote work is better")
+    debate_state.add_argument("Arjun", "Affirmative", "First point", stage="opening_statement")
+    debate_state.add_argument("Meera", "Negative", "Counter point", stage="opening_statement")
+    debate_state.add_argument("Arjun", "Affirmative", "Rebuttal", stage="rebuttal", round_index=1)
+
+    assert [turn.argument for turn in debate_state.get_turns_by_role("Affirmative")] == ["First point", "Rebuttal"]
+    assert [turn.argument for turn in debate_state.get_turns_by_stage("opening_statement")] == ["First point", "Counter point"]
+    assert debate_state.get_turn("rebuttal", 1, "Arjun").argument == "Rebuttal"
+    assert debate_state.get_turn("rebuttal", 2, "Arjun") is None
+    assert debate_state.get_last_argument_text("Negative") == "Counter point"
+    assert debate_state.get_last_argument_text("Judge") is None
+
+
+def test_trimmed_body_keeps_the_topic_header():
+    # The summary prompt trims only the arguments to fit the context window, then adds the header back
+    debate_state = DebateState("Remote work is better")
+    debate_state.add_argument("Arjun", "Affirmative", "First point", stage="opening_statement")
+    assert debate_state.format_history_text(debate_state.get_history_body()) == debate_state.get_history_text()
+    assert debate_state.format_history_text("...point\n\n") == (
+        "Debate Topic: Remote work is better\n\n-- Debate History --\n...point\n\n-- End of History --\n")
@@ -0,0 +1,43 @@
+# tests/test_debate_store.py
+
+from debate_state import DebateState
+from debate_store import DebateStore
+
+
+def _start_debate(store: DebateStore) -> DebateState:
+    debate_state = DebateState("Remote work is better", debate_id="torn", store=store)
+    debate_state.add_argument("Arjun", "Affirmative", "First point", stage="opening_statement")
+    debate_state.add_argument("Meera", "Negative", "Counter point", stage="opening_statement")
+    return debate_state
+
+
+def test_load_restores_turns(tmp_path):
+    store = DebateStore(str(tmp_path), fsync=False)
+    _start_debate(store)
+
+    loaded = store.load("torn")
+    assert loaded.topic == "Remote work is better"
+    assert [turn.argument for turn in loaded.history] == ["First point", "Counter point"]
+    assert loaded.store is store
+
+
+def test_resume_after_torn_last_line(tmp_path):
+    store = DebateStore(str(tmp_path), fsync=False)
+    _start_debate(store)
+    path = tmp_path / "torn.jsonl"
+    intact = path.read_bytes()
+    # Crash halfway through writing the third turn
+    with open(path, "ab") as f:
+        f.write(b'{"type": "turn", "agent": "Kavya", "role": "Affirm')
+
+    resumed = store.load("torn")
+    assert [turn.argument for turn in resumed.history] == ["First point", "Counter point"]
+    assert path.read_bytes() == intact # The fragment is cut off
+
+    resumed.add_argument("Kavya", "Affirmative", "Rebuttal", stage="rebuttal", round_index=1)
+    resumed.mark_finished()
+
+    reloaded = store.load("torn")
+    assert [turn.argument for turn in reloaded.history] == ["First point", "Counter point", "Rebuttal"]
+    assert reloaded.get_turn("rebuttal", 1, "Kavya") is not None
+    assert reloaded.finished
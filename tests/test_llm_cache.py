@@ -0,0 +1,52 @@
+# tests/test_llm_cache.py
+
+import time
+
+from llm_cache import LLMResponseCache
+
+
+def test_only_reproducible_requests_are_cacheable():
+    assert not LLMResponseCache.is_cacheable({})
+    assert not LLMResponseCache.is_cacheable({'temperature': 0.8})
+    assert not LLMResponseCache.is_cacheable({'num_predict': 100, 'seed': None})
+    assert LLMResponseCache.is_cacheable({'temperature': 0})
+    assert LLMResponseCache.is_cacheable({'seed': 42})
+    assert LLMResponseCache.is_cacheable({'seed': 42, 'temperature': 0.8})
+
+
+def test_key_covers_model_messages_and_options():
+    messages = [{'role': 'user', 'content': "Opening statement, please"}]
+    key = LLMResponseCache.make_key("llama3", messages, {'seed': 1, 'num_predict': 100})
+    # Option order doesn't matter
+    assert key == LLMResponseCache.make_key("llama3", messages, {'num_predict': 100, 'seed': 1})
+    assert key != LLMResponseCache.make_key("mistral", messages, {'seed': 1, 'num_predict': 100})
+    assert key != LLMResponseCache.make_key("llama3", messages, {'seed': 2, 'num_predict': 100})
+    assert key != LLMResponseCache.make_key("llama3", [{'role': 'user', 'content': "Rebuttal, please"}], {'seed': 1, 'num_predict': 100})
+
+
+def test_get_and_put(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "responses.sqlite"), max_bytes=1024)
+    assert cache.get("a") is None
+    cache.put("a", "First point")
+    assert cache.get("a") == "First point"
+    assert cache.stats() == {"hits": 1, "misses": 1, "bytes": len("First point")}
+
+    # Entries survive reopening the file
+    reopened = LLMResponseCache(str(tmp_path / "responses.sqlite"), max_bytes=1024)
+    assert reopened.get("a") == "First point"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "responses.sqlite"), max_bytes=10)
+    cache.put("a", "aaaaa")
+    time.sleep(0.01)
+    cache.put("b", "bbbbb")
+    time.sleep(0.01)
+    assert cache.get("a") == "aaaaa" # a is now more recently used than b
+    time.sleep(0.01)
+    cache.put("c", "ccccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaaa"
+    assert cache.get("c") == "ccccc"
+    assert cache.stats()["bytes"] == 10
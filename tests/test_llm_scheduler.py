@@ -0,0 +1,88 @@
+# tests/test_llm_scheduler.py
+
+import threading
+import time
+
+from llm_scheduler import LLMScheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _stats(scheduler: LLMScheduler, model: str) -> dict:
+    return scheduler.stats().get(model, {'active': 0, 'waiting': 0, 'limit': None})
+
+
+class _Calls:
+    """Runs requests on threads, each holding its slot until released, and records the order they got one."""
+    def __init__(self, scheduler: LLMScheduler):
+        self.scheduler = scheduler
+        self.order = []
+        self.threads = []
+        self.release = threading.Event()
+
+    def start(self, label: str, model: str = "llama3", session_id: str = None, priority: int = PRIORITY_INTERACTIVE, hold: bool = True):
+        """Starts a request and returns once it holds a slot or is queued."""
+        before = _stats(self.scheduler, model)
+
+        def call():
+            with self.scheduler.slot(model, session_id, priority):
+                self.order.append(label)
+                if hold:
+                    self.release.wait()
+
+        thread = threading.Thread(target=call, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        _wait_for(lambda: sum(_stats(self.scheduler, model)[key] for key in ('active', 'waiting')) > before['active'] + before['waiting'])
+
+    def finish(self):
+        self.release.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+            assert not thread.is_alive()
+
+
+def test_per_model_concurrency_limit():
+    scheduler = LLMScheduler(default_limit=1, model_limits={"llama3": 2})
+    calls = _Calls(scheduler)
+    for index in range(4):
+        calls.start(f"llama3-{index}", model="llama3", session_id=f"s{index}")
+    assert _stats(scheduler, "llama3") == {'active': 2, 'waiting': 2, 'limit': 2}
+
+    # Another model has its own slots, so it isn't held up by the busy one
+    calls.start("mistral", model="mistral", session_id="s9")
+    _wait_for(lambda: "mistral" in calls.order)
+    assert _stats(scheduler, "mistral")['active'] == 1
+
+    calls.finish()
+    assert sorted(calls.order) == ["llama3-0", "llama3-1", "llama3-2", "llama3-3", "mistral"]
+    assert _stats(scheduler, "llama3") == {'active': 0, 'waiting': 0, 'limit': 2}
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = LLMScheduler(default_limit=1)
+    calls = _Calls(scheduler)
+    calls.start("blocker", session_id="other")
+    # Session a queues three requests before session b queues two
+    for label, session_id in [("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b"), ("b2", "b")]:
+        calls.start(label, session_id=session_id, hold=False)
+
+    calls.finish()
+    assert calls.order == ["blocker", "a1", "b1", "a2", "b2", "a3"]
+
+
+def test_interactive_requests_go_before_background_ones():
+    scheduler = LLMScheduler(default_limit=1)
+    calls = _Calls(scheduler)
+    calls.start("blocker", session_id="other")
+    calls.start("background-a", session_id="a", priority=PRIORITY_BACKGROUND, hold=False)
+    calls.start("background-b", session_id="b", priority=PRIORITY_BACKGROUND, hold=False)
+    calls.start("interactive-c", session_id="c", priority=PRIORITY_INTERACTIVE, hold=False)
+
+    calls.finish()
+    assert calls.order == ["blocker", "interactive-c", "background-a", "background-b"]
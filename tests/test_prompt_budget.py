@@ -0,0 +1,92 @@
+# tests/test_prompt_budget.py
+
+import pytest
+
+pytest.importorskip("langchain") # prompt_budget works on langchain Documents
+
+from langchain.schema import Document
+
+from prompt_budget import PromptBudget, estimate_message_tokens, estimate_tokens
+
+# 4 characters per token (CHARS_PER_TOKEN): the system message is 10 + 4 (overhead) tokens, the example 100 + 4
+SYSTEM = [{'role': 'system', 'content': "s" * 40}]
+EXAMPLES = [{'role': 'user', 'content': "e" * 400}]
+
+
+def _render(documents, summary):
+    """A turn prompt made of just the chunks and the summary, so every token is accounted for."""
+    return "".join(doc.page_content for doc in documents) + (summary or ""), None
+
+
+def _budget(prompt_limit: int) -> PromptBudget:
+    return PromptBudget(prompt_limit, reserved_output_tokens=0, margin_tokens=0)
+
+
+def _documents() -> list:
+    # Ranked best first, 100 tokens each
+    return [Document(page_content=letter * 400, metadata={'source': letter}) for letter in "abc"]
+
+
+def test_prompt_that_fits_is_unchanged():
+    user_prompt, error, include_examples, report = _budget(1000).fit(SYSTEM, EXAMPLES, _documents(), "summary", _render)
+    assert error is None
+    assert include_examples
+    assert user_prompt == "a" * 400 + "b" * 400 + "c" * 400 + "summary"
+    assert report['dropped_documents'] == 0 and report['trimmed'] == [] and report['fits']
+    assert report['prompt_tokens'] == estimate_message_tokens(SYSTEM) + estimate_message_tokens(EXAMPLES) + estimate_tokens(user_prompt) + 4
+
+
+def test_lowest_ranked_chunks_go_first():
+    # System 14 + examples 104 + two chunks 200 + overhead 4
+    user_prompt, _, include_examples, report = _budget(322).fit(SYSTEM, EXAMPLES, _documents(), None, _render)
+    assert user_prompt == "a" * 400 + "b" * 400
+    assert include_examples
+    assert report['dropped_documents'] == 1 and report['fits']
+
+
+def test_examples_go_once_only_the_best_chunk_is_left():
+    # The best chunk alone still doesn't fit with the examples (14 + 104 + 100 + 4), without them it does
+    user_prompt, _, include_examples, report = _budget(150).fit(SYSTEM, EXAMPLES, _documents(), None, _render)
+    assert user_prompt == "a" * 400
+    assert not include_examples
+    assert report['dropped_documents'] == 2 and report['examples_dropped']
+    assert report['trimmed'] == [] and report['fits']
+
+
+def test_remaining_chunk_is_cut_at_its_end():
+    documents = [Document(page_content="a" * 700 + "z" * 100, metadata={'source': "kb.pdf"})] # 200 tokens
+    user_prompt, _, _, report = _budget(118).fit(SYSTEM, [], documents, None, _render)
+    assert user_prompt.startswith("a" * 100) and user_prompt.endswith("...")
+    assert "z" not in user_prompt
+    assert report['trimmed'] == ['retrieved_context'] and report['fits']
+    # The documents are shared with the retrieval cache, so the original is left alone
+    assert documents[0].page_content == "a" * 700 + "z" * 100
+
+
+def test_chunk_that_would_be_cut_too_short_is_dropped():
+    documents = [Document(page_content="a" * 400, metadata={'source': "kb.pdf"})]
+    user_prompt, _, _, report = _budget(30).fit(SYSTEM, [], documents, None, _render)
+    assert user_prompt == ""
+    assert report['dropped_documents'] == 1 and report['documents'] == 0
+
+
+def test_summary_loses_its_start_last():
+    documents = [Document(page_content="a" * 400, metadata={'source': "kb.pdf"})]
+    summary = "o" * 400 + "n" * 400 # Oldest arguments first
+    user_prompt, _, include_examples, report = _budget(118).fit(SYSTEM, EXAMPLES, documents, summary, _render)
+    # Everything else goes before the summary is cut, and the cut keeps its latest part
+    assert not include_examples
+    assert report['dropped_documents'] == 1
+    assert user_prompt.startswith("...") and user_prompt.endswith("n" * 300)
+    assert "o" not in user_prompt and "a" not in user_prompt
+    assert report['trimmed'] == ['summary'] and report['fits']
+
+
+def test_fit_text_keeps_the_end_of_text():
+    text = "x" * 400 + "n" * 400
+    render = lambda history: f"History:\n{history}"
+    user_prompt, include_examples, report = _budget(118).fit_text(SYSTEM, EXAMPLES, text, render, section='history')
+    assert not include_examples
+    assert user_prompt.startswith("History:\n...") and user_prompt.endswith("n" * 300)
+    assert "x" not in user_prompt
+    assert report['trimmed'] == ['history'] and report['fits']
@@ -0,0 +1,89 @@
+# tests/test_retrieval_cache.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+rag_pipeline = pytest.importorskip("rag_pipeline") # Needs the ollama/langchain/chroma dependencies
+RetrievalCache = rag_pipeline.RetrievalCache
+
+
+def test_queries_are_normalized_and_versioned():
+    cache = RetrievalCache(max_entries=4, ttl_seconds=0)
+    cache.put("Remote work  is BETTER", 3, "kb@1", ["doc"])
+    assert cache.get("remote work is better", 3, "kb@1") == ["doc"]
+    assert cache.get("remote work is better", 5, "kb@1") is None # Different k
+    assert cache.get("remote work is better", 3, "kb@2") is None # Index changed since
+    assert cache.stats() == {"hits": 1, "misses": 2, "entries": 1}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RetrievalCache(max_entries=2, ttl_seconds=0)
+    cache.put("a", 3, "kb@1", ["a"])
+    cache.put("b", 3, "kb@1", ["b"])
+    assert cache.get("a", 3, "kb@1") == ["a"]
+    cache.put("c", 3, "kb@1", ["c"])
+
+    assert cache.get("b", 3, "kb@1") is None
+    assert cache.get("a", 3, "kb@1") == ["a"]
+    assert cache.get("c", 3, "kb@1") == ["c"]
+
+
+def test_expired_entries_are_retrieved_again():
+    cache = RetrievalCache(max_entries=4, ttl_seconds=0.05)
+    cache.put("a", 3, "kb@1", ["a"])
+    assert cache.get("a", 3, "kb@1") == ["a"]
+    time.sleep(0.1)
+    assert cache.get("a", 3, "kb@1") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = RetrievalCache(max_entries=0, ttl_seconds=0)
+    cache.put("a", 3, "kb@1", ["a"])
+    assert cache.get("a", 3, "kb@1") is None
+
+
+def test_concurrent_misses_retrieve_once():
+    cache = RetrievalCache(max_entries=4, ttl_seconds=0)
+    calls = []
+    release = threading.Event()
+
+    def retrieve():
+        calls.append(True)
+        release.wait(timeout=5)
+        return ["doc"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_retrieve("a", 3, "kb@1", retrieve)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05) # Let every thread reach the cache before the first retrieval returns
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(calls) == 1
+    assert results == [["doc"]] * 5
+    assert cache.stats() == {"hits": 4, "misses": 1, "entries": 1}
+
+
+def test_concurrent_async_misses_retrieve_once():
+    cache = RetrievalCache(max_entries=4, ttl_seconds=0)
+    calls = []
+
+    async def retrieve():
+        calls.append(True)
+        await asyncio.sleep(0.01)
+        return ["doc"]
+
+    async def run():
+        return await asyncio.gather(*(cache.aget_or_retrieve("a", 3, "kb@1", retrieve) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [["doc"]] * 5
+    assert cache.stats() == {"hits": 4, "misses": 1, "entries": 1}
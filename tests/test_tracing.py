@@ -0,0 +1,47 @@
+# tests/test_tracing.py
+
+import json
+
+import tracing
+from tracing import Tracer
+
+
+def _names(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [event["name"] for event in json.load(f)["traceEvents"] if event["ph"] != "M"]
+
+
+def test_runs_of_one_session_export_only_their_own_events(tmp_path):
+    tracer = Tracer(enabled=True, max_events=100)
+    first = tracer.new_trace("session")
+    second = tracer.new_trace("session")
+    assert first != second
+
+    with tracer.bound(first):
+        tracer.instant("stopped run")
+    with tracer.bound(second):
+        tracer.instant("next run")
+
+    # The stopped run exports after the next run has started
+    assert _names(tracer.export(str(tmp_path / "first.json"), first)) == ["stopped run"]
+    assert _names(tracer.export(str(tmp_path / "second.json"), second)) == ["next run"]
+
+
+def test_events_for_an_exported_trace_are_dropped(tmp_path):
+    tracer = Tracer(enabled=True, max_events=100)
+    trace_id = tracer.new_trace("session")
+    with tracer.bound(trace_id):
+        tracer.instant("during the run")
+    tracer.export(str(tmp_path / "run.json"), trace_id)
+
+    with tracer.bound(trace_id):
+        tracer.instant("after the run")
+    assert tracer.export(str(tmp_path / "late.json"), trace_id) is None
+
+
+def test_unbound_events_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "MAX_UNBOUND_EVENTS", 3)
+    tracer = Tracer(enabled=True, max_events=100)
+    for index in range(5):
+        tracer.instant(f"event {index}")
+    assert _names(tracer.export(str(tmp_path / "unbound.json"))) == ["event 2", "event 3", "event 4"]
@@ -0,0 +1,211 @@
+# tracing.py
+
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Union
+
+from config import TRACE_ENABLED, TRACE_MAX_EVENTS
+
+MAX_TRACE_LANES = 1024 # Lanes remembered for threads; task lanes are released as soon as the task is done
+MAX_UNBOUND_EVENTS = 10000 # Only the latest events recorded outside any trace are kept
+
+# Trace the current code records into (see Tracer.bound); copied into asyncio tasks automatically,
+# and into worker threads by submitting contextvars.copy_context().run
+_current_trace = contextvars.ContextVar('trace', default=None)
+
+
+class _NullSpan:
+    """Returned by Tracer.span() when tracing is disabled; entering and leaving it does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'category', 'args', 'started', 'lane')
+
+    def __init__(self, tracer, name: str, category: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.lane = self.tracer._lane()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer._complete(self.name, self.category, self.started, time.perf_counter(), self.lane, self.args)
+        return False
+
+
+class _Bound:
+    """Context manager returned by Tracer.bound()."""
+    __slots__ = ('trace_id', 'token')
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+
+    def __enter__(self):
+        self.token = _current_trace.set(self.trace_id)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            _current_trace.reset(self.token)
+        except ValueError:
+            pass # Left from another context (a generator closed elsewhere); that context's value is not ours to change
+        return False
+
+
+class Tracer:
+    """Records timed spans and exports them in the Chrome trace event format (Perfetto, chrome://tracing).
+
+    Spans are complete ('X') events placed on one lane per thread, or per asyncio task when recorded
+    inside one, so parallel turns and concurrent async debates show up side by side. Events are kept
+    per trace: new_trace() opens a trace and code inside `with tracer.bound(trace_id):` records into
+    it, so concurrent debates each export only their own spans. export() closes the trace; events
+    recorded for it afterwards are dropped. Events recorded outside any bound() block go to a small
+    ring of the latest MAX_UNBOUND_EVENTS. While disabled, span() returns a shared no-op context
+    manager and complete()/instant() return immediately.
+    """
+    def __init__(self, enabled: bool = TRACE_ENABLED, max_events: int = TRACE_MAX_EVENTS):
+        self.enabled = enabled
+        self.max_events = max_events # Per trace
+        self.dropped = 0
+        self._traces = {} # open trace id -> {'events', 'lanes', 'dropped'}
+        self._unbound = self._new_trace_entry(deque(maxlen=MAX_UNBOUND_EVENTS))
+        self._trace_ids = itertools.count(1)
+        self._lanes = OrderedDict() # (thread id, thread name, task name) -> (lane id, lane name), least recently used first
+        self._lane_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._origin = time.perf_counter()
+
+    @staticmethod
+    def _new_trace_entry(events) -> dict:
+        return {'events': events, 'lanes': {}, 'dropped': 0}
+
+    def new_trace(self, label: str) -> str:
+        """Opens a new trace and returns its id (label plus a sequence number, unique in this process)."""
+        trace_id = f"{label}#{next(self._trace_ids)}"
+        if self.enabled:
+            with self._lock:
+                self._traces[trace_id] = self._new_trace_entry([])
+        return trace_id
+
+    def bound(self, trace_id: str) -> _Bound:
+        """Context manager recording everything inside it (on this thread or task) into trace trace_id."""
+        return _Bound(trace_id)
+
+    def span(self, name: str, category: str = "debate", **args):
+        """Context manager timing the enclosed block: with tracer.span('retrieval', 'chroma', agent=...):"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def complete(self, name: str, category: str, started: float, **args):
+        """Records a span that started at `started` (a time.perf_counter() value) and ends now."""
+        if self.enabled:
+            self._complete(name, category, started, time.perf_counter(), self._lane(), args)
+
+    def instant(self, name: str, category: str = "debate", **args):
+        """Records a point-in-time marker."""
+        if self.enabled:
+            self._add({"name": name, "cat": category, "ph": "i", "s": "t", "ts": self._micros(time.perf_counter()),
+                       "pid": self._pid, "args": args}, self._lane())
+
+    def _micros(self, perf_time: float) -> float:
+        return round((perf_time - self._origin) * 1_000_000, 1)
+
+    def _lane(self) -> tuple:
+        thread = threading.current_thread()
+        try:
+            task = asyncio.current_task()
+        except RuntimeError: # No running event loop in this thread
+            task = None
+        key = (thread.ident, thread.name, task.get_name() if task is not None else None) # Names, not tasks, so finished tasks aren't kept alive
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = (next(self._lane_ids), thread.name if task is None else f"{thread.name} / {key[2]}")
+                self._lanes[key] = lane
+                if task is not None:
+                    task.add_done_callback(lambda _task: self._release_lane(key))
+                elif len(self._lanes) > MAX_TRACE_LANES:
+                    self._lanes.popitem(last=False)
+            else:
+                self._lanes.move_to_end(key)
+        return lane
+
+    def _release_lane(self, key: tuple):
+        with self._lock:
+            self._lanes.pop(key, None)
+
+    def _complete(self, name: str, category: str, started: float, ended: float, lane: tuple, args: dict):
+        self._add({"name": name, "cat": category, "ph": "X", "ts": self._micros(started), "dur": round((ended - started) * 1_000_000, 1),
+                   "pid": self._pid, "args": args}, lane)
+
+    def _add(self, event: dict, lane: tuple):
+        event["tid"] = lane[0]
+        trace_id = _current_trace.get()
+        with self._lock:
+            trace = self._unbound if trace_id is None else self._traces.get(trace_id)
+            if trace is None:
+                return # Already exported (or never opened with new_trace)
+            if trace is not self._unbound and len(trace['events']) >= self.max_events:
+                trace['dropped'] += 1
+                self.dropped += 1
+                return
+            trace['events'].append(event)
+            trace['lanes'][lane[0]] = lane[1] # Names are kept with the events, so released lanes still export named
+
+    def export(self, path: str, trace_id: Union[str, None] = None, clear: bool = True) -> Union[str, None]:
+        """Writes the events recorded for trace_id (since its last export when clear=True) to a trace JSON file.
+
+        trace_id=None exports the latest events recorded outside any bound() block.
+        Returns the path written, or None if there was nothing to write or writing failed.
+        """
+        with self._lock:
+            if trace_id is None:
+                trace = self._unbound
+                if clear:
+                    self._unbound = self._new_trace_entry(deque(maxlen=MAX_UNBOUND_EVENTS))
+            else:
+                trace = self._traces.pop(trace_id, None) if clear else self._traces.get(trace_id)
+            if trace is None:
+                return None
+            events, lanes, dropped = list(trace['events']), dict(trace['lanes']), trace['dropped']
+        if not events:
+            return None
+
+        metadata = [{"name": "process_name", "ph": "M", "pid": self._pid, "args": {"name": "debate system"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": lane_id, "args": {"name": lane_name}} for lane_id, lane_name in lanes.items()]
+        trace = {"traceEvents": metadata + events, "displayTimeUnit": "ms", "otherData": {"trace_id": trace_id, "dropped_events": dropped}}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(trace, f, ensure_ascii=False, default=str)
+        except OSError as e:
+            print(f"Could not write trace file {path}: {e}", flush=True)
+            return None
+        return path
+
+
+# Shared by the agents, the RAG pipeline and the UI (disabled unless TRACE_ENABLED is set in config)
+tracer = Tracer()